@@ -12,15 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import touchdown.aws  # noqa
-import touchdown.config  # noqa
+import sys
+
 import touchdown.goals  # noqa
-import touchdown.gpg  # noqa
-import touchdown.local  # noqa
-import touchdown.notifications  # noqa
-import touchdown.provisioner  # noqa
-import touchdown.ssh  # noqa
-import touchdown.template  # noqa
-from touchdown.core import Workspace
+from touchdown.core import Workspace, plugins
 
 __all__ = ["Workspace"]
+
+sys.modules[__name__].__class__ = plugins.PluginPackage
@@ -15,13 +15,57 @@
 # This code is not currently exposed publically. It is an example of how to
 # stream from a aws log using the FilterLogEvents API.
 
-import gzip
+import collections
+import datetime
+import heapq
+import itertools
+import operator
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 import six
 
 from touchdown.aws import common
 from touchdown.aws.cloudfront import Distribution
 from touchdown.core import plan
+from touchdown.core.datetime import as_seconds
+from touchdown.core.query import Query, parse_predicates
+from touchdown.core.utils import force_str
+
+# CloudFront log files are called <prefix><distribution id>.<hour>.<id>.gz,
+# where hour is in UTC.
+KEY_RE = re.compile(r"\.(\d{4}-\d{2}-\d{2}-\d{2})\.[^./]+\.gz$")
+HOUR_FORMAT = "%Y-%m-%d-%H"
+LINE_FORMAT = "%Y-%m-%d\t%H:%M:%S"
+
+
+def as_utc(value):
+    return datetime.datetime.utcfromtimestamp(as_seconds(value))
+
+
+def decompress_lines(fileobj, chunk_size=64 * 1024):
+    """ Yields each line of the gzipped ``fileobj``, decompressing it a chunk
+    at a time rather than all at once """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    pending = b""
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        while chunk:
+            pending += decompressor.decompress(chunk)
+            # A file can be several gzip streams one after another
+            chunk = decompressor.unused_data
+            if chunk:
+                pending += decompressor.flush()
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    pending += decompressor.flush()
+    if pending:
+        for line in pending.split(b"\n"):
+            yield line
 
 
 class Plan(common.SimplePlan, plan.Plan):
@@ -56,41 +100,174 @@ class Plan(common.SimplePlan, plan.Plan):
         "x-edge-response-result-type",
     ]
 
-    def tail(self, start, end, follow):
-        if follow:
-            print("Following is not supported for this stream")
-            return
+    # How many log files are downloaded at once, and how many can be
+    # waiting to be shown
+    workers = 4
+    prefetch = 8
 
-        if not self.resource.logging.enabled:
-            print("Logging is not enabled for this CloudFront distribution")
-            return
+    # How often to look for new log files when following
+    poll_interval = 30
+
+    def get_distribution_id(self):
+        return self.runner.get_service(self.resource, "describe").resource_id
+
+    def get_hour(self, key):
+        match = KEY_RE.search(key)
+        if match:
+            return match.group(1)
+
+    def list_keys(self, prefix, marker=None, end_hour=None):
+        """ Yields log file names in order, starting after ``marker`` and
+        stopping after ``end_hour`` """
+        kwargs = {"Bucket": self.resource.logging.bucket.name, "Prefix": prefix}
+        if marker:
+            kwargs["Marker"] = marker
+        for page in self.client.get_paginator("list_objects").paginate(**kwargs):
+            for obj in page.get("Contents", []):
+                hour = self.get_hour(obj["Key"])
+                if end_hour and hour and hour > end_hour:
+                    return
+                yield obj["Key"]
 
-        pages = self.client.get_paginator("list_objects").paginate(
-            Bucket=self.resource.logging.bucket.name,
-            Prefix=self.resource.logging.prefix,
+    def download(self, key):
+        response = self.client.get_object(
+            Bucket=self.resource.logging.bucket.name, Key=key
         )
+        return six.BytesIO(response["Body"].read())
 
-        contents = []
-        [contents.extend(p.get("Contents", [])) for p in pages]
-        contents.sort(key=lambda c: c["LastModified"])
+    def fetch(self, executor, keys):
+        """ Yields each key with its contents, in order. Downloads happen in
+        the background but no more than ``prefetch`` are held at once. """
+        pending = collections.deque()
+        try:
+            for key in keys:
+                pending.append((key, executor.submit(self.download, key)))
+                if len(pending) >= self.prefetch:
+                    key, future = pending.popleft()
+                    yield key, future.result()
+            while pending:
+                key, future = pending.popleft()
+                yield key, future.result()
+        finally:
+            for key, future in pending:
+                future.cancel()
 
-        if start:
-            contents = filter(lambda c: c["LastModified"] >= start, contents)
+    def read_lines(self, fileobj, start_line=None, end_line=None):
+        """ Yields the timestamp and contents of each log line in
+        ``fileobj`` between ``start_line`` and ``end_line`` """
+        for line in decompress_lines(fileobj):
+            if not line or line.startswith(b"#"):
+                continue
+            stamp = line[:19].decode("utf-8", "ignore")
+            if start_line and stamp < start_line:
+                continue
+            if end_line and stamp > end_line:
+                continue
+            yield stamp, line
 
-        if end:
-            contents = filter(lambda c: c["LastModified"] <= end, contents)
+    def merge_lines(self, fileobjs, start_line=None, end_line=None):
+        """ Yields the lines of several log files for the same hour in
+        timestamp order. Lines with the same timestamp keep the order of
+        their files. """
+        return heapq.merge(
+            *[self.read_lines(f, start_line, end_line) for f in fileobjs],
+            key=operator.itemgetter(0)
+        )
+
+    def echo_lines(self, lines, predicates=(), aggregate=None):
+        for stamp, line in lines:
+            line = force_str(line)
+            if predicates or aggregate:
+                record = dict(zip(self.fields, line.split("\t")))
+                if not all(predicate.matches(record) for predicate in predicates):
+                    continue
+                if aggregate:
+                    aggregate.add(record, stamp[:16].replace("\t", " "))
+                    continue
+            self.runner.ui.echo(line)
+
+    def get_follow_marker(self, prefix, marker, seen):
+        """ Files for an hour keep arriving after it is over, and their names
+        don't sort in the order they arrive. So keep listing from the hour
+        before the newest file we've seen, and only remember the files we've
+        seen since then. """
+        hours = [hour for hour in seen.values() if hour]
+        if not hours:
+            return marker, seen
+        previous = datetime.datetime.strptime(max(hours), HOUR_FORMAT)
+        previous -= datetime.timedelta(hours=1)
+        marker = prefix + previous.strftime(HOUR_FORMAT)
+        seen = {
+            key: hour for key, hour in seen.items() if hour and prefix + hour > marker
+        }
+        return marker, seen
 
-        print("#Version: 1.0")
-        print("#Fields: {}".format(" ".join(self.fields)))
+    def get_listing(self, start, end, follow):
+        """ Returns the prefix and marker to list log files with, and the last
+        hour to list """
+        prefix = self.resource.logging.prefix
+        if not (start or end or follow):
+            return prefix, None, None
+        # Only look at the logs for this distribution - then the names of the
+        # log files are in date order.
+        prefix = "{}{}.".format(prefix, self.get_distribution_id())
+        marker = prefix + as_utc(start).strftime(HOUR_FORMAT) if start else None
+        end_hour = as_utc(end).strftime(HOUR_FORMAT) if end else None
+        return prefix, marker, end_hour
 
-        for log in contents:
-            response = self.client.get_object(
-                Bucket=self.resource.logging.bucket.name, Key=log["Key"]
+    def tail(self, start, end, follow, query=None):
+        if not self.resource.logging.enabled:
+            self.runner.ui.echo(
+                "Logging is not enabled for this CloudFront distribution"
             )
+            return
+
+        query = query or Query()
+        query.check_group_by(self.fields)
+        predicates = []
+        if query.expression:
+            predicates = parse_predicates(query.expression, self.fields)
+        aggregate = query.get_aggregate() if query.is_aggregate() else None
+
+        prefix, marker, end_hour = self.get_listing(start, end, follow)
+        start_line = as_utc(start).strftime(LINE_FORMAT) if start else None
+        end_line = as_utc(end).strftime(LINE_FORMAT) if end else None
+
+        if not aggregate:
+            self.runner.ui.echo("#Version: 1.0")
+            self.runner.ui.echo("#Fields: {}".format(" ".join(self.fields)))
+
+        # The log files that have been shown, by hour
+        seen = {}
+
+        try:
+            with ThreadPoolExecutor(self.workers) as executor:
+                while True:
+                    keys = (
+                        key
+                        for key in self.list_keys(prefix, marker, end_hour)
+                        if key not in seen
+                    )
+                    # Keys are listed in order, so the files for each hour
+                    # arrive together. Each hour is served by several edge
+                    # locations, so interleave their files' lines.
+                    files = self.fetch(executor, keys)
+                    hours = itertools.groupby(files, lambda f: self.get_hour(f[0]))
+                    for hour, group in hours:
+                        fileobjs = []
+                        for key, fileobj in group:
+                            seen[key] = hour
+                            fileobjs.append(fileobj)
+                        lines = self.merge_lines(fileobjs, start_line, end_line)
+                        self.echo_lines(lines, predicates, aggregate)
+
+                    if not follow or (end and as_utc(end) < datetime.datetime.utcnow()):
+                        break
 
-            with gzip.GzipFile(fileobj=six.BytesIO(response["Body"].read())) as f:
-                blob = f.read()
+                    marker, seen = self.get_follow_marker(prefix, marker, seen)
+                    time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
 
-            lines = blob.split(b"\n")
-            for line in lines[2:]:
-                print(line)
+        if aggregate:
+            aggregate.report(self.runner.ui.echo)
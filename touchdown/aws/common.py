@@ -13,31 +13,67 @@
 # limitations under the License.
 
 import datetime
+import json
 import logging
+import random
 import time
 
 import jmespath
 from botocore.exceptions import ClientError
 
 from touchdown.core import errors, resource, serializers
-from touchdown.core.action import Action
+from touchdown.core.action import Action, PollingAction
 from touchdown.core.plan import Present
+from touchdown.core.poller import Wait
+
+from .retry import RetryPolicy
 
 logger = logging.getLogger(__name__)
 
 
+def backoff(initial, maximum, factor=2, jitter=0.5):
+    """ Yields delays that start at ``initial`` and grow exponentially up to
+    ``maximum``. Each delay is shortened by a random amount (up to ``jitter``
+    of its length) so that lots of workers don't end up polling in lockstep.
+    """
+    delay = initial
+    while True:
+        yield delay - random.uniform(0, delay * jitter)
+        delay = min(delay * factor, maximum)
+
+
 class Resource(resource.Resource):
     def matches(self, runner, remote):
         d = serializers.Resource().diff(runner, self, remote)
         return d.matches()
 
 
-class Waiter(Action):
+class Waiter(PollingAction):
+
+    """ Polls until a botocore waiter reaches a success state.
+
+    Polling starts after ``initial_delay`` seconds and backs off up to the
+    delay configured for the botocore waiter, so short operations are noticed
+    quickly without long ones using up API quota. The total time spent
+    waiting is capped at ``max_attempts * delay`` from the waiter config. """
+
+    initial_delay = 1
+
+    # How long to wait between the polls that check a success state is
+    # consistent.
+    consistency_delay = 1
+
     def __init__(self, plan, description, waiter, eventual_consistency_threshold):
         super(Waiter, self).__init__(plan)
         self.description = description
         self.waiter = self.plan.client.get_waiter(waiter)
         self.eventual_consistency_threshold = eventual_consistency_threshold
+        self.polls = 0
+        self.successes = 0
+
+    @property
+    def expected_duration(self):
+        return self.waiter.config.max_attempts * self.waiter.config.delay
 
     def get_waiter_filters(self):
         """ Allow subclasses to use a different filter for their waiter to their describer """
@@ -52,53 +88,86 @@ class Waiter(Action):
         logger.debug(
             "Polling with waiter {} and filters {}".format(self.waiter, filters)
         )
+        self.polls += 1
         return self.get_filtered_response(self.waiter._operation_method(**filters))
 
-    def ready(self):
-        acceptors = list(self.waiter.config.acceptors)
-        for i in range(self.eventual_consistency_threshold):
+    def get_state(self):
+        response = self.poll()
+        for acceptor in self.waiter.config.acceptors:
+            if acceptor.matcher_func(response):
+                current_state = acceptor.state
+                break
+        else:
+            if "Error" in response:
+                raise errors.Error(
+                    "Unexpected error encountered. {}".format(response["Error"])
+                )
             current_state = "waiting"
-            response = self.poll()
-            for acceptor in acceptors:
-                if acceptor.matcher_func(response):
-                    current_state = acceptor.state
-                    break
-            else:
-                if "Error" in response:
-                    raise errors.Error(
-                        "Unexpected error encountered. {}".format(response["Error"])
-                    )
 
-            if current_state == "failure":
-                raise errors.Error("Waiter encountered a terminal failure state")
+        if current_state == "failure":
+            raise errors.Error("Waiter encountered a terminal failure state")
 
-            if current_state != "success":
-                return False
+        return current_state
 
+    def ready(self):
+        for i in range(self.eventual_consistency_threshold):
+            if i:
+                time.sleep(self.consistency_delay)
+            if self.get_state() != "success":
+                return False
         return True
 
-    def run(self):
-        last = datetime.datetime.now()
-        for i in range(self.waiter.config.max_attempts):
-            if self.ready():
-                break
+    def check(self):
+        """ Poll once, returning True once the success state has been seen
+        ``eventual_consistency_threshold`` times in a row """
+        if self.get_state() != "success":
+            self.successes = 0
+            return False
+        self.successes += 1
+        return self.successes >= self.eventual_consistency_threshold
+
+    def get_delays(self):
+        # The deadline is measured by the clock rather than by adding up the
+        # delays, so the time spent polling counts towards it too. It is set
+        # now rather than when the first delay is needed.
+        config = self.waiter.config
+        return self.iter_delays(time.monotonic() + config.max_attempts * config.delay)
+
+    def iter_delays(self, deadline):
+        config = self.waiter.config
+        maximum = max(config.delay, self.initial_delay)
+        delays = backoff(min(self.initial_delay, maximum), maximum)
+        last = time.monotonic()
+
+        while True:
+            now = time.monotonic()
+            remaining = deadline - now
+            if remaining <= 0:
+                return
 
-            now = datetime.datetime.now()
-            if (now - last).total_seconds() > 60:
-                attempts_remaining = self.waiter.config.max_attempts - i
-                time_remaining = attempts_remaining * self.waiter.config.delay
+            if self.successes:
+                yield min(self.consistency_delay, remaining)
+                continue
 
+            if now - last > 60:
                 self.plan.ui.echo(
                     "Still waiting for {}. {} till timeout occurs.".format(
-                        self.plan.resource, datetime.timedelta(seconds=time_remaining)
+                        self.plan.resource,
+                        datetime.timedelta(seconds=int(remaining)),
                     )
                 )
                 last = now
 
-            time.sleep(self.waiter.config.delay)
+            yield min(next(delays), remaining)
 
-        else:
-            raise errors.Error("Operation took too long to complete")
+    def steps(self):
+        started = time.time()
+        yield Wait(self.check, self.get_delays())
+        self.plan.echo(
+            "Finished waiting after {} ({} polls)".format(
+                datetime.timedelta(seconds=int(time.time() - started)), self.polls
+            )
+        )
 
 
 class GenericAction(Action):
@@ -168,31 +237,23 @@ class RetryAction(Action):
     def __init__(self, plan, action):
         self.plan = plan
         self.action = action
+        self.policy = RetryPolicy(getattr(plan, "retryable", {}))
 
     @property
     def description(self):
         return self.action.description
 
     def should_retry(self, response):
-        retryable = getattr(self.plan, "retryable", {})
-        if not response["Error"]["Code"] in retryable:
-            return False
-        msgs = retryable[response["Error"]["Code"]]
-        if not msgs:
-            return True
-        for msg in msgs:
-            if msg == response["Error"]["Message"]:
-                return True
-        return False
+        return self.policy.should_retry(response)
 
     def run(self):
-        for i in range(10):
+        for delay in self.policy.get_delays():
             try:
                 return self.action.run()
             except ClientError as e:
                 if not self.should_retry(e.response):
                     raise
-            time.sleep(i)
+            time.sleep(delay)
         return self.action.run()
 
 
@@ -269,6 +330,16 @@ class SimpleDescribe(SimplePlan):
     describe_filters = None
     describe_notfound_exception = None
 
+    # Set this to the name of an EC2 style filter (e.g. ``tag:Name``) that
+    # identifies the resource. While planning, concurrent describes that only
+    # differ by the value of this filter are merged into a single API call.
+    # Unless the filter is a tag, ``describe_batch_field`` is the field of the
+    # returned objects that the filter matches against.
+    describe_batch_filter = None
+    describe_batch_field = None
+
+    incremental = True
+
     signature = (Present("name"),)
 
     GenericAction = GenericAction
@@ -331,11 +402,32 @@ class SimpleDescribe(SimplePlan):
 
         logger.debug("Filters are: {}".format(filters))
 
-        try:
-            results = self.unwrap(
+        def fetch():
+            batcher = getattr(self.runner, "describe_batcher", None)
+            if batcher is not None:
+                values = self.get_describe_batch_values(filters)
+                if values:
+                    return batcher.submit(
+                        self.get_describe_batch_key(filters),
+                        (filters, values),
+                        self.describe_batch,
+                    )
+            return self.unwrap(
                 self.get_paginated(self.describe_action, **filters),
                 self.describe_envelope,
             )
+
+        # While planning, resources that list the same thing (for example
+        # every SNS topic calling ``list_topics``) share a single fetch.
+        describe_cache = getattr(self.runner, "describe_cache", None)
+
+        try:
+            if describe_cache is not None:
+                results = describe_cache.get_or_fetch(
+                    self.get_describe_cache_key(filters), lambda: list(fetch())
+                )
+            else:
+                results = fetch()
         except ClientError as e:
             if e.response["Error"]["Code"] == self.describe_notfound_exception:
                 return []
@@ -345,6 +437,109 @@ class SimpleDescribe(SimplePlan):
 
         return results or []
 
+    def get_describe_cache_key(self, filters):
+        session = self.session
+        return (
+            id(session),
+            session.region,
+            self.service_name,
+            self.api_version,
+            self.describe_action,
+            json.dumps(filters, sort_keys=True, default=str),
+        )
+
+    def get_describe_batch_values(self, filters):
+        """ Returns the values of the batch filter, or ``None`` if this
+        request can't be merged with others. """
+        if not self.describe_batch_filter:
+            return None
+        values = None
+        for f in filters.get("Filters", []):
+            if f["Name"] == self.describe_batch_filter:
+                values = f["Values"]
+        if not values:
+            return None
+        for value in values:
+            # Wildcards are expanded server side - we can't share them out
+            if "*" in value or "?" in value:
+                return None
+        return values
+
+    def get_describe_batch_key(self, filters):
+        other_filters = dict(filters)
+        other_filters["Filters"] = [
+            f for f in filters["Filters"] if f["Name"] != self.describe_batch_filter
+        ]
+        session = self.session
+        return (
+            id(session),
+            session.region,
+            self.service_name,
+            self.api_version,
+            self.describe_action,
+            self.describe_envelope,
+            self.describe_batch_filter,
+            json.dumps(other_filters, sort_keys=True, default=str),
+        )
+
+    def get_describe_batch_object_values(self, obj):
+        if self.describe_batch_filter.startswith("tag:"):
+            tag = self.describe_batch_filter[4:]
+            return [t["Value"] for t in obj.get("Tags", []) if t["Key"] == tag]
+        return [obj.get(self.describe_batch_field)]
+
+    def describe_batch(self, requests):
+        """ Makes a single API call on behalf of a batch of requests made by
+        plans that share a ``describe_action``, and hands each of them the
+        objects that their own filters would have returned. """
+        if len(requests) == 1:
+            filters = requests[0][0]
+            return [
+                list(
+                    self.unwrap(
+                        self.get_paginated(self.describe_action, **filters),
+                        self.describe_envelope,
+                    )
+                )
+            ]
+
+        values = set()
+        for _, request_values in requests:
+            values.update(request_values)
+
+        filters = dict(requests[0][0])
+        filters["Filters"] = [
+            f for f in filters["Filters"] if f["Name"] != self.describe_batch_filter
+        ]
+        filters["Filters"].append(
+            {"Name": self.describe_batch_filter, "Values": sorted(values)}
+        )
+
+        logger.debug(
+            "Describing {} objects with a single {} call".format(
+                len(requests), self.describe_action
+            )
+        )
+
+        objects = list(
+            self.unwrap(
+                self.get_paginated(self.describe_action, **filters),
+                self.describe_envelope,
+            )
+        )
+
+        results = []
+        for _, request_values in requests:
+            wanted = set(request_values)
+            results.append(
+                [
+                    obj
+                    for obj in objects
+                    if wanted.intersection(self.get_describe_batch_object_values(obj))
+                ]
+            )
+        return results
+
     def describe_object_matches(self, object):
         """
         Client side filtering of objects. Not all AWS API's support server side
@@ -398,6 +593,13 @@ class SimpleDescribe(SimplePlan):
         ga = self.GenericAction(self, description, callable, serializer, **kwargs)
         return RetryAction(self, ga)
 
+    def independent_action(self, description, callable, serializer=None, **kwargs):
+        """ Like ``generic_action``, but for API calls that can be made at
+        the same time as the independent actions around them """
+        action = self.generic_action(description, callable, serializer, **kwargs)
+        action.independent = True
+        return action
+
     def get_waiter(self, description, waiter, eventual_consistency_threshold=1):
         return Waiter(self, description, waiter, eventual_consistency_threshold)
 
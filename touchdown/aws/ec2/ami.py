@@ -201,6 +201,8 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_images"
     describe_envelope = "Images"
+    describe_batch_filter = "name"
+    describe_batch_field = "Name"
     key = "ImageId"
 
     def get_describe_filters(self):
@@ -12,13 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
 import random
-import time
 
 from touchdown import ssh
 from touchdown.core import argument, errors, serializers
-from touchdown.core.action import Action
+from touchdown.core.action import PollingAction
 from touchdown.core.plan import Plan, Present
+from touchdown.core.poller import Wait
 from touchdown.core.resource import Resource
 from touchdown.core.utils import cached_property
 
@@ -94,25 +95,25 @@ class AutoScalingGroup(Resource):
     account = argument.Resource(BaseAccount)
 
 
-class WaitForHealthy(Action):
+class WaitForHealthy(PollingAction):
     @property
     def description(self):
         yield "Wait for there to be {} healthy instance(s)".format(
             self.resource.min_size
         )
 
-    def run(self):
-        while True:
-            asg = self.plan.object = self.plan.describe_object()
-            if (
-                len([i for i in asg["Instances"] if i["LifecycleState"] == "InService"])
-                >= self.resource.min_size
-            ):
-                return True
-            time.sleep(5)
+    def is_healthy(self):
+        asg = self.plan.object = self.plan.describe_object()
+        return (
+            len([i for i in asg["Instances"] if i["LifecycleState"] == "InService"])
+            >= self.resource.min_size
+        )
+
+    def steps(self):
+        yield Wait(self.is_healthy, itertools.repeat(5))
 
 
-class ReplaceInstances(Action):
+class ReplaceInstances(PollingAction):
 
     scaling_processes = [
         "AlarmNotification",
@@ -146,30 +147,27 @@ class ReplaceInstances(Action):
             InstanceId=instance_id, ShouldDecrementDesiredCapacity=False
         )
 
+    def is_elb_healthy(self, elb):
+        obj = self.runner.get_plan(elb)
+        result = obj.client.describe_instance_health(LoadBalancerName=obj.resource_id)
+        states = result.get("InstanceStates", [])
+        return len([s for s in states if s["State"] != "InService"]) == 0
+
     def wait_for_healthy_elb(self, elb):
         self.plan.echo("Waiting for load balancer {} to report healthy".format(elb))
-        obj = self.runner.get_plan(elb)
-        while True:
-            result = obj.client.describe_instance_health(
-                LoadBalancerName=obj.resource_id
-            )
-            states = result.get("InstanceStates", [])
-            if len(filter(lambda s: s["State"] != "InService", states)) == 0:
-                return True
+        yield Wait(lambda: self.is_elb_healthy(elb), itertools.repeat(5))
 
-            time.sleep(5)
+    def is_asg_healthy(self):
+        asg = self.plan.describe_object()
+        return self.desired_capacity == len(
+            [i for i in asg["Instances"] if i["LifecycleState"] == "InService"]
+        )
 
     def wait_for_healthy_asg(self):
         self.plan.echo("Waiting for scaling group to become healthy")
-        while True:
-            asg = self.plan.describe_object()
-            if self.desired_capacity == len(
-                [i for i in asg["Instances"] if i["LifecycleState"] == "InService"]
-            ):
-                for elb in self.resource.load_balancers:
-                    self.wait_for_healthy_elb(elb)
-                return True
-            time.sleep(5)
+        yield Wait(self.is_asg_healthy, itertools.repeat(5))
+        for elb in self.resource.load_balancers:
+            yield from self.wait_for_healthy_elb(elb)
 
     def resume_processes(self):
         self.plan.client.resume_processes(
@@ -177,17 +175,17 @@ class ReplaceInstances(Action):
             ScalingProcesses=self.scaling_processes,
         )
 
-    def run(self):
+    def steps(self):
         self.plan.echo("Suspend autoscaling activities")
         self.suspend_processes()
         try:
-            self.scale()
+            yield from self.scale()
             try:
                 for instance_id in self.instance_ids:
                     self.terminate_instance(instance_id)
-                    self.wait_for_healthy_asg()
+                    yield from self.wait_for_healthy_asg()
             finally:
-                self.unscale()
+                yield from self.unscale()
         finally:
             self.plan.echo("Resuming autoscaling activities")
             self.resume_processes()
@@ -211,7 +209,7 @@ class GracefulReplacement(ReplaceInstances):
             MaxSize=max,
             DesiredCapacity=self.desired_capacity,
         )
-        self.wait_for_healthy_asg()
+        yield from self.wait_for_healthy_asg()
 
     def unscale(self):
         self.plan.echo("Restoring scaling group to original capacity")
@@ -221,15 +219,15 @@ class GracefulReplacement(ReplaceInstances):
             MaxSize=self.resource.max_size,
             DesiredCapacity=min(self.resource.max_size, self.desired_capacity),
         )
-        self.wait_for_healthy_asg()
+        yield from self.wait_for_healthy_asg()
 
 
 class SingletonReplacement(ReplaceInstances):
     def scale(self):
-        pass
+        yield from ()
 
     def unscale(self):
-        pass
+        yield from ()
 
 
 class Describe(SimpleDescribe, Plan):
@@ -268,7 +266,7 @@ class Apply(SimpleApply, Describe):
         )
 
         if not diff.matches():
-            yield self.generic_action(
+            yield self.independent_action(
                 ["Update tags"] + list(diff.lines()),
                 self.client.create_or_update_tags,
                 Tags=serializers.Argument("tags"),
@@ -286,7 +284,7 @@ class Apply(SimpleApply, Describe):
                 )
 
         if to_delete:
-            yield self.generic_action(
+            yield self.independent_action(
                 ["Delete stale tags"] + ["* " + t["Key"] for t in to_delete],
                 self.client.delete_tags,
                 Tags=to_delete,
@@ -323,7 +321,7 @@ class Apply(SimpleApply, Describe):
             yield klass(self, instances)
 
 
-class TerminateASGInstances(Action):
+class TerminateASGInstances(PollingAction):
     @property
     def description(self):
         yield "Scale down and wait for {} instances to terminate".format(
@@ -332,7 +330,19 @@ class TerminateASGInstances(Action):
         for instance in self.plan.object.get("Instances", []):
             yield instance["InstanceId"]
 
-    def run(self):
+    def is_empty(self):
+        asg = self.plan.describe_object()
+        return len(asg.get("Instances", [])) == 0
+
+    def is_idle(self):
+        activities = self.plan.client.describe_scaling_activities(
+            AutoScalingGroupName=self.resource.name
+        )["Activities"]
+        return (
+            len(tuple(a for a in activities if a["StatusCode"] == "InProgress")) == 0
+        )
+
+    def steps(self):
         # Destroy all the instances in the ASG
         self.plan.client.update_auto_scaling_group(
             AutoScalingGroupName=self.resource.name,
@@ -342,23 +352,10 @@ class TerminateASGInstances(Action):
         )
 
         # Wait until all the ASG instances have gone away
-        while True:
-            asg = self.plan.describe_object()
-            if len(asg.get("Instances", [])) == 0:
-                break
-            time.sleep(10)
+        yield Wait(self.is_empty, itertools.repeat(10))
 
         # Wait until any ASG activies have stopped
-        while True:
-            activities = self.plan.client.describe_scaling_activities(
-                AutoScalingGroupName=self.resource.name
-            )["Activities"]
-            if (
-                len(tuple(a for a in activities if a["StatusCode"] == "InProgress"))
-                == 0
-            ):
-                break
-            time.sleep(10)
+        yield Wait(self.is_idle, itertools.repeat(10))
 
 
 class Destroy(SimpleDestroy, Describe):
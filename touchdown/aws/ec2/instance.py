@@ -82,6 +82,7 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_instances"
     describe_envelope = "Reservations[].Instances[]"
+    describe_batch_filter = "tag:Name"
     key = "InstanceId"
 
     def get_describe_filters(self):
@@ -47,6 +47,7 @@ class Describe(SimpleDescribe, Plan):
     describe_action = "describe_volumes"
     describe_notfound_exception = "InvalidVolume.NotFound"
     describe_envelope = "Volumes"
+    describe_batch_filter = "tag:Name"
     key = "VolumeId"
 
     def get_describe_filters(self):
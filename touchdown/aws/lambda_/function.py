@@ -175,7 +175,7 @@ class Apply(SimpleApply, Describe):
 
     def remove_orphaned_versions(self):
         for version in self.get_all_unaliased_versions():
-            yield self.generic_action(
+            yield self.independent_action(
                 "Delete old version {Version}".format(**version),
                 self.client.delete_function,
                 FunctionName=self.resource.name,
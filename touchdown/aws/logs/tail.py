@@ -15,66 +15,224 @@
 # This code is not currently exposed publically. It is an example of how to
 # stream from a aws log using the FilterLogEvents API.
 
+import collections
 import datetime
+import itertools
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from touchdown.aws import common
 from touchdown.aws.logs import LogGroup
 from touchdown.core import plan
 from touchdown.core.datetime import as_seconds
+from touchdown.core.query import Query
 from touchdown.core.utils import force_str
 
 
+def event_key(event):
+    return (event["timestamp"], event["eventId"])
+
+
+class RecentEvents(object):
+
+    """ The ids of events that have already been shown, so they aren't shown
+    again when one poll overlaps the next.
+
+    Events older than the start of the next poll are forgotten, and no more
+    than ``max_events`` are ever remembered, so memory use is bounded however
+    many events share a timestamp. """
+
+    def __init__(self, max_events=100000):
+        self.max_events = max_events
+        self.events = collections.deque()
+        self.ids = set()
+
+    def add(self, event):
+        """ Remember ``event``, returning False if it was already known """
+        if event["eventId"] in self.ids:
+            return False
+        self.ids.add(event["eventId"])
+        self.events.append(event_key(event))
+        if len(self.events) > self.max_events:
+            self.ids.discard(self.events.popleft()[1])
+        return True
+
+    def forget_before(self, timestamp):
+        # Events are added in timestamp order, so the oldest are on the left
+        while self.events and self.events[0][0] < timestamp:
+            self.ids.discard(self.events.popleft()[1])
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class PollInterval(object):
+
+    """ How long to wait between polls when following a log group.
+
+    Busy log groups are polled often enough to see about ``target`` events
+    each time so that we keep up, and quiet ones are polled less and less
+    often. """
+
+    minimum = 0.5
+    maximum = 10.0
+    target = 100
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+
+    def update(self, events, seconds):
+        if not events:
+            self.interval = min(self.maximum, self.interval * 1.5)
+        else:
+            rate = events / max(seconds, 0.001)
+            self.interval = max(self.minimum, min(self.maximum, self.target / rate))
+        return self.interval
+
+
 class Plan(common.SimplePlan, plan.Plan):
 
     name = "tail"
     resource = LogGroup
     service_name = "logs"
 
+    # Long periods are split into up to this many slices that are fetched at
+    # the same time. Slices are never shorter than ``min_slice`` ms.
+    workers = 4
+    min_slice = 60 * 1000
+
+    # Events can take a few seconds to show up, so each poll overlaps the
+    # previous one by this many ms.
+    settle = 5 * 1000
+
+    # The fields that can be used with --group-by
+    fields = ["logStreamName", "message"]
+
     def get_log_group_name(self):
         return self.resource.name
 
-    def tail(self, start, end, follow):
-        kwargs = {"logGroupName": self.get_log_group_name()}
-        if start:
-            kwargs["startTime"] = as_seconds(start) * 1000
-        if end:
-            kwargs["endTime"] = as_seconds(end) * 1000
+    def get_slices(self, start, end):
+        count = max(1, min(self.workers, (end - start) // self.min_slice))
+        size = (end - start) // count
+        for i in range(count):
+            slice_start = start + i * size
+            slice_end = end if i == count - 1 else slice_start + size - 1
+            yield slice_start, slice_end
 
-        def pull(kwargs, previous_events):
-            seen = set()
-            filters = {}
-            filters.update(kwargs)
+    def get_pages(self, start, end, pattern=None):
+        """ Yields the events between ``start`` and ``end`` (inclusive) a page
+        at a time. Each page is sorted by timestamp. """
+        filters = {
+            "logGroupName": self.get_log_group_name(),
+            "startTime": start,
+            "endTime": end,
+        }
+        if pattern:
+            filters["filterPattern"] = pattern
+        while True:
             results = self.client.filter_log_events(**filters)
-            while True:
-                for event in results.get("events", []):
-                    seen.add(event["eventId"])
-                    if event["eventId"] in previous_events:
-                        continue
-                    self.runner.ui.echo(
-                        "[{timestamp}] [{logStreamName}] {message}".format(
-                            **{
-                                "logStreamName": event.get("logStreamName", ""),
-                                "message": force_str(
-                                    event["message"].encode("utf-8", "ignore")
-                                ),
-                                "timestamp": datetime.datetime.utcfromtimestamp(
-                                    int(event["timestamp"]) / 1000.0
-                                ),
-                            }
-                        )
-                    )
-                    kwargs["startTime"] = event["timestamp"]
-                if "nextToken" not in results:
+            yield sorted(results.get("events", []), key=event_key)
+            if "nextToken" not in results:
+                break
+            filters["nextToken"] = results["nextToken"]
+
+    def fetch_slice(self, pages, start, end, pattern=None, stopped=None):
+        """ Puts each page of events in a slice onto the ``pages`` queue as it
+        arrives, followed by ``None`` once the slice is finished. """
+        try:
+            for page in self.get_pages(start, end, pattern):
+                if stopped and stopped.is_set():
                     break
-                filters["nextToken"] = results["nextToken"]
-                results = self.client.filter_log_events(**filters)
-            return seen
+                pages.put(page)
+        finally:
+            pages.put(None)
+
+    def fetch(self, executor, start, end, pattern=None):
+        slices = self.get_slices(start, end)
+        stopped = threading.Event()
+        window = collections.deque()
+
+        def submit(count):
+            for slice_start, slice_end in itertools.islice(slices, count):
+                pages = queue.Queue()
+                future = executor.submit(
+                    self.fetch_slice, pages, slice_start, slice_end, pattern, stopped
+                )
+                window.append((future, pages))
+
+        try:
+            # No more than ``workers`` slices are in flight at once. Slices
+            # don't overlap, so the pages of the oldest one can be shown as
+            # they arrive, and only the pages of the later ones are buffered.
+            submit(self.workers)
+            while window:
+                future, pages = window.popleft()
+                for page in iter(pages.get, None):
+                    for event in page:
+                        yield event
+                future.result()
+                submit(1)
+        finally:
+            stopped.set()
+            for future, pages in window:
+                future.cancel()
+
+    def get_record(self, event):
+        return {
+            "logStreamName": event.get("logStreamName", ""),
+            "message": force_str(event["message"].encode("utf-8", "ignore")),
+            "timestamp": datetime.datetime.utcfromtimestamp(
+                int(event["timestamp"]) / 1000.0
+            ),
+        }
+
+    def echo_event(self, event, aggregate=None):
+        record = self.get_record(event)
+        if aggregate:
+            aggregate.add(record, record["timestamp"].strftime("%Y-%m-%d %H:%M"))
+            return
+        self.runner.ui.echo(
+            "[{timestamp}] [{logStreamName}] {message}".format(**record)
+        )
+
+    def tail(self, start, end, follow, query=None):
+        start = as_seconds(start) * 1000 if start else 0
+        if end:
+            end = as_seconds(end) * 1000
+
+        query = query or Query()
+        # The filter is passed on to CloudWatch as a filter pattern
+        query.check_group_by(self.fields)
+        aggregate = query.get_aggregate() if query.is_aggregate() else None
+
+        seen = RecentEvents()
+        interval = PollInterval()
 
         try:
-            seen = pull(kwargs, set())
-            while follow:
-                seen = pull(kwargs, seen)
-                time.sleep(2)
+            with ThreadPoolExecutor(self.workers) as executor:
+                while True:
+                    stop = int(time.time() * 1000)
+                    if end:
+                        stop = min(stop, end)
+
+                    count = 0
+                    events = self.fetch(executor, start, stop, query.expression)
+                    for event in events:
+                        if seen.add(event):
+                            self.echo_event(event, aggregate)
+                            count += 1
+
+                    if not follow or (end and stop >= end):
+                        break
+
+                    interval.update(count, (stop - start) / 1000.0)
+                    start = max(start, stop - self.settle)
+                    seen.forget_before(start)
+                    time.sleep(interval.interval)
         except KeyboardInterrupt:
             pass
+
+        if aggregate:
+            aggregate.report(self.runner.ui.echo)
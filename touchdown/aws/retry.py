@@ -0,0 +1,180 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Error codes that AWS services use to say "slow down". These are the same
+# whichever service they come from, so they are always worth retrying.
+THROTTLING_ERRORS = frozenset(
+    [
+        "BandwidthLimitExceeded",
+        "EC2ThrottledException",
+        "PriorRequestNotComplete",
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "RequestThrottled",
+        "RequestThrottledException",
+        "SlowDown",
+        "ThrottledException",
+        "Throttling",
+        "ThrottlingException",
+        "TooManyRequestsException",
+    ]
+)
+
+
+def is_throttle(response):
+    return response.get("Error", {}).get("Code") in THROTTLING_ERRORS
+
+
+class TokenBucket(object):
+
+    """ Paces the requests made to a single AWS service.
+
+    Requests aren't limited until the service throttles us. From then on
+    every client of the service shares a rate limit: each throttle halves the
+    rate and makes everyone pause, and each successful request nudges it
+    back up again until the limit is lifted altogether. """
+
+    initial_rate = 10.0
+    minimum_rate = 0.5
+    maximum_rate = 50.0
+    increase = 0.5
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rate = None
+        self.tokens = 0.0
+        self.last = time.time()
+        self.paused_until = 0
+
+    def acquire(self):
+        with self.lock:
+            now = time.time()
+            delay = self.paused_until - now
+            if self.rate is not None:
+                self.tokens = min(
+                    max(self.rate, 1), self.tokens + (now - self.last) * self.rate
+                )
+                self.last = now
+                # Tokens can go negative - that is a queue of callers who
+                # have been promised a slot in the future.
+                self.tokens -= 1
+                if self.tokens < 0:
+                    delay = max(delay, -self.tokens / self.rate)
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def throttled(self, delay=1):
+        with self.lock:
+            if self.rate is None:
+                self.rate = self.initial_rate
+            else:
+                self.rate = max(self.minimum_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            self.last = time.time()
+            self.paused_until = max(self.paused_until, self.last + delay)
+            logger.debug("Throttled - limiting to {} requests/s".format(self.rate))
+
+    def succeeded(self):
+        with self.lock:
+            if self.rate is None:
+                return
+            self.rate += self.increase
+            if self.rate >= self.maximum_rate:
+                self.rate = None
+
+
+class TokenBuckets(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def get_bucket(self, region, service):
+        with self.lock:
+            key = (region, service)
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket()
+            return self.buckets[key]
+
+    def clear(self):
+        with self.lock:
+            self.buckets = {}
+
+
+buckets = TokenBuckets()
+
+
+def install(client):
+    """ Make every request sent by ``client`` share a ``TokenBucket`` with
+    the other clients for the same service and region """
+    bucket = buckets.get_bucket(
+        client.meta.region_name, client.meta.service_model.service_name
+    )
+
+    def before_send(**kwargs):
+        bucket.acquire()
+
+    def needs_retry(response=None, **kwargs):
+        if response is None:
+            return
+        if is_throttle(response[1]):
+            bucket.throttled()
+        elif response[0].status_code < 400:
+            bucket.succeeded()
+
+    client.meta.events.register("before-send", before_send)
+    client.meta.events.register("needs-retry", needs_retry)
+
+
+class RetryPolicy(object):
+
+    """ Decides whether a failed API call should be tried again and how long
+    to wait first.
+
+    Throttling is always retried. Other errors are only retried if they are
+    listed in ``retryable``, which maps error codes to a list of messages (or
+    to an empty list to match any message). Delays grow exponentially with
+    "full jitter" - a random delay between 0 and the current backoff - so that
+    workers that failed together don't retry together. """
+
+    attempts = 10
+    initial_delay = 1
+    maximum_delay = 30
+
+    def __init__(self, retryable=None):
+        self.retryable = retryable or {}
+
+    def should_retry(self, response):
+        if is_throttle(response):
+            return True
+        code = response["Error"]["Code"]
+        if code not in self.retryable:
+            return False
+        msgs = self.retryable[code]
+        if not msgs:
+            return True
+        return response["Error"]["Message"] in msgs
+
+    def get_delays(self):
+        for i in range(self.attempts - 1):
+            backoff = min(self.maximum_delay, self.initial_delay * 2 ** i)
+            yield random.uniform(0, backoff)
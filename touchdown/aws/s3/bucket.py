@@ -248,7 +248,7 @@ class Destroy(SimpleDestroy, Describe):
 
         for i in range(0, len(keys), 1000):
             chunk = keys[i : i + 1000]
-            yield self.generic_action(
+            yield self.independent_action(
                 'Delete items "{}" through "{}"'.format(chunk[0], chunk[-1]),
                 self.client.delete_objects,
                 Bucket=self.resource.name,
@@ -12,17 +12,187 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import hashlib
+import logging
+import math
 import mimetypes
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from touchdown.core import argument
+from touchdown.core import argument, errors
+from touchdown.core.action import Action
 from touchdown.core.plan import Plan
 from touchdown.core.resource import Resource
+from touchdown.core.utils import cached_property
 
-from ..common import SimpleApply, SimpleDescribe
+from ..common import RetryAction, SimpleApply, SimpleDescribe
 from .bucket import Bucket
 
+logger = logging.getLogger(__name__)
+
+# Files this big are uploaded in parts of this size - the same as the AWS CLI
+# uses, so files uploaded by either get the same ETag.
+PART_SIZE = 8 * 1024 * 1024
+MULTIPART_THRESHOLD = PART_SIZE
+
+# Files are never read into memory more than this much at a time when hashing
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_part_size(size, parts):
+    """ Guess the part size that was used to upload a file of ``size`` bytes
+    in ``parts`` parts """
+    if parts == math.ceil(size / PART_SIZE):
+        return PART_SIZE
+    # Other tools pick a part size big enough to fit the file in a limited
+    # number of parts, usually a whole number of megabytes.
+    mb = 1024 * 1024
+    return int(math.ceil(size / parts / mb)) * mb
+
+
+def compute_etag(path, part_size=None):
+    """ Compute the ETag S3 would give the file at ``path``. That is its MD5,
+    unless it was uploaded in parts of ``part_size`` bytes - in which case it
+    is the MD5 of the MD5 of each part, followed by the number of parts. """
+    with open(path, "rb") as fp:
+        if not part_size:
+            digest = hashlib.md5()
+            for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+            return digest.hexdigest()
+
+        parts = []
+        while True:
+            digest = hashlib.md5()
+            remaining = part_size
+            while remaining:
+                chunk = fp.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+            if remaining == part_size and parts:
+                break
+            parts.append(digest.digest())
+            if remaining:
+                break
+
+    return "{}-{}".format(hashlib.md5(b"".join(parts)).hexdigest(), len(parts))
+
+
+def walk(base):
+    """ Yields the path relative to ``base`` and the ``os.stat`` result of
+    every file below ``base``. Like ``os.walk`` symlinks to directories are
+    not followed. """
+    # Relative paths are built up as we go - os.path.relpath is slow enough
+    # to matter for big folders.
+    directories = [(base, "")]
+    while directories:
+        directory, prefix = directories.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            # Like os.walk, a folder that is missing or can't be read is
+            # treated as empty.
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    directories.append((entry.path, prefix + entry.name + os.sep))
+                continue
+            yield prefix + entry.name, entry.stat()
+
+
+class FileHashes(object):
+
+    """ Remembers the ETags of local files, so that a file is only read again
+    if it changes.
+
+    Files are identified by their device, inode, size and modification time,
+    so a file doesn't need hashing again if it is renamed. If ``cache`` is set
+    the ETags are kept in it between runs, under ``cache_key``. Entries that
+    haven't been used for ``max_age`` seconds are thrown away. """
+
+    max_age = 30 * 24 * 60 * 60
+
+    def __init__(self, cache=None, cache_key="file_hashes"):
+        self.cache = cache
+        self.cache_key = cache_key
+        self.lock = threading.Lock()
+        self.hashes = None
+        self.used = set()
+
+    def load(self):
+        self.hashes = {}
+        if self.cache is None:
+            return
+        try:
+            stored = self.cache.get(self.cache_key) or {}
+        except errors.Error as e:
+            logger.debug("Unable to load file hashes: {}".format(e))
+            return
+        for key, (etag, accessed) in stored.items():
+            self.hashes[key] = (etag, accessed)
+
+    def get_key(self, stat, part_size):
+        return "{}:{}:{}:{}:{}".format(
+            stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, part_size or 0
+        )
+
+    def get_etag(self, path, part_size=None, stat=None):
+        key = self.get_key(stat or os.stat(path), part_size)
+        with self.lock:
+            if self.hashes is None:
+                self.load()
+            if key in self.hashes:
+                self.used.add(key)
+                return self.hashes[key][0]
+        etag = compute_etag(path, part_size)
+        with self.lock:
+            self.hashes[key] = (etag, None)
+            self.used.add(key)
+        return etag
+
+    def save(self):
+        """ Write out new ETags, and note when the others were last used.
+        Entries are only touched once a day, so the cache isn't written at
+        all if nothing has changed. """
+        if self.cache is None:
+            return
+
+        now = time.time()
+        with self.lock:
+            if self.hashes is None:
+                return
+            changed = False
+            for key in self.used:
+                etag, accessed = self.hashes[key]
+                if accessed is None or accessed < now - 24 * 60 * 60:
+                    self.hashes[key] = (etag, now)
+                    changed = True
+            self.used = set()
+
+            for key, (etag, accessed) in list(self.hashes.items()):
+                if accessed is not None and accessed < now - self.max_age:
+                    del self.hashes[key]
+                    changed = True
+
+            if not changed:
+                return
+            stored = {
+                key: [etag, accessed]
+                for key, (etag, accessed) in self.hashes.items()
+                if accessed is not None
+            }
+
+        try:
+            self.cache[self.cache_key] = stored
+        except errors.Error as e:
+            logger.debug("Unable to save file hashes: {}".format(e))
+
 
 class Folder(Resource):
 
@@ -55,6 +225,9 @@ class Describe(SimpleDescribe, Plan):
     key = "Name"
     describe_action = None
 
+    # The files to sync live on disk, not in the resource definition
+    incremental = False
+
     def get_folder_contents(self):
         paginator = self.client.get_paginator("list_objects")
         pages = paginator.paginate(
@@ -80,6 +253,85 @@ class Describe(SimpleDescribe, Plan):
         }
 
 
+class UploadFile(Action):
+
+    """ Upload a file to S3, streaming it from disk. Big files are uploaded
+    in parts, several at a time. """
+
+    part_workers = 4
+
+    def __init__(self, plan, verb, path, key, content_type):
+        super(UploadFile, self).__init__(plan)
+        self.verb = verb
+        self.path = path
+        self.key = key
+        self.content_type = content_type
+
+    @property
+    def description(self):
+        relpath = os.path.relpath(self.path, self.resource.source)
+        return ["{} {} ({})".format(self.verb, relpath, self.content_type)]
+
+    def run(self):
+        client = self.plan.client
+        params = {
+            "Bucket": self.resource.bucket.name,
+            "Key": self.key,
+        }
+
+        if os.path.getsize(self.path) < MULTIPART_THRESHOLD:
+            with open(self.path, "rb") as fp:
+                client.put_object(
+                    Body=fp,
+                    ACL=self.resource.acl,
+                    CacheControl="max-age=0",
+                    ContentType=self.content_type,
+                    **params
+                )
+            return
+
+        upload = client.create_multipart_upload(
+            ACL=self.resource.acl,
+            CacheControl="max-age=0",
+            ContentType=self.content_type,
+            **params
+        )
+        params["UploadId"] = upload["UploadId"]
+
+        try:
+            parts = self.upload_parts(client, params)
+            client.complete_multipart_upload(MultipartUpload={"Parts": parts}, **params)
+        except BaseException:
+            client.abort_multipart_upload(**params)
+            raise
+
+    def upload_parts(self, client, params):
+        def upload_part(number, body):
+            response = client.upload_part(PartNumber=number, Body=body, **params)
+            return {"ETag": response["ETag"], "PartNumber": number}
+
+        parts = []
+        pending = collections.deque()
+        with ThreadPoolExecutor(self.part_workers) as executor:
+            with open(self.path, "rb") as fp:
+                number = 1
+                body = fp.read(PART_SIZE)
+                while body:
+                    # Only a few parts are held in memory at once
+                    if len(pending) >= self.part_workers:
+                        parts.append(pending.popleft().result())
+                    pending.append(executor.submit(upload_part, number, body))
+                    number += 1
+                    body = fp.read(PART_SIZE)
+            try:
+                while pending:
+                    parts.append(pending.popleft().result())
+            finally:
+                for future in pending:
+                    future.cancel()
+        return parts
+
+
 class Apply(SimpleApply, Describe):
 
     create_action = "put_object"
@@ -87,52 +339,65 @@ class Apply(SimpleApply, Describe):
 
     default_content_type = "application/octet-stream"
 
+    def upload_action(self, verb, path, content_type):
+        action = RetryAction(
+            self,
+            UploadFile(
+                self,
+                verb,
+                os.path.join(self.resource.source, path),
+                os.path.join(self.resource.name, path),
+                content_type,
+            ),
+        )
+        action.independent = True
+        return action
+
+    @cached_property
+    def hashes(self):
+        # Each folder has its own index, so syncing one folder doesn't mean
+        # loading the hashes of every other folder.
+        source = os.path.abspath(self.resource.source)
+        return FileHashes(
+            self.runner.cache,
+            "file_hashes_{}".format(hashlib.sha1(source.encode("utf-8")).hexdigest()),
+        )
+
+    def is_modified(self, path, stat, remote):
+        if stat.st_size != remote["Size"]:
+            return True
+        etag = remote["Md5"]
+        part_size = None
+        if "-" in etag:
+            part_size = get_part_size(stat.st_size, int(etag.split("-", 1)[1]))
+        return self.hashes.get_etag(path, part_size, stat) != etag
+
     def update_object(self):
         remote = {}
         local = {}
 
         base = self.resource.source
-        for root, dirs, files in os.walk(base):
-            for f in files:
-                path = os.path.join(root, f)
-                with open(path) as fp:
-                    h = hashlib.md5(fp.read())
-                local[os.path.relpath(path, base)] = {"Md5": h.hexdigest()}
+        for path, stat in walk(base):
+            local[path] = stat
 
         if self.runner.get_plan(self.resource.bucket).resource_id:
             remote = {k: v for k, v in self.get_folder_contents()}
 
-        for path in local:
+        for path in sorted(local):
             contenttype = mimetypes.guess_type(path)[0] or self.default_content_type
 
             if path not in remote:
-                yield self.generic_action(
-                    "Add {} ({})".format(path, contenttype),
-                    self.client.put_object,
-                    Key=os.path.join(self.resource.name, path),
-                    Body=open(os.path.join(base, path)).read(),
-                    ACL=self.resource.acl,
-                    Bucket=self.resource.bucket.name,
-                    CacheControl="max-age=0",
-                    ContentType=contenttype,
-                )
-            elif local[path]["Md5"] != remote[path]["Md5"]:
-                yield self.generic_action(
-                    "Update {} ({})".format(path, contenttype),
-                    self.client.put_object,
-                    Key=os.path.join(self.resource.name, path),
-                    Body=open(os.path.join(base, path)).read(),
-                    ACL=self.resource.acl,
-                    Bucket=self.resource.bucket.name,
-                    CacheControl="max-age=0",
-                    ContentType=contenttype,
-                )
+                yield self.upload_action("Add", path, contenttype)
+            elif self.is_modified(os.path.join(base, path), local[path], remote[path]):
+                yield self.upload_action("Update", path, contenttype)
 
-        for path in remote:
+        for path in sorted(remote):
             if path not in local:
-                yield self.generic_action(
+                yield self.independent_action(
                     "Remove {}".format(path),
                     self.client.delete_object,
                     Bucket=self.resource.bucket.name,
                     Key=os.path.join(self.resource.name, path),
                 )
+
+        self.hashes.save()
@@ -13,23 +13,68 @@
 # limitations under the License.
 
 import os
+import threading
 
-from botocore import session
+import botocore.session
 from dateutil import parser
 
-session = session.get_session()
+from . import retry
 
-# Provide our own botocore json to override (and increase) various timeouts
-session.get_component("data_loader")._search_paths[1:1] = [
-    os.path.join(os.path.dirname(__file__), "data")
-]
+_session = None
+_session_lock = threading.RLock()
 
-# Force botocore to initialise - this avoids race conditions around
-# get_component
-session.create_client("ec2", "eu-west-1")
+
+def get_session():
+    """ Returns the botocore session that all clients are created from.
+
+    botocore is slow to initialise, so this isn't done until the first time a
+    client is needed. That way goals that never talk to AWS start quickly. """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = botocore.session.get_session()
+
+            # Provide our own botocore json to override (and increase) various
+            # timeouts
+            session.get_component("data_loader")._search_paths[1:1] = [
+                os.path.join(os.path.dirname(__file__), "data")
+            ]
+
+            _session = session
+        return _session
+
+
+class ClientPool(object):
+
+    """ botocore clients are expensive to create - they load service models,
+    build endpoint resolvers and each gets its own pool of HTTP connections.
+    They are also safe to share between threads, so we keep one client per
+    set of credentials, region, service and API version. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients = {}
+
+    def get_client(self, key, create):
+        with self.lock:
+            if key not in self.clients:
+                self.clients[key] = create()
+            return self.clients[key]
+
+    def clear(self):
+        with self.lock:
+            self.clients = {}
+
+
+client_pool = ClientPool()
 
 
 class Session(object):
+
+    # Reuse clients between plans. Tests turn this off so that each plan can
+    # be stubbed on its own.
+    pool_clients = True
+
     def __init__(
         self, access_key_id, secret_access_key, session_token, expiration, region
     ):
@@ -40,14 +85,36 @@ class Session(object):
         self.region = region
 
     def create_client(self, service, api_version=None):
-        return session.create_client(
-            service_name=service,
-            region_name=self.region,
-            api_version=api_version,
-            aws_access_key_id=self.access_key_id,
-            aws_secret_access_key=self.secret_access_key,
-            aws_session_token=self.session_token,
+        if not self.pool_clients:
+            return self._create_client(service, api_version)
+
+        key = (
+            self.access_key_id,
+            self.secret_access_key,
+            self.session_token,
+            self.region,
+            service,
+            api_version,
         )
+        return client_pool.get_client(
+            key, lambda: self._create_client(service, api_version)
+        )
+
+    def _create_client(self, service, api_version=None):
+        # botocore lazily sets up shared components (e.g. via get_component)
+        # when a client is created, and that isn't safe to do from more than
+        # one thread at once.
+        with _session_lock:
+            client = get_session().create_client(
+                service_name=service,
+                region_name=self.region,
+                api_version=api_version,
+                aws_access_key_id=self.access_key_id,
+                aws_secret_access_key=self.secret_access_key,
+                aws_session_token=self.session_token,
+            )
+        retry.install(client)
+        return client
 
     def tojson(self):
         return {
@@ -39,6 +39,7 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_customer_gateways"
     describe_envelope = "CustomerGateways"
+    describe_batch_filter = "tag:Name"
     key = "CustomerGatewayId"
 
     def get_describe_filters(self):
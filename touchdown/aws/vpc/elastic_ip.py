@@ -39,6 +39,8 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_addresses"
     describe_envelope = "Addresses"
+    describe_batch_filter = "public-ip"
+    describe_batch_field = "PublicIp"
     key = "PublicIp"
 
     signature = (Present("name"), Present("public_ip"))
@@ -50,6 +50,8 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_vpc_endpoints"
     describe_envelope = "VpcEndpoints"
+    describe_batch_filter = "vpc-endpoint-id"
+    describe_batch_field = "VpcEndpointId"
     key = "VpcEndpointId"
 
     def get_describe_filters(self):
@@ -36,6 +36,7 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_internet_gateways"
     describe_envelope = "InternetGateways"
+    describe_batch_filter = "tag:Name"
     key = "InternetGatewayId"
 
     def get_describe_filters(self):
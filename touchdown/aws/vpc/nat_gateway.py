@@ -43,6 +43,8 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_nat_gateways"
     describe_envelope = "NatGateways"
+    describe_batch_filter = "subnet-id"
+    describe_batch_field = "SubnetId"
     key = "NatGatewayId"
     signature = ()
 
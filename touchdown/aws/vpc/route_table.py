@@ -60,6 +60,7 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_route_tables"
     describe_envelope = "RouteTables"
+    describe_batch_filter = "tag:Name"
     key = "RouteTableId"
 
     def get_describe_filters(self):
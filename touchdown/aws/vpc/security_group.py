@@ -132,6 +132,8 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_security_groups"
     describe_envelope = "SecurityGroups"
+    describe_batch_filter = "group-name"
+    describe_batch_field = "GroupName"
     key = "GroupId"
 
     def get_describe_filters(self):
@@ -51,6 +51,8 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_subnets"
     describe_envelope = "Subnets"
+    describe_batch_filter = "cidrBlock"
+    describe_batch_field = "CidrBlock"
     key = "SubnetId"
 
     signature = (Present("name"), Present("vpc"), Present("cidr_block"))
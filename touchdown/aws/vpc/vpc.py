@@ -56,6 +56,7 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_vpcs"
     describe_envelope = "Vpcs"
+    describe_batch_filter = "tag:Name"
     key = "VpcId"
 
     def get_describe_filters(self):
@@ -51,6 +51,7 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_vpn_connections"
     describe_envelope = "VpnConnections"
+    describe_batch_filter = "tag:Name"
     key = "VpnConnectionId"
 
     def get_describe_filters(self):
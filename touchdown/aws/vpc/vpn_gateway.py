@@ -72,6 +72,7 @@ class Describe(SimpleDescribe, Plan):
     api_version = "2015-10-01"
     describe_action = "describe_vpn_gateways"
     describe_envelope = "VpnGateways"
+    describe_batch_filter = "tag:Name"
     key = "VpnGatewayId"
 
     def get_describe_filters(self):
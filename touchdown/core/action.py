@@ -14,6 +14,16 @@
 
 
 class Action(object):
+
+    # A rough guess at how many seconds this action takes to run. This is
+    # used to start slow resources as early as possible.
+    expected_duration = 1
+
+    # An independent action doesn't need the actions before it to have
+    # finished, and nothing after it needs it to have finished either. A run
+    # of independent actions may be carried out concurrently.
+    independent = False
+
     def __init__(self, plan):
         self.plan = plan
         self.runner = plan.runner
@@ -24,3 +34,30 @@ class Action(object):
 
     def __str__(self):
         return "\n".join(self.description)
+
+
+class PollingAction(Action):
+
+    """ An action that spends most of its time waiting for remote state to
+    change.
+
+    ``steps`` does the work of the action and yields a ``Wait`` whenever it
+    needs to wait for something. ``run`` waits on the current thread, but a
+    goal can hand the waits to a ``Poller`` instead. """
+
+    def steps(self):
+        raise NotImplementedError(self.steps)
+
+    def run(self):
+        steps = self.steps()
+        try:
+            wait = next(steps)
+            while True:
+                try:
+                    wait.wait()
+                except Exception as e:
+                    wait = steps.throw(e)
+                else:
+                    wait = next(steps)
+        except StopIteration:
+            pass
@@ -0,0 +1,98 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+
+class Batch(object):
+    def __init__(self):
+        self.requests = []
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Batcher(object):
+
+    """ Collects requests that share a key and services all of them with a
+    single call.
+
+    The first thread to submit a request for a key becomes the leader of a
+    batch. If other requests are in flight - being fetched by other threads
+    - then their threads are likely to submit more requests soon, so the
+    leader holds the batch open for up to ``window`` seconds. It stops
+    waiting as soon as nothing is in flight, so a lone request is fetched
+    straight away. The leader then calls ``fetch`` with every request in the
+    batch. ``fetch`` must return one result per request, in the same order.
+    Other threads just wait for their result. """
+
+    def __init__(self, window=0.05, max_size=100):
+        self.window = window
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.batches = {}
+        # Threads inside ``submit``, and how many of them are sitting in an
+        # open batch. Any others are waiting on a fetch.
+        self.active = 0
+        self.queued = 0
+
+    def close(self, batch_key):
+        # You must hold the lock
+        batch = self.batches.pop(batch_key)
+        self.queued -= len(batch.requests)
+
+    def wait_for_batch(self, batch_key, batch):
+        deadline = time.time() + self.window
+        with self.lock:
+            while self.batches.get(batch_key) is batch:
+                remaining = deadline - time.time()
+                if remaining <= 0 or self.active <= self.queued:
+                    self.close(batch_key)
+                    break
+                self.changed.wait(remaining)
+
+    def submit(self, batch_key, request, fetch):
+        with self.lock:
+            self.active += 1
+            batch = self.batches.get(batch_key)
+            leader = batch is None
+            if leader:
+                batch = self.batches[batch_key] = Batch()
+            index = len(batch.requests)
+            batch.requests.append(request)
+            self.queued += 1
+            if len(batch.requests) >= self.max_size:
+                self.close(batch_key)
+            self.changed.notify_all()
+
+        try:
+            if leader:
+                self.wait_for_batch(batch_key, batch)
+                try:
+                    batch.results = fetch(batch.requests)
+                except Exception as e:
+                    batch.error = e
+                batch.done.set()
+            else:
+                batch.done.wait()
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.changed.notify_all()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
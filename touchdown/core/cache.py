@@ -12,14 +12,45 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import contextlib
+import copy
 import json
 import os
 import string
+import tempfile
+import threading
+import time
 
 from touchdown.core import errors
 
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
 
 class Cache(object):
+
+    """ Base class for caches that map string keys to JSON-like values.
+
+    If ``ttl`` is set, entries older than that many seconds are treated as
+    missing. If ``max_entries`` is set, the least recently used entries are
+    evicted to keep the cache within that size. """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def is_fresh(self, created):
+        return self.ttl is None or created + self.ttl > time.time()
+
+    def get(self, cache_key, default=None):
+        try:
+            return self[cache_key]
+        except KeyError:
+            return default
+
     def __contains__(self, cache_key):
         raise NotImplementedError(self.__contains__)
 
@@ -29,12 +60,85 @@ class Cache(object):
     def __setitem__(self, cache_key, value):
         raise NotImplementedError(self.__setitem__)
 
+    def __delitem__(self, cache_key):
+        raise NotImplementedError(self.__delitem__)
+
+
+class SharedCache(Cache):
+
+    """ An in-memory cache for results that are expensive to fetch and are
+    shared between worker threads.
+
+    If several threads ask for the same missing key at once only one of them
+    fetches it - the rest wait for that result. Callers always get a copy of
+    the cached value so they are free to modify it. """
+
+    def __init__(self):
+        super(SharedCache, self).__init__()
+        self.lock = threading.Lock()
+        self.results = {}
+        self.pending = {}
+
+    def __contains__(self, cache_key):
+        with self.lock:
+            return cache_key in self.results
+
+    def __getitem__(self, cache_key):
+        with self.lock:
+            return copy.deepcopy(self.results[cache_key])
+
+    def __setitem__(self, cache_key, value):
+        with self.lock:
+            self.results[cache_key] = value
+
+    def __delitem__(self, cache_key):
+        with self.lock:
+            del self.results[cache_key]
+
+    def get_or_fetch(self, cache_key, fetch):
+        with self.lock:
+            if cache_key in self.results:
+                return copy.deepcopy(self.results[cache_key])
+            event = self.pending.get(cache_key)
+            owner = event is None
+            if owner:
+                event = self.pending[cache_key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            with self.lock:
+                if cache_key in self.results:
+                    return copy.deepcopy(self.results[cache_key])
+            # Whoever was fetching failed. Try again so that this caller gets
+            # the error too.
+            return fetch()
+
+        try:
+            value = fetch()
+            with self.lock:
+                self.results[cache_key] = value
+        finally:
+            with self.lock:
+                del self.pending[cache_key]
+            event.set()
+
+        return copy.deepcopy(value)
+
 
 class FileCache(Cache):
 
+    """ Stores each entry in its own file.
+
+    Entries are written to a temporary file that is then renamed into place,
+    so concurrent runs never see a partially written entry. The modification
+    time of a file is when it was written and its access time is updated
+    whenever it is read, which is used for ``ttl`` and ``max_entries``
+    respectively. """
+
     extension = ""
 
-    def __init__(self, cache_directory):
+    def __init__(self, cache_directory, ttl=None, max_entries=None):
+        super(FileCache, self).__init__(ttl=ttl, max_entries=max_entries)
         self.cache_directory = cache_directory
 
     def _ensure_cache_directory_exists(self):
@@ -53,13 +157,50 @@ class FileCache(Cache):
     def _deserialize(self, contents):
         raise NotImplementedError(self._deserialize)
 
+    def _stat(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not self.is_fresh(stat.st_mtime):
+            return None
+        return stat
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        entries = []
+        for name in os.listdir(self.cache_directory):
+            if name.startswith(".") or not name.endswith(self.extension):
+                continue
+            path = os.path.join(self.cache_directory, name)
+            try:
+                entries.append((os.stat(path).st_atime, path))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries :]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
     def __contains__(self, cache_key):
-        return os.path.isfile(self._cache_key_to_path(cache_key))
+        return self._stat(self._cache_key_to_path(cache_key)) is not None
 
     def __getitem__(self, cache_key):
         path = self._cache_key_to_path(cache_key)
-        with open(path, "r") as fp:
-            return self._deserialize(fp.read())
+        stat = self._stat(path)
+        if stat is None:
+            raise KeyError(cache_key)
+        try:
+            with open(path, "r") as fp:
+                contents = fp.read()
+        except (IOError, OSError):
+            raise KeyError(cache_key)
+        if self.max_entries:
+            os.utime(path, (time.time(), stat.st_mtime))
+        return self._deserialize(contents)
 
     def __setitem__(self, cache_key, value):
         path = self._cache_key_to_path(cache_key)
@@ -67,9 +208,23 @@ class FileCache(Cache):
 
         self._ensure_cache_directory_exists()
 
-        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
-        with os.fdopen(fd, "w") as f:
-            f.write(contents)
+        # mkstemp creates the file readable by the current user only
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_directory, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(contents)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self._evict()
+
+    def __delitem__(self, cache_key):
+        try:
+            os.remove(self._cache_key_to_path(cache_key))
+        except OSError:
+            raise KeyError(cache_key)
 
 
 class JSONFileCache(FileCache):
@@ -87,3 +242,224 @@ class JSONFileCache(FileCache):
             return json.loads(contents)
         except (ValueError,):
             raise errors.Error("'%s' cannot be deserialised" % contents)
+
+
+class SQLiteCache(Cache):
+
+    """ Stores every entry in a single SQLite database.
+
+    SQLite takes care of locking, so several touchdown processes can share
+    the same database. A connection is opened for each operation as they
+    can't be shared between threads. The database is only readable by the
+    current user, as it can hold credentials.
+
+    Entries that are missing are looked for in the ``legacy`` cache, if
+    there is one, and moved into the database when they are found. """
+
+    def __init__(self, path, ttl=None, max_entries=None, legacy=None):
+        super(SQLiteCache, self).__init__(ttl=ttl, max_entries=max_entries)
+        self.path = path
+        self.legacy = legacy
+        self.created = False
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if not self.created:
+            # SQLite would create the file world readable. Its journal files
+            # are given the same permissions as the database.
+            os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600))
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self.created:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+            self.created = True
+        return contextlib.closing(connection)
+
+    def _cutoff(self):
+        if self.ttl is None:
+            return 0
+        return time.time() - self.ttl
+
+    def _exists(self):
+        # Don't create a database just to find out that it is empty
+        return self.created or os.path.exists(self.path)
+
+    def _migrate(self, cache_key):
+        """ Move an entry from the legacy cache into the database, returning
+        True if there was one """
+        if self.legacy is None or cache_key not in self.legacy:
+            return False
+        try:
+            value = self.legacy[cache_key]
+        except (KeyError, errors.Error):
+            return False
+        self[cache_key] = value
+        try:
+            del self.legacy[cache_key]
+        except KeyError:
+            pass
+        return True
+
+    def __contains__(self, cache_key):
+        if self._exists():
+            with self._connect() as connection:
+                row = connection.execute(
+                    "SELECT 1 FROM cache WHERE key = ? AND created >= ?",
+                    (cache_key, self._cutoff()),
+                ).fetchone()
+            if row is not None:
+                return True
+        return self._migrate(cache_key)
+
+    def _read(self, cache_key):
+        if not self._exists():
+            return None
+        with self._connect() as connection, connection:
+            row = connection.execute(
+                "SELECT value FROM cache WHERE key = ? AND created >= ?",
+                (cache_key, self._cutoff()),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), cache_key)
+            )
+        return row[0]
+
+    def __getitem__(self, cache_key):
+        contents = self._read(cache_key)
+        if contents is None and self._migrate(cache_key):
+            contents = self._read(cache_key)
+        if contents is None:
+            raise KeyError(cache_key)
+        try:
+            return json.loads(contents)
+        except ValueError:
+            raise errors.Error("'%s' cannot be deserialised" % contents)
+
+    def __setitem__(self, cache_key, value):
+        try:
+            contents = json.dumps(value)
+        except (TypeError, ValueError):
+            raise errors.Error("'%s' cannot be serialised" % value)
+
+        now = time.time()
+        with self._connect() as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (cache_key, contents, now, now),
+            )
+            if self.ttl is not None:
+                connection.execute(
+                    "DELETE FROM cache WHERE created < ?", (self._cutoff(),)
+                )
+            if self.max_entries:
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def __delitem__(self, cache_key):
+        found = False
+        if self._exists():
+            with self._connect() as connection, connection:
+                cursor = connection.execute(
+                    "DELETE FROM cache WHERE key = ?", (cache_key,)
+                )
+                found = bool(cursor.rowcount)
+        if self.legacy is not None:
+            try:
+                del self.legacy[cache_key]
+                found = True
+            except KeyError:
+                pass
+        if not found:
+            raise KeyError(cache_key)
+
+
+class MemoryCache(Cache):
+
+    """ Keeps entries in memory, optionally in front of a slower ``backend``
+    cache.
+
+    Reads are served from memory where possible and fall back to the
+    backend. Writes go to both. """
+
+    def __init__(self, ttl=None, max_entries=None, backend=None):
+        super(MemoryCache, self).__init__(ttl=ttl, max_entries=max_entries)
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+
+    def _store(self, cache_key, value):
+        with self.lock:
+            self.entries[cache_key] = (time.time(), copy.deepcopy(value))
+            self.entries.move_to_end(cache_key)
+            while self.max_entries and len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _lookup(self, cache_key):
+        with self.lock:
+            entry = self.entries.get(cache_key)
+            if entry is None:
+                return False, None
+            if not self.is_fresh(entry[0]):
+                del self.entries[cache_key]
+                return False, None
+            self.entries.move_to_end(cache_key)
+            return True, copy.deepcopy(entry[1])
+
+    def __contains__(self, cache_key):
+        found, _ = self._lookup(cache_key)
+        if found:
+            return True
+        return self.backend is not None and cache_key in self.backend
+
+    def __getitem__(self, cache_key):
+        found, value = self._lookup(cache_key)
+        if found:
+            return value
+        if self.backend is None:
+            raise KeyError(cache_key)
+        value = self.backend[cache_key]
+        self._store(cache_key, value)
+        return value
+
+    def __setitem__(self, cache_key, value):
+        if self.backend is not None:
+            self.backend[cache_key] = value
+        self._store(cache_key, value)
+
+    def __delitem__(self, cache_key):
+        with self.lock:
+            found = self.entries.pop(cache_key, None) is not None
+        if self.backend is not None:
+            try:
+                del self.backend[cache_key]
+                found = True
+            except KeyError:
+                pass
+        if not found:
+            raise KeyError(cache_key)
+
+
+def get_default_cache(directory="~/.touchdown"):
+    """ The cache used for things that should persist between runs, such as
+    MFA sessions """
+    directory = os.path.expanduser(directory)
+    legacy = JSONFileCache(directory)
+    if sqlite3 is None:
+        return legacy
+    # Entries cached by older versions are moved into the database as they
+    # are used.
+    return MemoryCache(
+        backend=SQLiteCache(os.path.join(directory, "cache.sqlite3"), legacy=legacy)
+    )
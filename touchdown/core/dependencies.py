@@ -12,74 +12,169 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import copy
+import heapq
+import itertools
+
 from . import errors
 
 
-class DependencyMap(object):
+class DependencyGraph(object):
 
-    """ If ``tips_first`` is set then the least dependended up nodes will be
-    visited first. This is useful if you are deleting all nodes - for example,
-    you need to delete subnets before you can delete the VPC they are in.
+    """ The dependency edges reachable from ``node``, collected in a single
+    breadth first walk. ``forward`` maps every node to the nodes it depends
+    on and ``backward`` maps every node to the nodes that depend on it.
 
-    If ``tips_first`` is False then the most dependended upon nodes will be
-    visited first. This is the default, and is used when creating and apply
-    changes - a VPC needs to exist before you can create a subnet in it.
+    A graph is never modified once built, so it can be shared by as many
+    ``DependencyMap`` instances as needed.
     """
 
-    def __init__(self, node, tips_first=False):
+    def __init__(self, node):
         self.node = node
-        self.tips_first = tips_first
-        self.map = {}
+        self.forward = {}
+        self.backward = {}
         self._prepare()
 
-    def _add_dependency(self, node, dep):
-        if self.tips_first:
-            self.map.setdefault(dep, set()).add(node)
-        else:
-            self.map.setdefault(node, set()).add(dep)
-
     def _prepare(self):
-        queue = [self.node]
-        visiting = set()
-        visited = set()
+        queue = collections.deque([self.node])
+        seen = set([self.node])
 
         while queue:
-            node = queue.pop(0)
-            visiting.add(node)
+            node = queue.popleft()
 
-            self.map.setdefault(node, set())
+            self.forward.setdefault(node, set())
+            self.backward.setdefault(node, set())
 
             for dep in node.dependencies:
-                if dep in visiting:
+                if dep == node:
                     raise errors.CycleError(
                         "Circular reference between %s and %s" % (node, dep)
                     )
-                self._add_dependency(node, dep)
-                if dep not in visited and dep not in queue:
+                self.forward[node].add(dep)
+                self.backward.setdefault(dep, set()).add(node)
+                if dep not in seen:
+                    seen.add(dep)
+                    queue.append(dep)
+
+    def closure(self, nodes, reverse=False):
+        """ Returns ``nodes`` along with everything they depend on, or with
+        everything that depends on them if ``reverse`` is set """
+        edges = self.backward if reverse else self.forward
+        queue = collections.deque(nodes)
+        seen = set(queue)
+        while queue:
+            for dep in edges[queue.popleft()]:
+                if dep not in seen:
+                    seen.add(dep)
                     queue.append(dep)
+        return seen
+
+    def subgraph(self, nodes):
+        """ Returns a graph of just ``nodes`` and the edges between them """
+        nodes = set(nodes)
+        graph = copy.copy(self)
+        graph.forward = dict((node, self.forward[node] & nodes) for node in nodes)
+        graph.backward = dict((node, self.backward[node] & nodes) for node in nodes)
+        return graph
+
+
+class DependencyMap(object):
+
+    """ If ``tips_first`` is set then the least dependended up nodes will be
+    visited first. This is useful if you are deleting all nodes - for example,
+    you need to delete subnets before you can delete the VPC they are in.
+
+    If ``tips_first`` is False then the most dependended upon nodes will be
+    visited first. This is the default, and is used when creating and apply
+    changes - a VPC needs to exist before you can create a subnet in it.
+
+    ``map`` holds the nodes that each node is waiting for and ``dependents``
+    is the reverse index. Both come from a ``DependencyGraph``, which can be
+    passed in to avoid walking the resources again. Progress is tracked with
+    a counter of incomplete dependencies per node, so completing a node only
+    has to visit the nodes that depend on it.
+
+    If a ``weight`` callable is given it should return the expected cost of
+    visiting a node. Ready nodes are then handed out in order of the most
+    expensive path that they block, so that long chains of slow nodes are
+    started as early as possible.
+    """
 
-            visiting.remove(node)
-            visited.add(node)
+    def __init__(self, node, tips_first=False, graph=None, weight=None):
+        self.node = node
+        self.tips_first = tips_first
+        self.weight = weight
+        if graph is None:
+            graph = DependencyGraph(node)
+        self.graph = graph
+        if self.tips_first:
+            self.map, self.dependents = graph.backward, graph.forward
+        else:
+            self.map, self.dependents = graph.forward, graph.backward
+        self._index()
+
+    def _index(self):
+        self._counter = itertools.count()
+        self.priority = {}
+        if self.weight:
+            self._prioritise()
+
+        self.waiting = {}
+        self.ready = []
+        for node, deps in self.map.items():
+            self.waiting[node] = len(deps)
+            if not deps:
+                self._push_ready(node)
+
+    def _prioritise(self):
+        """ Work out the cost of the most expensive path from each node to
+        the end of the graph """
+        waiting = dict((node, len(deps)) for node, deps in self.map.items())
+        order = [node for node, count in waiting.items() if not count]
+        for node in order:
+            for dependent in self.dependents.get(node, ()):
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    order.append(dependent)
+
+        for node in reversed(order):
+            downstream = [
+                self.priority[dependent]
+                for dependent in self.dependents.get(node, ())
+                if dependent in self.priority
+            ]
+            self.priority[node] = self.weight(node) + max(downstream or [0])
+
+    def _push_ready(self, node):
+        heapq.heappush(
+            self.ready,
+            (-self.priority.get(node, 0), str(node), next(self._counter), node),
+        )
 
     def items(self):
         return self.map.items()
 
     def get_ready(self):
-        """ Yields resources that are ready to be applied """
-        for node, deps in self.map.items():
-            if not deps:
+        """ Yields resources that are ready to be applied. Each resource is
+        only yielded once - it is up to the caller to ``complete`` it. """
+        while self.ready:
+            node = heapq.heappop(self.ready)[-1]
+            if node in self.waiting:
                 yield node
 
     def complete(self, node):
         """ Marks a node as complete - it's dependents may proceed """
-        del self.map[node]
-        for deps in self.map.values():
-            deps.difference_update((node,))
+        del self.waiting[node]
+        for dependent in self.dependents.get(node, ()):
+            self.waiting[dependent] -= 1
+            if not self.waiting[dependent]:
+                self._push_ready(dependent)
 
     def all(self):
         """ Visits all remaining nodes in order immediately """
-        while self.map:
-            ready = sorted(list(self.get_ready()))
+        while self.waiting:
+            ready = list(self.get_ready())
             if not ready:
                 return
 
@@ -91,4 +186,4 @@ class DependencyMap(object):
         return len(self) == 0
 
     def __len__(self):
-        return len(self.map)
+        return len(self.waiting)
@@ -14,10 +14,9 @@
 
 from __future__ import division
 
-import os
-
 from . import dependencies, errors, map
-from .cache import JSONFileCache
+from .cache import get_default_cache
+from .selectors import Walker
 
 
 class GoalFactory(object):
@@ -30,12 +29,12 @@ class GoalFactory(object):
     def registered(self):
         return self.goals.items()
 
-    def create(self, name, workspace, ui, map=map.ParallelMap):
+    def create(self, name, workspace, ui, map=map.ParallelMap, cache=None):
         try:
             goal_class = self.goals[name]
         except KeyError:
             raise errors.Error('No such goal "{}"'.format(name))
-        return goal_class(workspace, ui, map=map)
+        return goal_class(workspace, ui, map=map, cache=cache)
 
 
 class Goal(object):
@@ -43,21 +42,45 @@ class Goal(object):
     execute_in_reverse = False
     mutator = False
 
-    def __init__(self, workspace, ui, map=map.ParallelMap, cache=None):
+    def __init__(
+        self,
+        workspace,
+        ui,
+        map=map.ParallelMap,
+        cache=None,
+        workers=None,
+        concurrency=None,
+    ):
         self.ui = ui
         self.cache = cache
         if not self.cache:
-            self.cache = JSONFileCache(os.path.expanduser("~/.touchdown"))
+            self.cache = get_default_cache()
         self.workspace = workspace
         self.resources = {}
         self.Map = map
+        self.workers = workers
+        self.concurrency = concurrency or {}
+        self._walker = None
 
     @classmethod
     def setup_argparse(cls, parser):
         pass
 
+    def get_walker(self):
+        if self._walker is None:
+            # Workspace.load builds a walker - but tests often skip that.
+            self._walker = getattr(self.workspace, "resources", None)
+            if self._walker is None:
+                self._walker = Walker(self.workspace)
+        return self._walker
+
+    def get_dependency_graph(self):
+        return self.get_walker().graph
+
     def get_plan_order(self):
-        return dependencies.DependencyMap(self.workspace, tips_first=False)
+        return dependencies.DependencyMap(
+            self.workspace, tips_first=False, graph=self.get_dependency_graph()
+        )
 
     def get_plan_class(self, resource):
         raise NotImplementedError(self.get_plan_class)
@@ -76,37 +99,48 @@ class Goal(object):
             self.resources[service_key] = service
         return self.resources[service_key]
 
-    def get_execution_order(self):
+    def get_execution_order(self, weight=None):
         return dependencies.DependencyMap(
-            self.workspace, tips_first=self.execute_in_reverse
+            self.workspace,
+            tips_first=self.execute_in_reverse,
+            graph=self.get_dependency_graph(),
+            weight=weight,
         )
 
+    def get_concurrency_key(self, resource):
+        return getattr(self.get_plan(resource), "service_name", None)
+
     def visit(self, message, dep_map, callable):
         with self.ui.progressbar(max_value=len(dep_map)) as pb:
-            for status in self.Map(self.ui, dep_map, callable):
+            for status in self.Map(
+                self.ui,
+                dep_map,
+                callable,
+                workers=self.workers,
+                limits=self.concurrency,
+                key=self.get_concurrency_key,
+            ):
                 pb.update(status)
 
-    def collect_as_iterable(self, plan_name):
-        collected = []
-
-        def _(resource):
-            plan = self.get_plan(resource)
-            if plan.name == plan_name:
-                collected.append(plan)
-
-        self.visit("Building plan...", self.get_plan_order(), _)
-        return collected
-
-    def collect_as_dict(self, plan_name):
-        collected = {}
-
-        def _(resource):
-            plan = self.get_plan(resource)
-            if plan.name == plan_name:
-                collected[plan.resource.name] = plan
+    def collect_one(self, plan_name, name):
+        """ Returns the ``plan_name`` plan for the resource called ``name``,
+        or ``None`` if there isn't one. Only the plans for that resource and
+        the resources it depends on are built. """
+        resources = self.get_walker().named(name, plan_name)
+        if not resources:
+            return None
+        if len(resources) > 1:
+            raise errors.Error('More than one resource is called "{}"'.format(name))
+
+        resource = resources[0]
+        self.visit(
+            "Building plan...", dependencies.DependencyMap(resource), self.get_plan
+        )
 
-        self.visit("Building plan...", self.get_plan_order(), _)
-        return collected
+        plan = self.get_plan(resource)
+        if plan.name != plan_name:
+            return None
+        return plan
 
 
 goals = GoalFactory()
@@ -0,0 +1,142 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from dateutil import parser
+
+from . import errors, serializers
+
+logger = logging.getLogger(__name__)
+
+
+def encode(value):
+    """ Convert a botocore response into something that can be stored as
+    JSON """
+    if isinstance(value, dict):
+        return {k: encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    return value
+
+
+def decode(value):
+    if isinstance(value, dict):
+        if "__datetime__" in value:
+            return parser.parse(value["__datetime__"])
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        return {k: decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    return value
+
+
+def get_cache_key():
+    """ Incremental state is kept separately for each directory """
+    return "incremental_{}".format(
+        hashlib.sha1(os.getcwd().encode("utf-8")).hexdigest()
+    )
+
+
+class IncrementalState(object):
+
+    """ Remembers the remote state of every resource that was found not to
+    need any changes, along with a digest of its local definition.
+
+    A later run can reuse that state instead of describing the resource
+    again, as long as the definition hasn't changed and the state is younger
+    than ``ttl`` seconds. Anything that is changed is forgotten. """
+
+    def __init__(self, cache, ttl=600):
+        self.cache = cache
+        self.ttl = ttl
+        self.cache_key = get_cache_key()
+        self.lock = threading.Lock()
+        self.state = {}
+        self.changed = False
+
+        if self.cache_key in self.cache:
+            try:
+                self.state = self.cache[self.cache_key]
+            except errors.Error:
+                logger.debug("Ignoring unreadable incremental state")
+
+    def get_key(self, plan):
+        parts = []
+        resource = plan.resource
+        while resource is not None:
+            parts.append(str(resource))
+            resource = resource.parent
+        return "{}: {}".format(plan.name, " / ".join(reversed(parts)))
+
+    def get_digest(self, plan):
+        serializer = serializers.Resource()
+        try:
+            if serializer.pending(plan.runner, plan.resource):
+                return None
+            rendered = serializer.render(plan.runner, plan.resource)
+        except errors.Error:
+            return None
+        payload = json.dumps(rendered, sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def restore(self, plan):
+        """ Set ``plan.object`` from a previous run, returning False if that
+        isn't safe """
+        if not getattr(plan, "incremental", False):
+            return False
+
+        with self.lock:
+            entry = self.state.get(self.get_key(plan))
+        if not entry or time.time() - entry["saved"] > self.ttl:
+            return False
+        if entry["digest"] != self.get_digest(plan):
+            return False
+
+        plan.object = decode(entry["object"])
+        return True
+
+    def record(self, plan):
+        if not getattr(plan, "incremental", False):
+            return
+        digest = self.get_digest(plan)
+        if digest is None:
+            return
+        entry = {"digest": digest, "saved": time.time(), "object": encode(plan.object)}
+        with self.lock:
+            self.state[self.get_key(plan)] = entry
+            self.changed = True
+
+    def forget(self, plan):
+        with self.lock:
+            if self.state.pop(self.get_key(plan), None) is not None:
+                self.changed = True
+
+    def save(self):
+        with self.lock:
+            if self.changed:
+                self.cache[self.cache_key] = self.state
+                self.changed = False
@@ -20,6 +20,7 @@ import logging
 import sys
 
 from touchdown.core import errors, goals, map
+from touchdown.core.utils import positive_integer
 from touchdown.core.workspace import Touchdownfile
 from touchdown.frontends import ConsoleFrontend
 
@@ -31,7 +32,7 @@ class SubCommand(object):
         self.console = console
 
     def get_args_and_kwargs(self, callable, namespace):
-        argspec = inspect.getargspec(callable)
+        argspec = inspect.getfullargspec(callable)
         args = []
         for arg in argspec.args[1:]:
             args.append(getattr(namespace, arg))
@@ -39,7 +40,7 @@ class SubCommand(object):
             args.extend(getattr(namespace, argspec.varargs))
         kwargs = {}
         for k, v in namespace._get_kwargs():
-            if k not in argspec.args and argspec.keywords:
+            if k not in argspec.args and argspec.varkw:
                 kwargs[k] = v
         return args, kwargs
 
@@ -50,6 +51,8 @@ class SubCommand(object):
                 self.workspace,
                 self.console,
                 map.ParallelMap if not args.serial else map.SerialMap,
+                workers=args.workers,
+                concurrency=dict(args.concurrency),
             )
             self.console.start(self, g)
             args, kwargs = self.get_args_and_kwargs(g.execute, args)
@@ -61,9 +64,30 @@ class SubCommand(object):
             self.console.finish()
 
 
+def concurrency_limit(value):
+    service, _, limit = value.partition("=")
+    if not service:
+        raise argparse.ArgumentTypeError("{} is not SERVICE=LIMIT".format(value))
+    return service, positive_integer(limit)
+
+
 def configure_parser(parser, workspace, console):
     parser.add_argument("--debug", default=False, action="store_true")
     parser.add_argument("--serial", default=False, action="store_true")
+    parser.add_argument(
+        "--workers",
+        default=None,
+        type=positive_integer,
+        help="The number of resources to process in parallel",
+    )
+    parser.add_argument(
+        "--concurrency",
+        metavar="SERVICE=LIMIT",
+        default=[],
+        action="append",
+        type=concurrency_limit,
+        help="Limit how many resources for an AWS service are processed at once",
+    )
     parser.add_argument("--unattended", default=False, action="store_true")
 
     sub = parser.add_subparsers()
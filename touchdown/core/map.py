@@ -14,19 +14,38 @@
 
 from __future__ import division
 
+import collections
+import heapq
+import inspect
+import itertools
 import logging
 import threading
-import time
-
-from six.moves import queue
 
 from . import errors
 
 logger = logging.getLogger(__name__)
 
 
+def resume(generator, future=None):
+    """ Run ``generator`` until it yields the next future it is waiting for
+    and return that future, or ``None`` once it has finished. If ``future``
+    failed then its error is raised inside ``generator``. """
+    try:
+        if future is None:
+            return next(generator)
+        error = future.exception()
+        if error is not None:
+            return generator.throw(error)
+        return generator.send(future.result())
+    except StopIteration:
+        return None
+
+
 class SerialMap(object):
-    def __init__(self, ui, resources, callable):
+
+    parallel = False
+
+    def __init__(self, ui, resources, callable, **kwargs):
         self.ui = ui
         self.resources = resources
         self.callable = callable
@@ -35,73 +54,167 @@ class SerialMap(object):
     def __iter__(self):
         plan = list(self.resources.all())
         for current, resource in enumerate(plan):
-            self.callable(resource)
+            result = self.callable(resource)
+            if inspect.isgenerator(result):
+                future = resume(result)
+                while future is not None:
+                    future = resume(result, future)
             yield current
 
 
-class InteruptibleQueue(queue.Queue):
-    def _init(self, maxsize):
-        queue.Queue._init(self, maxsize)
-        self.stopped = False
-
-    def stop(self):
-        self.stopped = True
-
-    def __iter__(self):
-        while not self.stopped:
-            try:
-                yield self.get(timeout=1)
-                self.task_done()
-            except queue.Empty:
-                pass
+class ParallelMap(object):
 
+    """ Runs ``callable`` against every node of a ``DependencyMap`` using a
+    pool of worker threads. Nodes are handed to workers as soon as their
+    dependencies are complete.
 
-class QueueOnce(InteruptibleQueue):
-    def _init(self, maxsize):
-        InteruptibleQueue._init(self, maxsize)
-        self._items = set()
+    All scheduler state is guarded by a single condition variable so that
+    workers wake up as soon as new work is available and the consumer wakes
+    up as soon as work completes - there is no polling.
 
-    def _put(self, item):
-        if item not in self._items:
-            InteruptibleQueue._put(self, item)
-            self._items.add(item)
+    ``limits`` caps how many nodes that share a key may run at once, where
+    the key of a node is found by calling ``key``. A node that is over its
+    limit is left in the ready queue so that the worker can pick up
+    something else.
 
+    Ready nodes are handed out in order of their ``priority`` in the
+    ``DependencyMap``, so a node on the critical path isn't stuck behind
+    cheaper nodes that happened to become ready before it.
 
-class ParallelMap(object):
+    ``callable`` may also be a generator function that yields
+    ``concurrent.futures.Future`` objects. While a future is outstanding the
+    generator is parked and its worker moves on to other nodes. When the
+    future completes the generator is resumed by whichever worker is free
+    next. """
 
+    parallel = True
     workers = 8
-    ABORT = object()
+    STOP = object()
 
-    def __init__(self, ui, resources, callable):
+    def __init__(self, ui, resources, callable, workers=None, limits=None, key=None):
         self.ui = ui
         self.resources = resources
         self.callable = callable
-
-        self.ready = QueueOnce()
-        self.done = InteruptibleQueue()
+        if workers:
+            self.workers = workers
+        self.limits = limits or {}
+        self.key = key
+
+        self.condition = threading.Condition()
+        self.ready = []
+        self.counter = itertools.count()
+        self.queued = set()
+        self.keys = {}
+        self.running = collections.Counter()
+        self.done = collections.deque()
         self.active = set()
+        self.resumed = collections.deque()
+        self.parked = 0
+        self.stopped = False
+        self.threads = []
 
         self.total = len(self.resources)
         self.current = 0
 
+    def get_runnable(self):
+        skipped = []
+        resource = None
+        while self.ready:
+            entry = heapq.heappop(self.ready)
+            key = self.keys.get(entry[-1])
+            limit = self.limits.get(key)
+            if limit and self.running[key] >= limit:
+                skipped.append(entry)
+                continue
+            resource = entry[-1]
+            self.running[key] += 1
+            break
+        for entry in skipped:
+            heapq.heappush(self.ready, entry)
+        return resource
+
+    def get_work(self):
+        with self.condition:
+            while True:
+                # Work that has already started always comes first, even
+                # after we have been stopped.
+                if self.resumed:
+                    return self.resumed.popleft()
+                if not self.stopped:
+                    resource = self.get_runnable()
+                    if resource is not None:
+                        self.active.add(resource)
+                        return resource, None, None
+                elif not self.parked:
+                    return self.STOP
+                self.condition.wait()
+
+    def park(self, resource, generator, future):
+        with self.condition:
+            self.parked += 1
+        future.add_done_callback(
+            lambda future: self.unpark(resource, generator, future)
+        )
+
+    def unpark(self, resource, generator, future):
+        with self.condition:
+            self.parked -= 1
+            self.resumed.append((resource, generator, future))
+            self.condition.notify_all()
+
     def worker(self):
-        for resource in self.ready:
+        while True:
+            work = self.get_work()
+            if work is self.STOP:
+                return
+            resource, generator, future = work
+
             try:
-                self.active.add(resource)
-                try:
-                    self.callable(resource)
-                finally:
-                    self.active.remove(resource)
-                self.done.put(resource)
+                if generator is None:
+                    generator = self.callable(resource)
+                if inspect.isgenerator(generator):
+                    future = resume(generator, future)
+                    if future is not None:
+                        self.park(resource, generator, future)
+                        continue
+                result = resource
             except BaseException as e:
-                self.done.put(e)
-                continue
+                result = e
+
+            with self.condition:
+                self.active.discard(resource)
+                self.running[self.keys.get(resource)] -= 1
+                self.done.append(result)
+                self.condition.notify_all()
+
+    def schedule(self, resources):
+        resources = [r for r in resources if r not in self.queued]
+        keys = {}
+        if self.key and self.limits:
+            keys = dict((r, self.key(r)) for r in resources)
+
+        priority = getattr(self.resources, "priority", {})
+        with self.condition:
+            for resource in resources:
+                self.queued.add(resource)
+                self.keys[resource] = keys.get(resource)
+                heapq.heappush(
+                    self.ready,
+                    (-priority.get(resource, 0), next(self.counter), resource),
+                )
+            self.condition.notify_all()
 
     def pump_once(self):
-        try:
-            resource = self.done.get(timeout=1)
-        except queue.Empty:
-            return
+        with self.condition:
+            while not self.done:
+                if not self.ready and not self.active:
+                    raise errors.Error(
+                        "Unable to make progress - {} tasks are blocked".format(
+                            len(self.resources)
+                        )
+                    )
+                self.condition.wait()
+            resource = self.done.popleft()
 
         if isinstance(resource, BaseException):
             raise resource
@@ -109,27 +222,36 @@ class ParallelMap(object):
         self.current += 1
 
         self.resources.complete(resource)
-        for resource in self.resources.get_ready():
-            self.ready.put(resource)
-        self.done.task_done()
+        self.schedule(self.resources.get_ready())
 
     def pump(self):
-        # Now we block on the 'done' queue. Resources put in the queue are
+        # Now we block until a worker reports back. Resources reported are
         # complete - so we can inform the dep solver and ask for any new work
         # that this might unblock.
         while not self.resources.empty():
             self.pump_once()
             yield self.current
 
+    def stop(self):
+        # Pending work is cancelled, but anything a worker has already started
+        # is allowed to finish.
+        with self.condition:
+            self.stopped = True
+            self.ready.clear()
+            self.condition.notify_all()
+
     def wait_for_remaining(self):
         # No more dependencies to process - we just need to wait for any
         # remaining tasks to complete
         remaining = None
-        while len(self.active) > 0:
-            if len(self.active) != remaining:
+        while True:
+            with self.condition:
+                while self.active and len(self.active) == remaining:
+                    self.condition.wait()
                 remaining = len(self.active)
-                self.current = self.total - remaining
-            time.sleep(1)
+            if not remaining:
+                break
+            self.current = self.total - remaining
             yield self.current
 
     def __iter__(self):
@@ -139,11 +261,11 @@ class ParallelMap(object):
             for i in range(self.workers):
                 t = threading.Thread(target=self.worker, name="worker{}".format(i))
                 t.start()
+                self.threads.append(t)
 
             # Seed the workers with the initial batch of work
             # These are all the tasks that have no dependencies
-            for resource in self.resources.get_ready():
-                self.ready.put(resource)
+            self.schedule(self.resources.get_ready())
 
             for current in self.pump():
                 yield current
@@ -161,9 +283,11 @@ class ParallelMap(object):
             self.ui.echo("Unhandled error. Cleaning up.")
 
         finally:
+            self.stop()
             for current in self.wait_for_remaining():
                 yield current
-            self.ready.stop()
+            for t in self.threads:
+                t.join()
 
             if caught_error:
                 raise caught_error
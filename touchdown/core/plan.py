@@ -49,6 +49,11 @@ class Plan(six.with_metaclass(PlanType)):
     # Override this with a list of assertions
     signature = ()
 
+    # Set this to True if everything this plan needs to work out its actions
+    # is in the resource definition and ``object``. Incremental plans can then
+    # skip describing the resource if its definition hasn't changed.
+    incremental = False
+
     def __init__(self, runner, resource):
         super(Plan, self).__init__()
         self.runner = runner
@@ -0,0 +1,57 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import threading
+import types
+
+# The packages that define resources. Importing them registers their
+# resources with the workspace, and the AWS ones pull in botocore, so they
+# aren't imported until something actually needs a resource.
+PLUGINS = (
+    "touchdown.aws",
+    "touchdown.config",
+    "touchdown.gpg",
+    "touchdown.local",
+    "touchdown.notifications",
+    "touchdown.provisioner",
+    "touchdown.ssh",
+    "touchdown.template",
+)
+
+lock = threading.RLock()
+loaded = False
+
+
+def load():
+    global loaded
+    with lock:
+        if loaded:
+            return
+        for name in PLUGINS:
+            importlib.import_module(name)
+        loaded = True
+
+
+class PluginPackage(types.ModuleType):
+
+    """ The class of the ``touchdown`` package. Plugins that haven't been
+    imported yet are imported the first time they are used as an attribute
+    of it, so ``import touchdown; touchdown.aws`` still works. """
+
+    def __getattr__(self, name):
+        module = "{}.{}".format(self.__name__, name)
+        if module not in PLUGINS:
+            raise AttributeError(name)
+        return importlib.import_module(module)
@@ -0,0 +1,158 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from . import errors
+
+logger = logging.getLogger(__name__)
+
+
+class Wait(object):
+
+    """ Something an action is waiting for.
+
+    ``check`` is called until it returns ``True``, pausing for each of
+    ``delays`` in turn between calls. If ``delays`` runs out first then an
+    ``errors.Error`` is raised. """
+
+    def __init__(
+        self, check, delays, timeout_message="Operation took too long to complete"
+    ):
+        self.check = check
+        self.delays = iter(delays)
+        self.timeout_message = timeout_message
+
+    def next_delay(self):
+        try:
+            return next(self.delays)
+        except StopIteration:
+            raise errors.Error(self.timeout_message)
+
+    def wait(self):
+        """ Block the current thread until the condition is met """
+        while not self.check():
+            time.sleep(self.next_delay())
+
+
+class Poller(object):
+
+    """ Checks the condition of every outstanding ``Wait`` without tying up
+    the workers that are applying changes.
+
+    A single background thread keeps track of when each wait is next due and
+    hands the checks to a small pool of ``workers``, so one slow or throttled
+    describe call doesn't hold up every other wait. Each wait keeps its own
+    schedule and is never checked twice at once. The result is delivered
+    through a ``concurrent.futures.Future``. This means an action that spends
+    minutes waiting for remote state to settle doesn't hold on to a worker
+    thread while it does so. """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.condition = threading.Condition()
+        self.waits = []
+        self.counter = itertools.count()
+        self.stopped = False
+        self.thread = None
+        self.executor = None
+
+    def schedule(self, due, wait, future):
+        heapq.heappush(self.waits, (due, next(self.counter), wait, future))
+
+    def submit(self, wait):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self.condition:
+            if self.stopped:
+                raise errors.Error("Cannot wait for something after shutdown")
+            self.schedule(time.time(), wait, future)
+            if self.thread is None:
+                self.executor = ThreadPoolExecutor(self.workers)
+                self.thread = threading.Thread(target=self.run, name="poller")
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+        return future
+
+    def drive(self, steps):
+        """ Submit each ``Wait`` yielded by the generator ``steps``, yielding
+        a future for each one in turn. If a wait fails the error is raised
+        inside ``steps`` so that it can clean up. """
+        try:
+            wait = next(steps)
+            while True:
+                try:
+                    yield self.submit(wait)
+                except Exception as e:
+                    wait = steps.throw(e)
+                else:
+                    wait = next(steps)
+        except StopIteration:
+            return
+
+    def get_due(self):
+        with self.condition:
+            while True:
+                timeout = None
+                if self.waits:
+                    timeout = self.waits[0][0] - time.time()
+                    if timeout <= 0:
+                        return heapq.heappop(self.waits)
+                elif self.stopped:
+                    return None
+                self.condition.wait(timeout)
+
+    def run(self):
+        while True:
+            due = self.get_due()
+            if due is None:
+                return
+            _, _, wait, future = due
+            self.executor.submit(self.check, wait, future)
+
+    def check(self, wait, future):
+        try:
+            if wait.check():
+                future.set_result(None)
+                return
+            delay = wait.next_delay()
+        except BaseException as e:
+            future.set_exception(e)
+            return
+
+        with self.condition:
+            if not self.stopped:
+                self.schedule(time.time() + delay, wait, future)
+                self.condition.notify()
+                return
+        future.set_exception(errors.Error("Stopped waiting"))
+
+    def stop(self):
+        # Anything still waiting is failed so that whatever is blocked on it
+        # can unwind.
+        with self.condition:
+            self.stopped = True
+            waits, self.waits = self.waits, []
+            self.condition.notify_all()
+        for _, _, wait, future in waits:
+            future.set_exception(errors.Error("Stopped waiting"))
+        if self.thread is not None:
+            self.thread.join()
+            self.executor.shutdown()
@@ -0,0 +1,159 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import operator
+import re
+
+from touchdown.core import errors
+
+REGEX_PREDICATE = re.compile(r"^([\w()-]+?)(>=|<=|!=|=|>|<|~)(.*)$")
+
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Predicate(object):
+
+    """ A test against a single field of a record, such as ``sc-status>=500``.
+
+    Values are compared as numbers if they both look like numbers, and as
+    strings otherwise. ``~`` matches a regular expression. """
+
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.number = as_number(value)
+        if op == "~":
+            try:
+                self.regex = re.compile(value)
+            except re.error as e:
+                raise errors.Error(
+                    'Invalid regular expression "{}": {}'.format(value, e)
+                )
+
+    def matches(self, record):
+        actual = record.get(self.field)
+        if actual is None:
+            return False
+        if self.op == "~":
+            return self.regex.search(actual) is not None
+        if self.number is not None:
+            number = as_number(actual)
+            if number is not None:
+                return OPERATORS[self.op](number, self.number)
+        return OPERATORS[self.op](actual, self.value)
+
+
+def parse_predicates(expression, fields):
+    """ Parse a whitespace separated list of predicates. A record must match
+    all of them. """
+    predicates = []
+    for term in expression.split():
+        match = REGEX_PREDICATE.match(term)
+        if not match:
+            raise errors.Error('Invalid filter "{}"'.format(term))
+        field, op, value = match.groups()
+        if field not in fields:
+            raise errors.Error(
+                'Unknown field "{}". Choose from: {}'.format(field, ", ".join(fields))
+            )
+        predicates.append(Predicate(field, op, value))
+    return predicates
+
+
+class Query(object):
+
+    """ What to do with the records being tailed.
+
+    ``expression`` filters the records - each tailer decides what that means,
+    ideally by passing it on to AWS. If ``group_by`` or ``per_minute`` are set
+    then records are counted as they stream past instead of being shown, and
+    a summary is shown at the end. """
+
+    def __init__(self, expression=None, group_by=None, top=10, per_minute=False):
+        self.expression = expression
+        self.group_by = group_by
+        self.top = top
+        self.per_minute = per_minute
+
+    def is_aggregate(self):
+        return bool(self.group_by or self.per_minute)
+
+    def check_group_by(self, fields):
+        if self.group_by and self.group_by not in fields:
+            raise errors.Error(
+                'Unknown field "{}". Choose from: {}'.format(
+                    self.group_by, ", ".join(fields)
+                )
+            )
+
+    def get_aggregate(self):
+        return Aggregate(self.group_by, self.top, self.per_minute)
+
+
+class Aggregate(object):
+
+    """ Counts records in a single pass.
+
+    Only the most common ``capacity`` values of ``group_by`` are kept. When
+    there are more than that the rarest are dropped, so memory use is bounded
+    but the counts of values near the bottom of the table can be low. """
+
+    capacity = 10000
+
+    def __init__(self, group_by=None, top=10, per_minute=False):
+        self.group_by = group_by
+        self.top = top
+        self.per_minute = per_minute
+        self.total = 0
+        self.counts = collections.Counter()
+        self.minutes = collections.Counter()
+
+    def add(self, record, minute):
+        self.total += 1
+        if self.per_minute:
+            self.minutes[minute] += 1
+        if self.group_by:
+            self.counts[record.get(self.group_by, "")] += 1
+            if len(self.counts) > self.capacity * 2:
+                self.counts = collections.Counter(
+                    dict(self.counts.most_common(self.capacity))
+                )
+
+    def report(self, echo):
+        echo("{} matching records".format(self.total))
+        if self.per_minute:
+            echo("")
+            for minute in sorted(self.minutes):
+                echo("{}  {:>8}".format(minute, self.minutes[minute]))
+        if self.group_by:
+            echo("")
+            echo("Top {} by {}:".format(self.top, self.group_by))
+            for value, count in self.counts.most_common(self.top):
+                echo("{:>8}  {}".format(count, value))
@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from touchdown.core.dependencies import DependencyMap
+import collections
+
+import six
+
+from touchdown.core.dependencies import DependencyGraph, DependencyMap
 
 
 class DoesNotExist(Exception):
@@ -82,16 +86,16 @@ class Outgoing(Traversal):
         return True
 
     def _get_matches(self):
-        queue = list(self.parent.resolve())
-        visited = set()
+        queue = collections.deque(self.parent.resolve())
+        seen = set(queue)
         while queue:
-            node = queue.pop(0)
+            node = queue.popleft()
             for dep in self.root.backward.map[node]:
-                if dep not in visited and dep not in queue:
+                if dep not in seen:
+                    seen.add(dep)
                     queue.append(dep)
             if self.matches(node):
                 yield node
-            visited.add(node)
 
 
 class AdjacentIncoming(Traversal):
@@ -111,8 +115,34 @@ class AdjacentOutgoing(Traversal):
 class Walker(object):
     def __init__(self, workspace):
         self.workspace = workspace
-        self.forward = DependencyMap(workspace)
-        self.backward = DependencyMap(workspace, True)
+        self.graph = DependencyGraph(workspace)
+        self.forward = DependencyMap(workspace, graph=self.graph)
+        self.backward = DependencyMap(workspace, True, graph=self.graph)
+        self.by_name = self._index_names()
+
+    def _index_names(self):
+        by_name = collections.defaultdict(list)
+        for node in self.graph.forward:
+            name = getattr(node, "name", None)
+            if isinstance(name, six.string_types):
+                by_name[name].append(node)
+        return by_name
+
+    def named(self, name, plan_name=None):
+        """ Returns the resources called ``name``. If ``plan_name`` is given
+        only resources that have a plan of that name are returned. """
+        return [
+            node
+            for node in self.by_name.get(name, ())
+            if not plan_name or node.meta.get_plan(plan_name)
+        ]
+
+    def names(self, plan_name):
+        """ Returns the names of all resources that have a plan called
+        ``plan_name`` """
+        return sorted(
+            name for name in self.by_name if len(self.named(name, plan_name)) > 0
+        )
 
     def starting_at(self, *nodes):
         retval = Traversal(self, None)
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+
 import six
 
 
@@ -41,6 +43,16 @@ def force_bytes(s):
     raise ValueError("Not a string")
 
 
+def positive_integer(value):
+    try:
+        integer = int(value)
+    except ValueError:
+        integer = 0
+    if integer < 1:
+        raise argparse.ArgumentTypeError("{} is not a positive integer".format(value))
+    return integer
+
+
 class cached_property(object):
     def __init__(self, func):
         self.__doc__ = getattr(func, "__doc__")
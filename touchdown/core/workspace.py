@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from . import plugins
 from .resource import Resource
 from .selectors import Walker
 
@@ -28,7 +29,20 @@ class Workspace(Resource):
     def workspace(self):
         return self
 
+    def __getattr__(self, name):
+        # Factories like ``add_aws`` are added to the workspace by the plugins
+        # that define them, so make sure they have been loaded.
+        if name.startswith("add_") and not plugins.loaded:
+            try:
+                plugins.load()
+            except AttributeError as e:
+                # Raised from here it would look like ``name`` was missing
+                raise ImportError("Unable to load plugins: {}".format(e)) from e
+            return getattr(self, name)
+        raise AttributeError(name)
+
     def load(self):
+        plugins.load()
         self.resources = Walker(self)
 
 
@@ -37,6 +51,7 @@ class Touchdownfile(Workspace):
     resource_name = "touchdown_file"
 
     def load(self):
+        plugins.load()
         g = {"workspace": self}
         with open("Touchdownfile") as f:
             code = compile(f.read(), "Touchdownfile", "exec")
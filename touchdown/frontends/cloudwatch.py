@@ -12,38 +12,70 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import calendar
-import datetime
+import logging
 import threading
 import time
 
-from botocore.exceptions import ClientError
 from six.moves import queue
 
 from .base import BaseFrontend
 from .progress import ProgressBar
 
+logger = logging.getLogger(__name__)
+
+# The limits of the PutLogEvents API. The size of a batch is the size of its
+# messages in UTF-8 plus EVENT_OVERHEAD bytes for each event.
+MAX_BATCH_BYTES = 1048576
+MAX_BATCH_EVENTS = 10000
+EVENT_OVERHEAD = 26
+MAX_EVENT_BYTES = 262144 - EVENT_OVERHEAD
+
+STOP = object()
+
+
+def get_event_size(event):
+    return len(event["message"].encode("utf-8")) + EVENT_OVERHEAD
+
 
 class CloudWatchFrontend(BaseFrontend):
+
+    """ Ships everything that is echoed to a CloudWatch log stream.
+
+    Events are sent in batches from a background thread. A batch is sent once
+    it is as big as the API allows or ``flush_interval`` seconds after its
+    first event, whichever comes first. ``finish`` waits at most
+    ``finish_timeout`` seconds for everything to be sent. """
+
+    flush_interval = 1
+    finish_timeout = 10
+
     def __init__(self, group, stream):
         super(CloudWatchFrontend, self).__init__()
         self.group = group
         self.stream = stream
-        self.finished = False
         self.queue = queue.Queue()
+        self.pending = None
+        self.stopped = False
+        self.deadline = None
+        self.sequence_token = None
+        self.thread = None
+
+        # Imported here so that botocore isn't loaded until it is needed
+        from touchdown.aws.retry import RetryPolicy
+
+        self.retry_policy = RetryPolicy({"ServiceUnavailableException": []})
 
     def _echo(self, text, nl=True, **kwargs):
         text = text.rstrip("\r\n")
         if text:
-            self.queue.put(
-                {
-                    "message": text,
-                    "timestamp": calendar.timegm(datetime.datetime.utcnow().timetuple())
-                    * 1000,
-                }
-            )
+            encoded = text.encode("utf-8")
+            if len(encoded) > MAX_EVENT_BYTES:
+                text = encoded[:MAX_EVENT_BYTES].decode("utf-8", "ignore")
+            self.queue.put({"message": text, "timestamp": int(time.time() * 1000)})
 
     def start(self, subcommand, goal):
+        from botocore.exceptions import ClientError
+
         self.plan = goal.get_plan(self.group)
         self.client = self.plan.client
 
@@ -68,44 +100,117 @@ class CloudWatchFrontend(BaseFrontend):
                 raise
 
         self.thread = threading.Thread(target=self._sender)
+        self.thread.daemon = True
         self.thread.start()
 
     def finish(self):
-        self.finished = True
+        self.deadline = time.time() + self.finish_timeout
+        self.queue.put(STOP)
+        if self.thread is not None:
+            self.thread.join(self.finish_timeout)
+            if self.thread.is_alive():
+                logger.warning("Gave up waiting for logs to be sent to CloudWatch")
+
+    def _next_event(self, timeout):
+        if self.pending is not None:
+            event, self.pending = self.pending, None
+            return event
+        if self.stopped:
+            return self.queue.get_nowait()
+        event = self.queue.get(timeout=timeout)
+        if event is STOP:
+            self.stopped = True
+            raise queue.Empty()
+        return event
 
     def _get_batch(self):
         batch = []
-        for i in range(10000):
+        size = 0
+        flush_at = None
+        while len(batch) < MAX_BATCH_EVENTS:
+            timeout = None
+            if flush_at is not None:
+                timeout = max(0, flush_at - time.time())
             try:
-                item = self.queue.get_nowait()
+                event = self._next_event(timeout)
             except queue.Empty:
                 break
-            batch.append(item)
+            event_size = get_event_size(event)
+            if size + event_size > MAX_BATCH_BYTES:
+                # Save it for the next batch
+                self.pending = event
+                break
+            batch.append(event)
+            size += event_size
+            if flush_at is None:
+                flush_at = time.time() + self.flush_interval
         return batch
 
-    def _get_batches(self):
+    def _get_sequence_token(self, error):
+        """ Find out what sequence token CloudWatch expected after it rejected
+        the one we sent """
+        if "expectedSequenceToken" in error.response:
+            return error.response["expectedSequenceToken"]
+        response = self.client.describe_log_streams(
+            logGroupName=self.group.name, logStreamNamePrefix=self.stream
+        )
+        for stream in response.get("logStreams", []):
+            if stream["logStreamName"] == self.stream:
+                return stream.get("uploadSequenceToken")
+
+    def _send(self, batch):
+        from botocore.exceptions import ClientError
+
+        delays = self.retry_policy.get_delays()
         while True:
-            batch = self._get_batch()
-            if not batch:
-                return
-            yield batch
-
-    def _send(self):
-        for batch in self._get_batches():
             kwargs = dict(
                 logEvents=batch, logGroupName=self.group.name, logStreamName=self.stream
             )
             if self.sequence_token:
                 kwargs["sequenceToken"] = self.sequence_token
-            response = self.client.put_log_events(**kwargs)
-            self.sequence_token = response["nextSequenceToken"]
+
+            try:
+                response = self.client.put_log_events(**kwargs)
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code == "DataAlreadyAcceptedException":
+                    self.sequence_token = self._get_sequence_token(e)
+                    return
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                if code == "InvalidSequenceTokenException":
+                    self.sequence_token = self._get_sequence_token(e)
+                    continue
+                if not self.retry_policy.should_retry(e.response):
+                    raise
+                if self.deadline and time.time() + delay > self.deadline:
+                    raise
+                time.sleep(delay)
+                continue
+
+            self.sequence_token = response.get("nextSequenceToken")
+            if response.get("rejectedLogEventsInfo"):
+                logger.warning(
+                    "CloudWatch rejected some log events: {}".format(
+                        response["rejectedLogEventsInfo"]
+                    )
+                )
+            return
 
     def _sender(self):
-        self.sequence_token = None
-        while not self.finished:
-            self._send()
-            time.sleep(1)
-        self._send()
+        while True:
+            batch = self._get_batch()
+            if not batch:
+                if self.stopped:
+                    return
+                continue
+            try:
+                self._send(batch)
+            except Exception as e:
+                logger.warning(
+                    "Unable to send {} events to CloudWatch: {}".format(len(batch), e)
+                )
 
     def progressbar(self, **kwargs):
         return ProgressBar(self, **kwargs)
@@ -12,51 +12,258 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
+
 from touchdown.core import errors
+from touchdown.core.action import PollingAction
+from touchdown.core.batch import Batcher
+from touchdown.core.cache import SharedCache
+from touchdown.core.dependencies import DependencyMap
+from touchdown.core.incremental import IncrementalState, get_cache_key
+from touchdown.core.poller import Poller
 
 
 class ActionGoalMixin(object):
 
     mutator = True
 
+    # How many independent actions can run at once, across all resources
+    action_workers = 8
+
     def __init__(self, *args, **kwargs):
         super(ActionGoalMixin, self).__init__(*args, **kwargs)
+        self.poller = None
+        self.executor = None
+        self.incremental = None
+        self.targets = None
+        self.selected = None
         self.reset_changes()
 
+    @classmethod
+    def setup_argparse(cls, parser):
+        parser.add_argument(
+            "--target",
+            metavar="SELECTOR",
+            dest="targets",
+            default=[],
+            action="append",
+            help="Only change resources matching resource_class:name and the "
+            "resources they depend on (or that depend on them when destroying)",
+        )
+
+    def set_targets(self, selectors):
+        walker = self.get_walker()
+        targets = set()
+        for selector in selectors:
+            matches = list(walker.find([selector]))
+            if not matches:
+                raise errors.Error('No resources match "{}"'.format(selector))
+            targets.update(matches)
+        self.targets = targets
+
+        graph = self.get_dependency_graph()
+        self.selected = graph.closure(targets, reverse=self.execute_in_reverse)
+
+    def get_plan(self, resource):
+        # Resources outside the selection are only described - they may be
+        # needed to plan the selected resources.
+        if self.selected is not None and resource not in self.selected:
+            klass = resource.meta.get_plan("describe")
+            if not klass:
+                klass = resource.meta.get_plan("null")
+            return self.get_service(resource, klass.name)
+        return super(ActionGoalMixin, self).get_plan(resource)
+
+    def get_plan_order(self):
+        if self.selected is None:
+            return super(ActionGoalMixin, self).get_plan_order()
+        graph = self.get_dependency_graph()
+        return DependencyMap(
+            self.workspace, graph=graph.subgraph(graph.closure(self.selected))
+        )
+
+    def get_execution_order(self, weight=None):
+        if self.selected is None:
+            return super(ActionGoalMixin, self).get_execution_order(weight=weight)
+        return DependencyMap(
+            self.workspace,
+            tips_first=self.execute_in_reverse,
+            graph=self.get_dependency_graph().subgraph(self.selected),
+            weight=weight,
+        )
+
     def reset_changes(self):
         self.changes = {}
+        self.describe_cache = None
+        self.describe_batcher = None
 
     def get_changes(self, resource):
         if resource not in self.changes:
-            self.changes[resource] = list(self.get_plan(resource).get_actions())
+            plan = self.get_plan(resource)
+            if self.incremental and self.incremental.restore(plan):
+                self.changes[resource] = []
+            else:
+                self.changes[resource] = list(plan.get_actions())
+                if self.incremental and not self.changes[resource]:
+                    self.incremental.record(plan)
         return self.changes[resource]
 
     def plan(self):
         self.reset_changes()
-        self.visit("Building plan...", self.get_plan_order(), self.get_changes)
+        self.describe_cache = SharedCache()
+        if self.Map.parallel:
+            self.describe_batcher = Batcher()
+        try:
+            self.visit("Building plan...", self.get_plan_order(), self.get_changes)
+        finally:
+            # Actions change remote state, so they must never see results
+            # cached while planning.
+            self.describe_cache = None
+            self.describe_batcher = None
+        if self.incremental:
+            self.incremental.save()
         for resource in self.get_execution_order().all():
             changes = self.get_changes(resource)
             if changes:
                 yield resource, changes
 
+    def run_independent(self, changes):
+        futures = [self.executor.submit(change.run) for change in changes]
+        try:
+            for future in futures:
+                yield future
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
     def apply_resource(self, resource):
+        independent = []
         for change in self.get_changes(resource):
+            batch = self.executor is not None and change.independent
+            if independent and not batch:
+                # Finish the pending batch before describing an action that
+                # has to wait for it
+                yield from self.run_independent(independent)
+                independent = []
             description = list(change.description)
             self.ui.echo("[{}] {}".format(resource, description[0]))
             for line in description[1:]:
                 self.ui.echo("[{}]     {}".format(resource, line))
-            change.run()
+            if batch:
+                independent.append(change)
+                continue
+            if self.poller is not None and isinstance(change, PollingAction):
+                # Hand waits to the poller so this worker can get on with
+                # something else in the meantime.
+                yield from self.poller.drive(change.steps())
+            else:
+                change.run()
+        if independent:
+            yield from self.run_independent(independent)
+
+    def get_expected_duration(self, resource):
+        return sum(change.expected_duration for change in self.get_changes(resource))
+
+    def get_incremental_state(self):
+        """ The incremental state that changes must be forgotten from, or
+        ``None`` if no incremental plan has been made here """
+        if self.incremental:
+            return self.incremental
+        if get_cache_key() in self.cache:
+            return IncrementalState(self.cache)
+        return None
+
+    def forget_changed_resources(self):
+        # Remote state we remembered for an incremental plan is about to
+        # become stale, whichever goal is changing it.
+        changed = [resource for resource, changes in self.changes.items() if changes]
+        if not changed:
+            return
+        state = self.get_incremental_state()
+        if state is None:
+            return
+        for resource in changed:
+            state.forget(self.get_plan(resource))
+        state.save()
+
+    def visit_actions(self, message, dep_map, callable):
+        if self.Map.parallel:
+            self.poller = Poller()
+            self.executor = ThreadPoolExecutor(self.action_workers)
+        try:
+            self.visit(message, dep_map, callable)
+        finally:
+            if self.poller is not None:
+                self.poller.stop()
+                self.poller = None
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
 
     def apply_resources(self):
-        dep_map = self.get_execution_order()
-        with self.ui.progressbar(max_value=len(dep_map)) as pb:
-            for status in self.Map(self.ui, dep_map, self.apply_resource):
-                pb.update(status)
+        self.forget_changed_resources()
+        dep_map = self.get_execution_order(weight=self.get_expected_duration)
+        self.visit_actions("Applying changes...", dep_map, self.apply_resource)
+
+    def stream(self):
+        """ Plan and apply in a single pass over the plan order. Each
+        resource is changed as soon as it has been planned, and it is only
+        planned once everything it depends on has been changed. Returns the
+        complete plan in execution order. """
+        if self.execute_in_reverse:
+            raise errors.Error(
+                "Streaming is not possible when resources are changed in reverse"
+            )
+
+        self.reset_changes()
+        # Nothing is cached between describe calls - a resource planned now
+        # may depend on one that was changed a moment ago.
+        if self.Map.parallel:
+            self.describe_batcher = Batcher()
+        state = self.get_incremental_state()
+
+        def _(resource):
+            changes = self.get_changes(resource)
+            if not changes:
+                return
+            if self.selected is not None and resource not in self.selected:
+                return
+            if state is not None:
+                state.forget(self.get_plan(resource))
+            yield from self.apply_resource(resource)
+
+        try:
+            self.visit_actions(
+                "Planning and applying changes...", self.get_plan_order(), _
+            )
+        finally:
+            self.describe_batcher = None
+            if state is not None:
+                state.save()
+            plan = []
+            for resource in self.get_execution_order().all():
+                changes = self.changes.get(resource)
+                if changes:
+                    plan.append((resource, changes))
+            if plan:
+                # Keep a record of everything that was planned, even if not
+                # all of it could be applied.
+                self.ui.echo(
+                    "Generated and applied a plan to update infrastructure "
+                    "configuration:"
+                )
+                self.ui.echo("")
+                self.ui.render_plan(plan)
+        return plan
 
     def is_stale(self):
         return len(self.changes) != 0
 
-    def execute(self):
+    def execute(self, targets=()):
+        if targets:
+            self.set_targets(targets)
+
         plan = list(self.plan())
 
         if not len(plan):
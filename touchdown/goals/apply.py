@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from touchdown.core import errors
 from touchdown.core.goals import Goal, register
+from touchdown.core.incremental import IncrementalState
+from touchdown.core.utils import positive_integer
 from touchdown.goals.action import ActionGoalMixin
 
 
@@ -22,6 +25,30 @@ class Apply(ActionGoalMixin, Goal):
 
     name = "apply"
 
+    @classmethod
+    def setup_argparse(cls, parser):
+        super(Apply, cls).setup_argparse(parser)
+        parser.add_argument(
+            "--incremental",
+            default=False,
+            action="store_true",
+            help="Reuse remote state from earlier runs for unchanged resources",
+        )
+        parser.add_argument(
+            "--incremental-ttl",
+            metavar="SECONDS",
+            default=600,
+            type=positive_integer,
+            help="How old remote state can be before it is described again",
+        )
+        parser.add_argument(
+            "--stream",
+            default=False,
+            action="store_true",
+            help="Apply each resource as soon as it is planned instead of "
+            "planning everything first",
+        )
+
     def get_plan_class(self, resource):
         if "destroy" in resource.ensure:
             return resource.meta.get_plan("destroy")
@@ -35,5 +62,23 @@ class Apply(ActionGoalMixin, Goal):
             or resource.meta.get_plan("null")
         )
 
+    def execute(self, targets=(), incremental=False, incremental_ttl=600, stream=False):
+        if incremental:
+            self.incremental = IncrementalState(self.cache, incremental_ttl)
+
+        if not stream:
+            return super(Apply, self).execute(targets)
+
+        if targets:
+            self.set_targets(targets)
+        if not self.ui.confirm(
+            "Apply changes as soon as they are planned, without reviewing the plan?"
+        ):
+            return
+        if not self.stream():
+            raise errors.NothingChanged(
+                "Planning stage found no changes were required."
+            )
+
 
 register(Apply)
@@ -36,10 +36,10 @@ class Edit(Goal):
         parser.add_argument("name", metavar="NAME", type=str, help="The file to edit")
 
     def execute(self, name):
-        files = self.collect_as_dict("edit")
-        if name not in files:
+        file = self.collect_one("edit", name)
+        if not file:
             raise errors.Error('No such file "{}"'.format(name))
-        files[name].execute()
+        file.execute()
 
 
 register(Edit)
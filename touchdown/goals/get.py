@@ -34,11 +34,11 @@ class Get(Goal):
         parser.add_argument("name", metavar="NAME", type=str, help="The setting to set")
 
     def execute(self, name):
-        settings = self.collect_as_dict("get")
-        if name not in settings:
+        setting = self.collect_one("get", name)
+        if not setting:
             raise errors.Error('No such setting "{}"'.format(name))
-        val, user_set = settings[name].execute()
-        val = settings[name].to_string(val)
+        val, user_set = setting.execute()
+        val = setting.to_string(val)
 
         if user_set:
             self.ui.echo("{} (overriden by user)".format(val))
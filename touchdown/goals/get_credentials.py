@@ -39,10 +39,10 @@ class GetCredentials(Goal):
         )
 
     def execute(self, resource):
-        resources = self.collect_as_dict("get-credentials")
-        if resource not in resources:
+        plan = self.collect_one("get-credentials", resource)
+        if not plan:
             raise errors.Error('No such resource "{}"'.format(resource))
-        self.ui.echo(resources[resource].get_credentials())
+        self.ui.echo(plan.get_credentials())
 
 
 register(GetCredentials)
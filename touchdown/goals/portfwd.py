@@ -54,7 +54,7 @@ class PortForward(Goal):
         )
 
     def get_services(self, ports):
-        services = self.collect_as_dict("portfwd")
+        services = self.get_walker().names("portfwd")
         if not services:
             raise errors.Error("No port-forwardable resources are defined")
 
@@ -64,10 +64,13 @@ class PortForward(Goal):
 
             service, local_port = p.split("=", 1)
 
-            if service not in services:
+            plan = None
+            if service in services:
+                plan = self.collect_one("portfwd", service)
+            if not plan:
                 raise errors.Error(
                     'Not a valid service: "{}". Must be one of: {}'.format(
-                        service, ", ".join(sorted(services.keys()))
+                        service, ", ".join(services)
                     )
                 )
 
@@ -76,7 +79,7 @@ class PortForward(Goal):
             except ValueError:
                 raise errors.Error('Not a valid port number: "{}"'.format(p))
 
-            yield (services[service], local_port)
+            yield (plan, local_port)
 
     def process_incoming_forever(self, servers):
         # This is broadly the same as a TCPServer.serve_forever, but we do it
@@ -38,10 +38,10 @@ class Refresh(Goal):
         )
 
     def execute(self, name):
-        settings = self.collect_as_dict("refresh")
-        if name not in settings:
+        setting = self.collect_one("refresh", name)
+        if not setting:
             raise errors.Error('No such setting "{}"'.format(name))
-        settings[name].execute()
+        setting.execute()
 
 
 register(Refresh)
@@ -45,12 +45,12 @@ class Rollback(Goal):
         pass
 
     def execute(self, target, from_backup):
-        restorable = self.collect_as_dict("rollback")
-        if target not in restorable:
+        restorable = self.collect_one("rollback", target)
+        if not restorable:
             raise errors.Error('No such resource "{}"'.format(target))
-        restorable[target].check(from_backup)
+        restorable.check(from_backup)
         self.pre_restore()
-        restorable[target].rollback(from_backup)
+        restorable.rollback(from_backup)
         self.post_restore()
 
 
@@ -48,11 +48,11 @@ class Scp(Goal):
                 "Either source or destination must contain a target server that touchdown knows about"
             )
 
-        boxes = self.collect_as_dict("scp")
-        if server not in boxes:
+        box = self.collect_one("scp", server)
+        if not box:
             raise errors.Error('No such host "{}"'.format(server))
 
-        boxes[server].execute(source, destination)
+        box.execute(source, destination)
 
 
 register(Scp)
@@ -39,10 +39,10 @@ class Set(Goal):
         )
 
     def execute(self, name, value):
-        settings = self.collect_as_dict("set")
-        if name not in settings:
+        setting = self.collect_one("set", name)
+        if not setting:
             raise errors.Error('No such setting "{}"'.format(name))
-        settings[name].execute(settings[name].from_string(value))
+        setting.execute(setting.from_string(value))
 
 
 register(Set)
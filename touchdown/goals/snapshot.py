@@ -38,10 +38,10 @@ class Snapshot(Goal):
         )
 
     def execute(self, target, snapshot_name):
-        snapshotable = self.collect_as_dict("snapshot")
-        if target not in snapshotable:
+        snapshotable = self.collect_one("snapshot", target)
+        if not snapshotable:
             raise errors.Error('No such resource "{}"'.format(target))
-        snapshotable[target].snapshot(snapshot_name)
+        snapshotable.snapshot(snapshot_name)
 
 
 register(Snapshot)
@@ -41,10 +41,10 @@ class Ssh(Goal):
         parser.add_argument("args", nargs=argparse.REMAINDER)
 
     def execute(self, box, args):
-        boxes = self.collect_as_dict("ssh")
-        if box not in boxes:
+        plan = self.collect_one("ssh", box)
+        if not plan:
             raise errors.Error('No such host "{}"'.format(box))
-        boxes[box].execute(args)
+        plan.execute(args)
 
 
 register(Ssh)
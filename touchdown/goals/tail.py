@@ -15,6 +15,7 @@
 from touchdown.core import errors
 from touchdown.core.datetime import parse_datetime
 from touchdown.core.goals import Goal, register
+from touchdown.core.query import Query
 
 
 def datetime(value):
@@ -67,12 +68,52 @@ class Tail(Goal):
             type=datetime,
             help="The latest event to retrieve",
         )
+        parser.add_argument(
+            "--filter",
+            dest="expression",
+            metavar="EXPRESSION",
+            default=None,
+            help="Only show matching events. For CloudWatch log groups this is "
+            "a filter pattern. For CloudFront it is a list of conditions such "
+            "as sc-status>=500",
+        )
+        parser.add_argument(
+            "--group-by",
+            metavar="FIELD",
+            default=None,
+            help="Show the most common values of FIELD instead of the events",
+        )
+        parser.add_argument(
+            "--top",
+            metavar="N",
+            default=10,
+            type=int,
+            help="How many values to show with --group-by",
+        )
+        parser.add_argument(
+            "--per-minute",
+            default=False,
+            action="store_true",
+            help="Show how many events there were each minute instead of the "
+            "events",
+        )
 
-    def execute(self, stream, start="5m ago", end=None, follow=False):
-        tailers = self.collect_as_dict("tail")
-        if stream not in tailers:
+    def execute(
+        self,
+        stream,
+        start="5m ago",
+        end=None,
+        follow=False,
+        expression=None,
+        group_by=None,
+        top=10,
+        per_minute=False,
+    ):
+        tailer = self.collect_one("tail", stream)
+        if not tailer:
             raise errors.Error('No such log stream "{}"'.format(stream))
-        tailers[stream].tail(start, end, follow)
+        query = Query(expression, group_by, top, per_minute)
+        tailer.tail(start, end, follow, query)
 
 
 register(Tail)
@@ -15,8 +15,10 @@
 from __future__ import print_function
 
 import binascii
+import codecs
 import os
 import pipes
+import select
 import socket
 import time
 
@@ -24,7 +26,6 @@ import paramiko
 import six
 
 from touchdown.core import errors
-from touchdown.core.utils import force_str
 
 try:
     from touchdown.ssh.agent import ParamikoAgentServer
@@ -43,11 +44,46 @@ def private_key_from_string(private_key):
     raise paramiko.SSHException("not a valid private key file")
 
 
+class OutputStream(object):
+
+    """ Decodes the output of a remote command as it arrives and echoes it a
+    line at a time. A line split across several reads is held back until it
+    is complete, and a multibyte character split across reads is decoded
+    correctly. """
+
+    def __init__(self, echo, encoding):
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")
+        self.decoder = decoder(errors="replace")
+        self.echo = echo
+        self.partial = ""
+
+    def feed(self, data):
+        text = self.partial + self.decoder.decode(data)
+        end = text.rfind("\n") + 1
+        if end:
+            self.echo(text[:end], nl=False)
+        self.partial = text[end:]
+
+    def flush(self):
+        text = self.partial + self.decoder.decode(b"", final=True)
+        if text:
+            self.echo(text, nl=False)
+        self.partial = ""
+
+
 class Client(paramiko.SSHClient):
 
     connection_attempts = 20
     input_encoding = "utf-8"
 
+    # How much to read from the channel at once, and how long to wait in
+    # select before checking the channel again anyway.
+    recv_size = 32768
+    select_timeout = 0.5
+
     def __init__(self, plan, *args, **kwargs):
         self.plan = plan
         self.ui = plan.ui
@@ -78,26 +114,36 @@ class Client(paramiko.SSHClient):
             channel.exec_command(command)
 
             # We don't want a stdin
-            channel.makefile("wb", -1).close()
+            channel.shutdown_write()
 
-            r_stdout = channel.makefile("r")
-            r_stderr = channel.makefile_stderr("r")
+            stdout = OutputStream(echo, input_encoding)
+            stderr = OutputStream(echo, input_encoding)
 
-            # FIXME: It would be better to block with select
-            exit_status_ready = channel.exit_status_ready()
-            while not exit_status_ready:
+            def drain():
                 while channel.recv_ready():
-                    echo(force_str(r_stdout.readline()), nl=False)
+                    stdout.feed(channel.recv(self.recv_size))
                 while channel.recv_stderr_ready():
-                    echo(force_str(r_stderr.readline()), nl=False)
-                time.sleep(1)
-                exit_status_ready = channel.exit_status_ready()
-
-            for line in r_stdout.readlines():
-                echo(line, nl=False)
-
-            for line in r_stderr.readlines():
-                echo(line, nl=False)
+                    stderr.feed(channel.recv_stderr(self.recv_size))
+
+            # The channel's fileno becomes readable whenever there is data on
+            # stdout or stderr, or the remote end sends EOF or closes. It is
+            # not woken by the exit status, and a background process that
+            # inherited stdout can hold off the EOF indefinitely, so poll for
+            # that on a short timeout.
+            while not (
+                channel.eof_received
+                or channel.closed
+                or channel.exit_status_ready()
+            ):
+                select.select([channel], [], [], self.select_timeout)
+                drain()
+
+            # The last of the output can arrive along with the EOF or exit
+            # status
+            drain()
+
+            stdout.flush()
+            stderr.flush()
 
             exit_code = channel.recv_exit_status()
             if exit_code != 0:
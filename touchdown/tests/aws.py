@@ -15,6 +15,7 @@
 import mock
 from botocore.stub import Stubber as BaseStubber
 
+from touchdown.aws.session import Session
 from touchdown.tests.testcases import WorkspaceTestCase
 
 
@@ -25,6 +26,8 @@ class StubberTestCase(WorkspaceTestCase):
             access_key_id="dummy", secret_access_key="dummy", region="eu-west-1"
         )
         self.fixtures.enter_context(mock.patch("time.sleep"))
+        # Stubs are attached to clients, so every plan needs a client of its own
+        self.fixtures.enter_context(mock.patch.object(Session, "pool_clients", False))
 
 
 class Stubber(BaseStubber):
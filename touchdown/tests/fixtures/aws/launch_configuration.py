@@ -32,7 +32,6 @@ class LaunchConfigurationFixture(AwsFixture):
             )
         )
 
-        self.launch_config.add_describe_launch_configurations_one_response()
         self.launch_config.add_describe_launch_configurations_one_response()
         self.launch_config.add_describe_auto_scaling_groups()
 
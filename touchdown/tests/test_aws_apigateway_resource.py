@@ -42,7 +42,8 @@ class TestCreateResource(StubberTestCase):
                 )
             )
         )
-        resource.add_get_resources_empty_response(rest_api_id)
+        # The parent's listing of the API's resources is shared while planning,
+        # so the new resource doesn't list them again.
         resource.add_create_resource(rest_api_id, parent.make_id(parent.resource.name))
 
         goal.execute()
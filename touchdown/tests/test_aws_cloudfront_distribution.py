@@ -17,7 +17,7 @@ import unittest
 import mock
 
 from touchdown.aws.cloudfront.distribution import Describe
-from touchdown.aws.session import session
+from touchdown.aws.session import get_session
 from touchdown.tests.stubs.aws import DistributionStubber
 
 from . import aws
@@ -86,7 +86,7 @@ EXAMPLE_DISTRIBUTION_CONFIG = {
 
 class TestMetadata(unittest.TestCase):
     def test_waiter_waity_enough(self):
-        waiter = session.get_waiter_model(
+        waiter = get_session().get_waiter_model(
             "cloudfront", api_version=Describe.api_version
         )
         self.assertEqual(waiter.get_waiter("DistributionDeployed").max_attempts, 50)
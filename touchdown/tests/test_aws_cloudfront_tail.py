@@ -12,16 +12,38 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
 import gzip
+import unittest
 
+import mock
 import six
 from botocore.response import StreamingBody
 
+from touchdown.aws.cloudfront import tail
 from touchdown.core.datetime import now
 from touchdown.tests.aws import StubberTestCase
 from touchdown.tests.stubs.aws import DistributionStubber
 
 
+def gzipped(data):
+    buf = six.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+class TestDecompressLines(unittest.TestCase):
+    def test_chunks(self):
+        lines = [b"line %d" % i for i in range(1000)]
+        fileobj = six.BytesIO(gzipped(b"\n".join(lines) + b"\n"))
+        self.assertEqual(list(tail.decompress_lines(fileobj, chunk_size=7)), lines)
+
+    def test_multiple_members(self):
+        fileobj = six.BytesIO(gzipped(b"line1\nli") + gzipped(b"ne2\n"))
+        self.assertEqual(list(tail.decompress_lines(fileobj)), [b"line1", b"line2"])
+
+
 class TestDistributionTail(StubberTestCase):
     def test_tail_no_follow(self):
         goal = self.create_goal("tail")
@@ -92,3 +114,222 @@ class TestDistributionTail(StubberTestCase):
         )
 
         goal.execute("www.example.com", None, None, False)
+
+    def setup_distribution(self, goal):
+        bucket = self.aws.get_bucket(name="my-log-bucket")
+        distribution = self.fixtures.enter_context(
+            DistributionStubber(
+                goal.get_service(
+                    self.aws.get_distribution(
+                        name="www.example.com",
+                        logging={"enabled": True, "bucket": bucket, "prefix": "logs/"},
+                    ),
+                    "tail",
+                )
+            )
+        )
+        self.fixtures.enter_context(
+            mock.patch.object(
+                distribution.service, "get_distribution_id", return_value="E123"
+            )
+        )
+        return distribution
+
+    def add_get_object(self, distribution, key, data):
+        log_chunk = gzipped(data)
+        distribution.add_response(
+            "get_object",
+            service_response={
+                "Body": StreamingBody(six.BytesIO(log_chunk), len(log_chunk))
+            },
+            expected_params={"Bucket": "my-log-bucket", "Key": key},
+        )
+
+    def test_tail_between(self):
+        goal = self.create_goal("tail")
+        distribution = self.setup_distribution(goal)
+
+        # Listing starts at the first hour and stops after the last one
+        distribution.add_response(
+            "list_objects",
+            service_response={
+                "Contents": [
+                    {"Key": "logs/E123.2016-01-01-10.a.gz"},
+                    {"Key": "logs/E123.2016-01-01-11.a.gz"},
+                    {"Key": "logs/E123.2016-01-01-12.a.gz"},
+                ]
+            },
+            expected_params={
+                "Bucket": "my-log-bucket",
+                "Prefix": "logs/E123.",
+                "Marker": "logs/E123.2016-01-01-10",
+            },
+        )
+        self.add_get_object(
+            distribution,
+            "logs/E123.2016-01-01-10.a.gz",
+            b"#Version: 1.0\n2016-01-01\t10:29:00\tearly\n"
+            b"2016-01-01\t10:31:00\tfirst\n",
+        )
+        self.add_get_object(
+            distribution,
+            "logs/E123.2016-01-01-11.a.gz",
+            b"2016-01-01\t11:15:00\tsecond\n2016-01-01\t11:45:00\tlate\n",
+        )
+
+        echo = self.fixtures.enter_context(mock.patch.object(goal.ui, "echo"))
+        goal.execute(
+            "www.example.com",
+            datetime.datetime(2016, 1, 1, 10, 30, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2016, 1, 1, 11, 30, tzinfo=datetime.timezone.utc),
+            False,
+        )
+
+        lines = [c[0][0] for c in echo.call_args_list if c[0][0].startswith("2016")]
+        self.assertEqual(
+            lines, ["2016-01-01\t10:31:00\tfirst", "2016-01-01\t11:15:00\tsecond"]
+        )
+
+    def test_tail_merges_hour(self):
+        goal = self.create_goal("tail")
+        distribution = self.setup_distribution(goal)
+
+        distribution.add_response(
+            "list_objects",
+            service_response={
+                "Contents": [
+                    {"Key": "logs/E123.2016-01-01-10.a.gz"},
+                    {"Key": "logs/E123.2016-01-01-10.b.gz"},
+                    {"Key": "logs/E123.2016-01-01-11.a.gz"},
+                ]
+            },
+            expected_params={
+                "Bucket": "my-log-bucket",
+                "Prefix": "logs/E123.",
+                "Marker": "logs/E123.2016-01-01-10",
+            },
+        )
+        self.add_get_object(
+            distribution,
+            "logs/E123.2016-01-01-10.a.gz",
+            b"2016-01-01\t10:01:00\ta1\n2016-01-01\t10:03:00\ta2\n",
+        )
+        self.add_get_object(
+            distribution,
+            "logs/E123.2016-01-01-10.b.gz",
+            b"2016-01-01\t10:00:00\tb1\n2016-01-01\t10:02:00\tb2\n",
+        )
+        self.add_get_object(
+            distribution,
+            "logs/E123.2016-01-01-11.a.gz",
+            b"2016-01-01\t11:00:00\tc1\n",
+        )
+
+        echo = self.fixtures.enter_context(mock.patch.object(goal.ui, "echo"))
+        goal.execute(
+            "www.example.com",
+            datetime.datetime(2016, 1, 1, 10, 0, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2016, 1, 1, 11, 30, tzinfo=datetime.timezone.utc),
+            False,
+        )
+
+        lines = [c[0][0] for c in echo.call_args_list if c[0][0].startswith("2016")]
+        self.assertEqual(
+            [line.split("\t")[2] for line in lines], ["b1", "a1", "b2", "a2", "c1"]
+        )
+
+    def test_tail_query(self):
+        goal = self.create_goal("tail")
+        distribution = self.setup_distribution(goal)
+
+        distribution.add_response(
+            "list_objects",
+            service_response={"Contents": [{"Key": "logs/E123.2016-01-01-10.a.gz"}]},
+            expected_params={
+                "Bucket": "my-log-bucket",
+                "Prefix": "logs/E123.",
+                "Marker": "logs/E123.2016-01-01-10",
+            },
+        )
+        lines = [
+            ("10:00:01", "/a", "200"),
+            ("10:00:02", "/a", "502"),
+            ("10:00:03", "/b", "503"),
+            ("10:01:01", "/a", "500"),
+        ]
+        self.add_get_object(
+            distribution,
+            "logs/E123.2016-01-01-10.a.gz",
+            b"".join(
+                "2016-01-01\t{}\tLHR\t100\t1.2.3.4\tGET\thost\t{}\t{}\n".format(
+                    *line
+                ).encode("utf-8")
+                for line in lines
+            ),
+        )
+
+        echo = self.fixtures.enter_context(mock.patch.object(goal.ui, "echo"))
+        goal.execute(
+            "www.example.com",
+            datetime.datetime(2016, 1, 1, 10, 0, tzinfo=datetime.timezone.utc),
+            None,
+            False,
+            expression="sc-status>=500",
+            group_by="cs-uri-stem",
+            per_minute=True,
+        )
+
+        self.assertEqual(
+            [c[0][0] for c in echo.call_args_list][-8:],
+            [
+                "3 matching records",
+                "",
+                "2016-01-01 10:00         2",
+                "2016-01-01 10:01         1",
+                "",
+                "Top 10 by cs-uri-stem:",
+                "       2  /a",
+                "       1  /b",
+            ],
+        )
+
+    def test_tail_follow(self):
+        goal = self.create_goal("tail")
+        distribution = self.setup_distribution(goal)
+
+        distribution.add_response(
+            "list_objects",
+            service_response={"Contents": [{"Key": "logs/E123.2016-01-01-10.b.gz"}]},
+            expected_params={"Bucket": "my-log-bucket", "Prefix": "logs/E123."},
+        )
+        self.add_get_object(
+            distribution, "logs/E123.2016-01-01-10.b.gz", b"2016-01-01\t10:00:00\tb\n"
+        )
+
+        # A file that sorts before one we've already shown can still turn up
+        distribution.add_response(
+            "list_objects",
+            service_response={
+                "Contents": [
+                    {"Key": "logs/E123.2016-01-01-10.a.gz"},
+                    {"Key": "logs/E123.2016-01-01-10.b.gz"},
+                ]
+            },
+            expected_params={
+                "Bucket": "my-log-bucket",
+                "Prefix": "logs/E123.",
+                "Marker": "logs/E123.2016-01-01-09",
+            },
+        )
+        self.add_get_object(
+            distribution, "logs/E123.2016-01-01-10.a.gz", b"2016-01-01\t10:00:00\ta\n"
+        )
+
+        echo = self.fixtures.enter_context(mock.patch.object(goal.ui, "echo"))
+        sleep = self.fixtures.enter_context(mock.patch("time.sleep"))
+        sleep.side_effect = [None, KeyboardInterrupt()]
+
+        goal.execute("www.example.com", None, None, True)
+
+        lines = [c[0][0] for c in echo.call_args_list if c[0][0].startswith("2016")]
+        self.assertEqual(lines, ["2016-01-01\t10:00:00\tb", "2016-01-01\t10:00:00\ta"])
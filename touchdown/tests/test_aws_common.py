@@ -20,7 +20,7 @@ from botocore import xform_name
 
 from touchdown.aws import common
 from touchdown.aws.elasticache import CacheCluster
-from touchdown.core import serializers
+from touchdown.core import errors, serializers
 
 
 class TestGenericAction(unittest.TestCase):
@@ -73,3 +73,87 @@ class TestSimpleDescribeImplementations(unittest.TestCase):
 
             if "." not in impl.describe_envelope and ":" not in impl.describe_envelope:
                 assert impl.describe_envelope in operation.output_shape.members
+
+
+class TestBackoff(unittest.TestCase):
+    def test_backoff(self):
+        delays = common.backoff(1, 10, jitter=0)
+        self.assertEqual([next(delays) for i in range(6)], [1, 2, 4, 8, 10, 10])
+
+    def test_backoff_jitter(self):
+        delays = common.backoff(8, 8, jitter=0.5)
+        for i in range(20):
+            self.assertTrue(4 <= next(delays) <= 8)
+
+
+class TestWaiter(unittest.TestCase):
+    def setUp(self):
+        self.plan = mock.Mock()
+        config = self.plan.client.get_waiter.return_value.config
+        config.delay = 15
+        config.max_attempts = 4
+
+        # A fake clock that only moves when something sleeps
+        self.now = 0
+        self.sleep = mock.patch("time.sleep").start()
+        self.sleep.side_effect = self.advance
+        mock.patch("time.monotonic", side_effect=lambda: self.now).start()
+        self.addCleanup(mock.patch.stopall)
+
+        self.waiter = common.Waiter(self.plan, ["Waiting"], "waiter", 1)
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def test_backs_off(self):
+        with mock.patch.object(self.waiter, "check") as check:
+            check.side_effect = [False, False, False, False, False, True]
+            self.waiter.run()
+
+        delays = [c[0][0] for c in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 5)
+        self.assertLess(delays[0], 1.01)
+        self.assertTrue(all(d <= 15 for d in delays))
+        self.assertLess(sum(delays), 60)
+
+    def test_timeout(self):
+        with mock.patch.object(self.waiter, "check") as check:
+            check.return_value = False
+            self.assertRaises(errors.Error, self.waiter.run)
+
+        delays = [c[0][0] for c in self.sleep.call_args_list]
+        self.assertAlmostEqual(sum(delays), 60)
+
+    def test_time_spent_polling_counts(self):
+        def slow_check():
+            self.advance(20)
+            return False
+
+        with mock.patch.object(self.waiter, "check") as check:
+            check.side_effect = slow_check
+            self.assertRaises(errors.Error, self.waiter.run)
+
+        # Each poll takes 20s of the 60s allowed
+        self.assertEqual(check.call_count, 3)
+
+    def test_reports_polls(self):
+        acceptor = mock.Mock(state="success")
+        acceptor.matcher_func.side_effect = [False, False, True]
+        self.waiter.waiter.config.acceptors = [acceptor]
+        self.waiter.waiter._operation_method.return_value = {}
+        self.plan.get_describe_filters.return_value = {}
+
+        self.waiter.run()
+
+        self.assertEqual(self.waiter.polls, 3)
+        self.plan.echo.assert_called_with("Finished waiting after 0:00:00 (3 polls)")
+
+    def test_consistency(self):
+        self.waiter.eventual_consistency_threshold = 3
+        with mock.patch.object(self.waiter, "get_state") as get_state:
+            get_state.side_effect = ["success", "waiting", "success"] + ["success"] * 2
+            self.waiter.run()
+
+        delays = [c[0][0] for c in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 4)
+        self.assertEqual(delays[2:], [1, 1])
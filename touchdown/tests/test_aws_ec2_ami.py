@@ -15,10 +15,10 @@
 import unittest
 
 from touchdown.aws.ec2.ami import Describe
-from touchdown.aws.session import session
+from touchdown.aws.session import get_session
 
 
 class TestMetadata(unittest.TestCase):
     def test_waiter_waity_enough(self):
-        waiter = session.get_waiter_model("ec2", api_version=Describe.api_version)
+        waiter = get_session().get_waiter_model("ec2", api_version=Describe.api_version)
         self.assertEqual(waiter.get_waiter("ImageAvailable").max_attempts, 160)
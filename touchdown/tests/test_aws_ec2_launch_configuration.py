@@ -33,7 +33,6 @@ class TestCreateLaunchConfiguration(StubberTestCase):
             )
         )
 
-        launch_config.add_describe_launch_configurations_empty_response()
         launch_config.add_describe_launch_configurations_empty_response()
         launch_config.add_create_launch_configuration()
         launch_config.add_describe_launch_configurations_one_response()
@@ -57,7 +56,6 @@ class TestCreateLaunchConfiguration(StubberTestCase):
             )
         )
 
-        launch_config.add_describe_launch_configurations_one_response()
         launch_config.add_describe_launch_configurations_one_response()
         launch_config.add_describe_auto_scaling_groups()
 
@@ -82,7 +80,6 @@ class TestDestroyLaunchConfiguration(StubberTestCase):
             )
         )
 
-        launch_config.add_describe_launch_configurations_one_response()
         launch_config.add_describe_launch_configurations_one_response()
         launch_config.add_delete_launch_configuration()
 
@@ -104,7 +101,6 @@ class TestDestroyLaunchConfiguration(StubberTestCase):
             )
         )
 
-        launch_config.add_describe_launch_configurations_empty_response()
         launch_config.add_describe_launch_configurations_empty_response()
 
         self.assertEqual(len(list(goal.plan())), 0)
@@ -141,7 +141,6 @@ class TestCacheClusterComplications(StubberTestCase):
             '"REDIS_PORT": 6379}'
         )
 
-        launch_config.add_describe_launch_configurations_empty_response()
         launch_config.add_describe_launch_configurations_empty_response()
         launch_config.add_create_launch_configuration(user_data=user_data)
         launch_config.add_describe_launch_configurations_one_response(
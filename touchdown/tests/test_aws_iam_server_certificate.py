@@ -37,9 +37,8 @@ class TestCreateServerCertificate(StubberTestCase):
                     )
                 )
             )
-        # first list is to find things to delete
-        server_certificate.add_list_server_certificate_empty_response()
-        # second is to find if there is an existing matching cert
+        # one list is shared by finding things to delete and finding an
+        # existing matching cert
         server_certificate.add_list_server_certificate_empty_response()
         server_certificate.add_upload_server_certificate()
         # CreateAction needs to look up cert again as create response has no info
@@ -74,7 +73,6 @@ class TestCreateServerCertificate(StubberTestCase):
             )
         server_certificate.add_list_server_certificate_one_response()
         server_certificate.add_get_server_certificate()
-        server_certificate.add_list_server_certificate_one_response()
         server_certificate.add_get_server_certificate()
 
         self.assertEqual(len(list(goal.plan())), 0)
@@ -123,7 +121,6 @@ class TestDestroyServerCertificate(StubberTestCase):
         )
         server_certificate.add_list_server_certificate_one_response()
         server_certificate.add_get_server_certificate()
-        server_certificate.add_list_server_certificate_one_response()
         server_certificate.add_get_server_certificate()
         server_certificate.add_delete_server_certificate()
 
@@ -141,7 +138,6 @@ class TestDestroyServerCertificate(StubberTestCase):
             )
         )
         server_certificate.add_list_server_certificate_empty_response()
-        server_certificate.add_list_server_certificate_empty_response()
 
         self.assertEqual(len(list(goal.plan())), 0)
         self.assertEqual(len(goal.get_changes(server_certificate.resource)), 0)
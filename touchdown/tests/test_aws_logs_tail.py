@@ -13,10 +13,14 @@
 # limitations under the License.
 
 import datetime
+import threading
+import time
+import unittest
 
 import mock
 from botocore.stub import ANY
 
+from touchdown.aws.logs import tail
 from touchdown.core.datetime import now
 from touchdown.tests.aws import StubberTestCase
 from touchdown.tests.stubs.aws import LogGroupStubber
@@ -92,3 +96,207 @@ class TestLogGroupTailing(StubberTestCase):
                 mock.call("[1970-01-01 00:00:00] [logstream1] this is another message"),
             ]
         )
+
+    def test_tail_follow(self):
+        goal = self.create_goal("tail")
+
+        log_group = self.fixtures.enter_context(
+            LogGroupStubber(
+                goal.get_service(self.aws.add_log_group(name="test-log_group"), "tail")
+            )
+        )
+
+        # Recent enough to be in the overlap between polls
+        timestamp = int(time.time() * 1000) - 500
+
+        def event(event_id, message):
+            return {
+                "eventId": event_id,
+                "timestamp": timestamp,
+                "logStreamName": "logstream1",
+                "message": message,
+            }
+
+        expected_params = {
+            "logGroupName": log_group.resource.name,
+            "startTime": ANY,
+            "endTime": ANY,
+        }
+        log_group.add_response(
+            "filter_log_events",
+            service_response={"events": [event("EV1", "first")]},
+            expected_params=expected_params,
+        )
+        # The second poll overlaps the first
+        log_group.add_response(
+            "filter_log_events",
+            service_response={
+                "events": [event("EV2", "second"), event("EV1", "first")]
+            },
+            expected_params=expected_params,
+        )
+
+        echo = self.fixtures.enter_context(mock.patch.object(goal.ui, "echo"))
+        sleep = self.fixtures.enter_context(mock.patch("time.sleep"))
+        sleep.side_effect = [None, KeyboardInterrupt()]
+
+        goal.execute(
+            "test-log_group",
+            start=now() - datetime.timedelta(seconds=1),
+            follow=True,
+        )
+
+        lines = [c[0][0] for c in echo.call_args_list if "logstream1" in c[0][0]]
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].endswith("[logstream1] first"))
+        self.assertTrue(lines[1].endswith("[logstream1] second"))
+
+    def test_tail_query(self):
+        goal = self.create_goal("tail")
+
+        log_group = self.fixtures.enter_context(
+            LogGroupStubber(
+                goal.get_service(self.aws.add_log_group(name="test-log_group"), "tail")
+            )
+        )
+
+        log_group.add_response(
+            "filter_log_events",
+            service_response={
+                "events": [
+                    {
+                        "eventId": "EV{}".format(i),
+                        "timestamp": i * 20000,
+                        "logStreamName": "logstream{}".format(i % 2),
+                        "message": "ERROR",
+                    }
+                    for i in range(5)
+                ]
+            },
+            expected_params={
+                "logGroupName": log_group.resource.name,
+                "startTime": ANY,
+                "endTime": ANY,
+                "filterPattern": "ERROR",
+            },
+        )
+
+        echo = self.fixtures.enter_context(mock.patch.object(goal.ui, "echo"))
+        goal.execute(
+            "test-log_group",
+            start=now(),
+            end=now(),
+            expression="ERROR",
+            group_by="logStreamName",
+            per_minute=True,
+        )
+
+        self.assertEqual(
+            [c[0][0] for c in echo.call_args_list][-8:],
+            [
+                "5 matching records",
+                "",
+                "1970-01-01 00:00         3",
+                "1970-01-01 00:01         2",
+                "",
+                "Top 10 by logStreamName:",
+                "       3  logstream0",
+                "       2  logstream1",
+            ],
+        )
+
+
+class TestSlices(unittest.TestCase):
+    def test_short(self):
+        plan = tail.Plan.__new__(tail.Plan)
+        self.assertEqual(list(plan.get_slices(0, 1000)), [(0, 1000)])
+
+    def test_long(self):
+        plan = tail.Plan.__new__(tail.Plan)
+        hour = 60 * 60 * 1000
+        slices = list(plan.get_slices(0, hour))
+        self.assertEqual(len(slices), plan.workers)
+        self.assertEqual(slices[0][0], 0)
+        self.assertEqual(slices[-1][1], hour)
+        for (_, end), (start, _) in zip(slices, slices[1:]):
+            self.assertEqual(end + 1, start)
+
+
+class TestFetch(unittest.TestCase):
+    def setUp(self):
+        self.plan = tail.Plan.__new__(tail.Plan)
+        self.plan.get_log_group_name = lambda: "test-log_group"
+        self.client = mock.Mock()
+        patcher = mock.patch.object(tail.Plan, "client", new=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def event(self, event_id, timestamp):
+        return {"eventId": event_id, "timestamp": timestamp}
+
+    def test_slices_in_order(self):
+        def filter_log_events(startTime, **filters):
+            return {"events": [self.event(str(startTime), startTime)]}
+
+        self.client.filter_log_events.side_effect = filter_log_events
+        hour = 60 * 60 * 1000
+        with tail.ThreadPoolExecutor(self.plan.workers) as executor:
+            events = list(self.plan.fetch(executor, 0, hour))
+        timestamps = [e["timestamp"] for e in events]
+        self.assertEqual(len(timestamps), self.plan.workers)
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_pages_streamed(self):
+        released = threading.Event()
+
+        def filter_log_events(**filters):
+            if "nextToken" not in filters:
+                return {"events": [self.event("EV1", 1)], "nextToken": "more"}
+            released.wait(5)
+            return {"events": [self.event("EV2", 2)]}
+
+        self.client.filter_log_events.side_effect = filter_log_events
+        with tail.ThreadPoolExecutor(1) as executor:
+            events = self.plan.fetch(executor, 0, 1000)
+            # The first page is shown before the second has arrived
+            self.assertEqual(next(events)["eventId"], "EV1")
+            self.assertFalse(released.is_set())
+            released.set()
+            self.assertEqual([e["eventId"] for e in events], ["EV2"])
+
+
+class TestRecentEvents(unittest.TestCase):
+    def event(self, event_id, timestamp):
+        return {"eventId": event_id, "timestamp": timestamp}
+
+    def test_dedup(self):
+        seen = tail.RecentEvents()
+        self.assertTrue(seen.add(self.event("EV1", 1)))
+        self.assertFalse(seen.add(self.event("EV1", 1)))
+
+    def test_forget_before(self):
+        seen = tail.RecentEvents()
+        seen.add(self.event("EV1", 1))
+        seen.add(self.event("EV2", 5))
+        seen.forget_before(5)
+        self.assertEqual(len(seen), 1)
+        self.assertTrue(seen.add(self.event("EV1", 1)))
+
+    def test_bounded(self):
+        seen = tail.RecentEvents(max_events=10)
+        for i in range(100):
+            seen.add(self.event("EV{}".format(i), 0))
+        self.assertEqual(len(seen), 10)
+
+
+class TestPollInterval(unittest.TestCase):
+    def test_quiet(self):
+        interval = tail.PollInterval()
+        for i in range(20):
+            interval.update(0, 2)
+        self.assertEqual(interval.interval, interval.maximum)
+
+    def test_busy(self):
+        interval = tail.PollInterval()
+        self.assertEqual(interval.update(10000, 1), interval.minimum)
+        self.assertEqual(interval.update(50, 1), 2)
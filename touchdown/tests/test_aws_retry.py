@@ -0,0 +1,119 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from botocore.exceptions import ClientError
+
+from touchdown.aws import common, retry
+
+
+def error(code, message="Rate exceeded"):
+    return {"Error": {"Code": code, "Message": message}}
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_throttling_is_retried(self):
+        policy = retry.RetryPolicy()
+        self.assertTrue(policy.should_retry(error("Throttling")))
+        self.assertTrue(policy.should_retry(error("RequestLimitExceeded")))
+        self.assertFalse(policy.should_retry(error("InvalidParameter")))
+
+    def test_retryable(self):
+        policy = retry.RetryPolicy(
+            {"InvalidParameter": ["Not ready"], "InvalidRole": []}
+        )
+        self.assertTrue(policy.should_retry(error("InvalidParameter", "Not ready")))
+        self.assertFalse(policy.should_retry(error("InvalidParameter", "Bad")))
+        self.assertTrue(policy.should_retry(error("InvalidRole", "Anything")))
+
+    def test_full_jitter(self):
+        delays = list(retry.RetryPolicy().get_delays())
+        self.assertEqual(len(delays), 9)
+        for i, delay in enumerate(delays):
+            self.assertTrue(0 <= delay <= min(30, 2**i))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.sleep = mock.patch("time.sleep").start()
+        self.addCleanup(mock.patch.stopall)
+        self.bucket = retry.TokenBucket()
+
+    def test_unlimited_until_throttled(self):
+        for i in range(100):
+            self.bucket.acquire()
+        self.assertEqual(self.sleep.call_count, 0)
+
+    def test_throttle_pauses_everyone(self):
+        self.bucket.throttled(delay=5)
+        self.bucket.acquire()
+        self.assertGreater(self.sleep.call_args[0][0], 4)
+
+    def test_throttle_halves_rate(self):
+        self.bucket.throttled()
+        self.assertEqual(self.bucket.rate, 10)
+        self.bucket.throttled()
+        self.assertEqual(self.bucket.rate, 5)
+        for i in range(200):
+            self.bucket.succeeded()
+        self.assertIsNone(self.bucket.rate)
+
+    def test_rate_limits(self):
+        self.bucket.rate = 2.0
+        for i in range(5):
+            self.bucket.acquire()
+        self.assertGreater(self.sleep.call_args[0][0], 1.9)
+
+
+class TestInstall(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(retry.buckets.clear)
+
+    def install(self, service):
+        client = mock.Mock()
+        client.meta.region_name = "eu-west-1"
+        client.meta.service_model.service_name = service
+        retry.install(client)
+        return dict(c[0] for c in client.meta.events.register.call_args_list)
+
+    def test_clients_share_bucket(self):
+        handlers = self.install("ec2")
+        self.install("ec2")["needs-retry"](
+            response=(mock.Mock(status_code=503), error("RequestLimitExceeded"))
+        )
+
+        bucket = retry.buckets.get_bucket("eu-west-1", "ec2")
+        self.assertEqual(bucket.rate, 10)
+        self.assertIsNone(retry.buckets.get_bucket("eu-west-1", "s3").rate)
+
+        with mock.patch("time.sleep") as sleep:
+            handlers["before-send"]()
+        self.assertEqual(sleep.call_count, 1)
+
+
+class TestRetryAction(unittest.TestCase):
+    def test_retries_throttling(self):
+        plan = mock.Mock(retryable={})
+        action = mock.Mock()
+        action.run.side_effect = [
+            ClientError(error("ThrottlingException"), "CreateFunction"),
+            "ok",
+        ]
+
+        with mock.patch("time.sleep") as sleep:
+            self.assertEqual(common.RetryAction(plan, action).run(), "ok")
+
+        self.assertEqual(sleep.call_count, 1)
@@ -0,0 +1,254 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from touchdown.aws.s3 import folder
+from touchdown.core import errors
+from touchdown.core.cache import MemoryCache, SQLiteCache
+
+
+class FolderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base)
+
+    def write(self, name, contents):
+        path = os.path.join(self.base, name)
+        with open(path, "wb") as fp:
+            fp.write(contents)
+        return path
+
+
+class TestETags(FolderTestCase):
+    def test_md5(self):
+        path = self.write("a", b"hello world")
+        self.assertEqual(
+            folder.compute_etag(path), hashlib.md5(b"hello world").hexdigest()
+        )
+
+    def test_multipart(self):
+        path = self.write("a", b"hello world")
+        parts = [hashlib.md5(p).digest() for p in (b"hell", b"o wo", b"rld")]
+        self.assertEqual(
+            folder.compute_etag(path, 4),
+            "{}-3".format(hashlib.md5(b"".join(parts)).hexdigest()),
+        )
+
+    def test_multipart_exact(self):
+        path = self.write("a", b"hello wo")
+        self.assertTrue(folder.compute_etag(path, 4).endswith("-2"))
+
+    def test_part_size(self):
+        mb = 1024 * 1024
+        self.assertEqual(folder.get_part_size(20 * mb, 3), folder.PART_SIZE)
+        self.assertEqual(folder.get_part_size(20 * mb, 2), 10 * mb)
+        self.assertEqual(folder.get_part_size(20 * mb + 1, 4), 6 * mb)
+
+    def test_cached(self):
+        path = self.write("a", b"hello world")
+        hashes = folder.FileHashes()
+        with mock.patch.object(folder, "compute_etag") as compute_etag:
+            compute_etag.return_value = "1234"
+            hashes.get_etag(path)
+            hashes.get_etag(path)
+            self.assertEqual(compute_etag.call_count, 1)
+
+            # Changing the file means hashing it again
+            self.write("a", b"goodbye world")
+            hashes.get_etag(path)
+            self.assertEqual(compute_etag.call_count, 2)
+
+    def test_is_modified(self):
+        path = self.write("a", b"hello world")
+        stat = os.stat(path)
+        plan = mock.Mock(hashes=folder.FileHashes())
+        etag = hashlib.md5(b"hello world").hexdigest()
+        self.assertFalse(
+            folder.Apply.is_modified(plan, path, stat, {"Size": 11, "Md5": etag})
+        )
+        self.assertTrue(
+            folder.Apply.is_modified(plan, path, stat, {"Size": 12, "Md5": etag})
+        )
+        self.assertTrue(
+            folder.Apply.is_modified(plan, path, stat, {"Size": 11, "Md5": "1234"})
+        )
+
+        # A file uploaded in a single part isn't modified either
+        etag = hashlib.md5(hashlib.md5(b"hello world").digest()).hexdigest()
+        self.assertFalse(
+            folder.Apply.is_modified(
+                plan, path, stat, {"Size": 11, "Md5": "{}-1".format(etag)}
+            )
+        )
+
+    def test_walk(self):
+        os.makedirs(os.path.join(self.base, "css", "fonts"))
+        self.write("index.html", b"<html></html>")
+        self.write(os.path.join("css", "fonts", "a.woff"), b"abcd")
+        files = dict(folder.walk(self.base))
+        self.assertEqual(
+            sorted(files),
+            sorted(["index.html", os.path.join("css", "fonts", "a.woff")]),
+        )
+        self.assertEqual(files["index.html"].st_size, 13)
+
+    def test_walk_missing(self):
+        self.assertEqual(list(folder.walk(os.path.join(self.base, "missing"))), [])
+
+
+class TestFileHashes(FolderTestCase):
+    def setUp(self):
+        super(TestFileHashes, self).setUp()
+        self.index = os.path.join(self.base, "index", "cache.sqlite3")
+
+    def create_hashes(self):
+        return folder.FileHashes(SQLiteCache(self.index), "hashes")
+
+    def test_persistent(self):
+        path = self.write("a", b"hello world")
+        hashes = self.create_hashes()
+        etag = hashes.get_etag(path)
+        hashes.save()
+
+        hashes = self.create_hashes()
+        with mock.patch.object(folder, "compute_etag") as compute_etag:
+            self.assertEqual(hashes.get_etag(path), etag)
+            self.assertEqual(hashes.get_etag(path, 4), compute_etag.return_value)
+        self.assertEqual(compute_etag.call_count, 1)
+
+    def test_renamed(self):
+        path = self.write("a", b"hello world")
+        hashes = self.create_hashes()
+        hashes.get_etag(path)
+        hashes.save()
+
+        renamed = os.path.join(self.base, "b")
+        os.rename(path, renamed)
+        hashes = self.create_hashes()
+        with mock.patch.object(folder, "compute_etag") as compute_etag:
+            hashes.get_etag(renamed)
+        self.assertFalse(compute_etag.called)
+
+    def test_expired(self):
+        path = self.write("a", b"hello world")
+        hashes = self.create_hashes()
+        hashes.get_etag(path)
+        hashes.save()
+
+        hashes = self.create_hashes()
+        hashes.load()
+        later = time.time() + hashes.max_age + 1
+        with mock.patch("time.time") as now:
+            now.return_value = later
+            hashes.save()
+
+        hashes = self.create_hashes()
+        with mock.patch.object(folder, "compute_etag") as compute_etag:
+            hashes.get_etag(path)
+        self.assertTrue(compute_etag.called)
+
+    def test_unchanged_not_written(self):
+        path = self.write("a", b"hello world")
+        hashes = self.create_hashes()
+        hashes.get_etag(path)
+        hashes.save()
+
+        cache = mock.MagicMock()
+        cache.get.return_value = {
+            key: list(value) for key, value in hashes.hashes.items()
+        }
+        hashes = folder.FileHashes(cache, "hashes")
+        hashes.get_etag(path)
+        hashes.save()
+        self.assertFalse(cache.__setitem__.called)
+
+    def test_no_database(self):
+        hashes = self.create_hashes()
+        hashes.save()
+        self.assertFalse(os.path.exists(self.index))
+
+    def test_uses_goal_cache(self):
+        plan = folder.Apply.__new__(folder.Apply)
+        plan.runner = mock.Mock(cache=MemoryCache())
+        plan.resource = mock.Mock(source=self.base)
+        path = self.write("a", b"hello world")
+        plan.hashes.get_etag(path)
+        plan.hashes.save()
+        self.assertIn(plan.hashes.cache_key, plan.runner.cache)
+
+
+class TestUploadFile(FolderTestCase):
+    def setUp(self):
+        super(TestUploadFile, self).setUp()
+        self.plan = mock.Mock()
+        self.plan.resource = folder.Folder(
+            None, name="assets", source=self.base, bucket={"name": "my-bucket"}
+        )
+        self.client = self.plan.client
+        self.client.create_multipart_upload.return_value = {"UploadId": "upload"}
+        self.client.upload_part.side_effect = lambda PartNumber, **kwargs: {
+            "ETag": str(PartNumber)
+        }
+
+        patcher = mock.patch.object(folder, "MULTIPART_THRESHOLD", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(folder, "PART_SIZE", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, contents):
+        path = self.write("a.txt", contents)
+        return folder.UploadFile(self.plan, "Add", path, "assets/a.txt", "text/plain")
+
+    def test_small(self):
+        action = self.upload(b"abc")
+        self.assertEqual(list(action.description), ["Add a.txt (text/plain)"])
+        action.run()
+        kwargs = self.client.put_object.call_args[1]
+        self.assertEqual(kwargs["Key"], "assets/a.txt")
+        self.assertTrue(hasattr(kwargs["Body"], "read"))
+
+    def test_multipart(self):
+        self.upload(b"hello world").run()
+        bodies = [c[1]["Body"] for c in self.client.upload_part.call_args_list]
+        self.assertEqual(sorted(bodies), [b"hell", b"o wo", b"rld"])
+        self.client.complete_multipart_upload.assert_called_with(
+            Bucket="my-bucket",
+            Key="assets/a.txt",
+            UploadId="upload",
+            MultipartUpload={
+                "Parts": [
+                    {"ETag": "1", "PartNumber": 1},
+                    {"ETag": "2", "PartNumber": 2},
+                    {"ETag": "3", "PartNumber": 3},
+                ]
+            },
+        )
+
+    def test_multipart_failure(self):
+        self.client.upload_part.side_effect = errors.Error("Upload failed")
+        self.assertRaises(errors.Error, self.upload(b"hello world").run)
+        self.client.abort_multipart_upload.assert_called_with(
+            Bucket="my-bucket", Key="assets/a.txt", UploadId="upload"
+        )
+        self.assertFalse(self.client.complete_multipart_upload.called)
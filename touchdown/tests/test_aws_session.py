@@ -14,14 +14,38 @@
 
 import unittest
 
-from touchdown.aws.session import session
+from touchdown.aws.session import Session, client_pool, get_session
 
 
 class TestSimpleDescribeImplementations(unittest.TestCase):
     def test_image_retry(self):
         self.assertEqual(
-            session.get_component("data_loader").load_data("_retry")["retry"][
-                "__default__"
-            ]["max_attempts"],
+            get_session()
+            .get_component("data_loader")
+            .load_data("_retry")["retry"]["__default__"]["max_attempts"],
             10,
         )
+
+
+class TestClientPool(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(client_pool.clear)
+
+    def create_session(self, region="eu-west-1"):
+        return Session("dummy", "dummy", None, None, region)
+
+    def test_clients_are_shared(self):
+        client = self.create_session().create_client("ec2")
+        self.assertIs(self.create_session().create_client("ec2"), client)
+
+    def test_clients_are_keyed(self):
+        client = self.create_session().create_client("ec2")
+        self.assertIsNot(self.create_session().create_client("sns"), client)
+        self.assertIsNot(
+            self.create_session(region="us-east-1").create_client("ec2"), client
+        )
+
+    def test_pooling_disabled(self):
+        session = self.create_session()
+        session.pool_clients = False
+        self.assertIsNot(session.create_client("ec2"), session.create_client("ec2"))
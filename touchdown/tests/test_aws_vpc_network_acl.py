@@ -34,7 +34,6 @@ class TestNetworkAclCreation(StubberTestCase):
             )
         )
 
-        network_acl.add_describe_network_acls_empty_response_by_name()
         network_acl.add_describe_network_acls_empty_response_by_name()
         network_acl.add_create_network_acl()
         network_acl.add_create_tags(Name="test-network-acl.1")
@@ -65,7 +64,6 @@ class TestNetworkAclCreation(StubberTestCase):
             )
         )
 
-        network_acl.add_describe_network_acls_one_response_by_name()
         network_acl.add_describe_network_acls_one_response_by_name()
 
         self.assertEqual(len(list(goal.plan())), 0)
@@ -85,7 +83,6 @@ class TestNetworkAclDestroy(StubberTestCase):
             )
         )
 
-        network_acl.add_describe_network_acls_one_response_by_name()
         network_acl.add_describe_network_acls_one_response_by_name()
 
         network_acl.add_delete_network_acl()
@@ -104,7 +101,6 @@ class TestNetworkAclDestroy(StubberTestCase):
             )
         )
 
-        network_acl.add_describe_network_acls_empty_response_by_name()
         network_acl.add_describe_network_acls_empty_response_by_name()
 
         self.assertEqual(len(list(goal.plan())), 0)
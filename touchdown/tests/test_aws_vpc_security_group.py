@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from touchdown.tests.aws import StubberTestCase
+from touchdown.tests.aws import Stubber, StubberTestCase
 from touchdown.tests.fixtures.aws import VpcFixture
 from touchdown.tests.stubs.aws import SecurityGroupStubber
 
@@ -138,3 +138,51 @@ class TestSecurityGroupDestroy(StubberTestCase):
 
         self.assertEqual(len(list(goal.plan())), 0)
         self.assertEqual(len(goal.get_changes(security_group.resource)), 0)
+
+
+class TestSecurityGroupBatching(StubberTestCase):
+    def test_describe_batch(self):
+        goal = self.create_goal("apply")
+        vpc = self.aws.add_vpc(name="test-vpc")
+        plans = [
+            goal.get_service(
+                vpc.add_security_group(name=name, description=name), "apply"
+            )
+            for name in ("sg-a", "sg-b", "sg-c")
+        ]
+
+        def filters(name):
+            return {
+                "Filters": [
+                    {"Name": "group-name", "Values": [name]},
+                    {"Name": "vpc-id", "Values": ["vpc-f96b65a5"]},
+                ]
+            }
+
+        stub = self.fixtures.enter_context(Stubber(plans[0].client))
+        stub.add_response(
+            "describe_security_groups",
+            service_response={
+                "SecurityGroups": [
+                    {"GroupId": "sg-1", "GroupName": "sg-a"},
+                    {"GroupId": "sg-2", "GroupName": "sg-b"},
+                ]
+            },
+            expected_params={
+                "Filters": [
+                    {"Name": "vpc-id", "Values": ["vpc-f96b65a5"]},
+                    {"Name": "group-name", "Values": ["sg-a", "sg-b", "sg-c"]},
+                ]
+            },
+        )
+
+        requests = [(filters(p.resource.name), [p.resource.name]) for p in plans]
+        self.assertEqual(
+            plans[1].get_describe_batch_key(requests[0][0]),
+            plans[0].get_describe_batch_key(requests[2][0]),
+        )
+
+        results = plans[0].describe_batch(requests)
+        self.assertEqual(
+            [[o["GroupId"] for o in r] for r in results], [["sg-1"], ["sg-2"], []]
+        )
@@ -18,6 +18,7 @@ import tempfile
 import unittest
 
 from touchdown.core import errors, goals, serializers, workspace
+from touchdown.core.cache import MemoryCache
 from touchdown.core.map import SerialMap
 from touchdown.frontends import ConsoleFrontend
 
@@ -47,14 +48,18 @@ class _Mixins(object):
 
     def get_goal(self, goal):
         return goals.create(
-            goal, self.workspace, ConsoleFrontend(interactive=False), map=SerialMap
+            goal,
+            self.workspace,
+            ConsoleFrontend(interactive=False),
+            map=SerialMap,
+            cache=MemoryCache(),
         )
 
     def call(self, command, *args, **kwargs):
         return self.get_goal(command).execute(*args, **kwargs)
 
     def get(self, name):
-        return self.get_goal("get").collect_as_dict("get")[name].execute()
+        return self.get_goal("get").collect_one("get", name).execute()
 
     def test_apply(self):
         self.assertRaises(errors.NothingChanged, self.call, "apply")
@@ -115,6 +120,17 @@ class _Mixins(object):
         self.workspace.add_echo(text=self.strings_variable1)
         self.call("apply")
 
+    def test_collect_one_only_builds_dependencies(self):
+        unrelated = self.workspace.add_echo(text="unrelated")
+        goal = self.get_goal("get")
+        setting = goal.collect_one("get", "strings.variable1")
+        self.assertEqual(setting.execute(), ("value1", False))
+        built = set(resource for resource, service in goal.resources)
+        self.assertIn(self.config, built)
+        self.assertNotIn(unrelated, built)
+        self.assertNotIn(self.integer_variable11, built)
+        self.assertIsNone(goal.collect_one("get", "strings.missing"))
+
 
 class LocalFileTestCase(_Mixins, unittest.TestCase):
     def setup_file(self):
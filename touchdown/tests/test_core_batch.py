@@ -0,0 +1,117 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import unittest
+
+from touchdown.core.batch import Batcher
+
+
+class TestBatcher(unittest.TestCase):
+    def test_concurrent_requests_are_merged(self):
+        batcher = Batcher(window=0.2)
+        calls = []
+
+        # Keep a request in flight so that the window stays open
+        in_flight = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(requests):
+            in_flight.set()
+            release.wait()
+            return requests
+
+        other = threading.Thread(
+            target=batcher.submit, args=("other", None, slow_fetch)
+        )
+        other.start()
+        in_flight.wait()
+
+        def fetch(requests):
+            calls.append(list(requests))
+            return [r * 2 for r in requests]
+
+        results = {}
+
+        def submit(value):
+            results[value] = batcher.submit("key", value, fetch)
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        release.set()
+        other.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(calls[0]), [0, 1, 2, 3])
+        self.assertEqual(results, {0: 0, 1: 2, 2: 4, 3: 6})
+
+    def test_lone_request_doesnt_wait(self):
+        batcher = Batcher(window=30)
+        started = time.time()
+        self.assertEqual(batcher.submit("key", 1, lambda r: ["ok"]), "ok")
+        self.assertLess(time.time() - started, 5)
+
+    def test_window_closes_when_nothing_in_flight(self):
+        batcher = Batcher(window=30)
+        in_flight = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def slow_fetch(requests):
+            in_flight.set()
+            release.wait()
+            return requests
+
+        def fetch(requests):
+            return requests
+
+        other = threading.Thread(
+            target=batcher.submit, args=("other", None, slow_fetch)
+        )
+        other.start()
+        in_flight.wait()
+
+        waiting = threading.Thread(
+            target=lambda: results.append(batcher.submit("key", 1, fetch))
+        )
+        waiting.start()
+        while not batcher.queued:
+            time.sleep(0.01)
+
+        # Once the other request completes the window shuts straight away
+        started = time.time()
+        release.set()
+        waiting.join()
+        other.join()
+        self.assertLess(time.time() - started, 5)
+        self.assertEqual(results, [1])
+
+    def test_max_size(self):
+        batcher = Batcher(window=0, max_size=1)
+        self.assertEqual(batcher.submit("key", 1, lambda r: r), 1)
+        self.assertEqual(batcher.batches, {})
+
+    def test_errors_are_shared(self):
+        batcher = Batcher(window=0)
+
+        def fetch(requests):
+            raise ValueError()
+
+        self.assertRaises(ValueError, batcher.submit, "key", 1, fetch)
+        self.assertEqual(batcher.submit("key", 1, lambda r: ["ok"]), "ok")
@@ -0,0 +1,201 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from touchdown.core.cache import JSONFileCache, MemoryCache, SharedCache, SQLiteCache
+
+
+class TestSharedCache(unittest.TestCase):
+    def test_returns_copies(self):
+        cache = SharedCache()
+        result = cache.get_or_fetch("key", lambda: [{"a": 1}])
+        result[0]["a"] = 2
+        self.assertEqual(cache["key"], [{"a": 1}])
+
+    def test_get_and_delete(self):
+        cache = SharedCache()
+        cache["key"] = "value"
+        self.assertEqual(cache.get("key"), "value")
+        del cache["key"]
+        self.assertNotIn("key", cache)
+        self.assertEqual(cache.get("key", "default"), "default")
+        with self.assertRaises(KeyError):
+            del cache["key"]
+
+    def test_single_flight(self):
+        cache = SharedCache()
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait()
+            return ["result"]
+
+        results = []
+
+        def get():
+            results.append(cache.get_or_fetch("key", fetch))
+
+        threads = [threading.Thread(target=get) for i in range(5)]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [["result"]] * 5)
+
+    def test_failed_fetch_not_cached(self):
+        cache = SharedCache()
+
+        def fail():
+            raise ValueError()
+
+        self.assertRaises(ValueError, cache.get_or_fetch, "key", fail)
+        self.assertNotIn("key", cache)
+        self.assertEqual(cache.get_or_fetch("key", lambda: 1), 1)
+
+
+class CacheTests(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_round_trip(self):
+        cache = self.create_cache()
+        self.assertNotIn("key", cache)
+        self.assertEqual(cache.get("key", "default"), "default")
+        cache["key"] = {"a": [1, 2]}
+        self.assertIn("key", cache)
+        self.assertEqual(cache["key"], {"a": [1, 2]})
+
+    def test_delete(self):
+        cache = self.create_cache()
+        cache["key"] = 1
+        del cache["key"]
+        self.assertNotIn("key", cache)
+        self.assertRaises(KeyError, cache.__delitem__, "key")
+
+    def test_ttl(self):
+        cache = self.create_cache(ttl=60)
+        cache["key"] = 1
+        self.assertEqual(cache["key"], 1)
+        later = time.time() + 120
+        with mock.patch("time.time") as now:
+            now.return_value = later
+            self.assertNotIn("key", cache)
+            self.assertRaises(KeyError, cache.__getitem__, "key")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = self.create_cache(max_entries=2)
+        with mock.patch("time.time") as now:
+            now.return_value = 1000000
+            cache["a"] = 1
+            now.return_value += 10
+            cache["b"] = 2
+            now.return_value += 10
+            cache["a"]
+            now.return_value += 10
+            cache["c"] = 3
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+
+class TestJSONFileCache(CacheTests, unittest.TestCase):
+    def create_cache(self, **kwargs):
+        return JSONFileCache(self.directory, **kwargs)
+
+    def test_least_recently_used_is_evicted(self):
+        # File times come from the filesystem, not time.time()
+        cache = self.create_cache(max_entries=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        os.utime(os.path.join(self.directory, "a.json"), (1000, 1000))
+        os.utime(os.path.join(self.directory, "b.json"), (2000, 2000))
+        cache["c"] = 3
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_writes_are_atomic(self):
+        cache = self.create_cache()
+        cache["key"] = 1
+        with mock.patch.object(cache, "_serialize", return_value="2"):
+            with mock.patch("os.replace", side_effect=OSError):
+                self.assertRaises(OSError, cache.__setitem__, "key", 2)
+        self.assertEqual(cache["key"], 1)
+        self.assertEqual(os.listdir(self.directory), ["key.json"])
+
+
+class TestSQLiteCache(CacheTests, unittest.TestCase):
+    def create_cache(self, **kwargs):
+        return SQLiteCache(os.path.join(self.directory, "cache.sqlite3"), **kwargs)
+
+    def test_reads_dont_create_database(self):
+        cache = self.create_cache()
+        self.assertNotIn("key", cache)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_shared_between_instances(self):
+        self.create_cache()["key"] = 1
+        self.assertEqual(self.create_cache()["key"], 1)
+
+    def test_only_readable_by_owner(self):
+        self.create_cache()["key"] = 1
+        mode = os.stat(os.path.join(self.directory, "cache.sqlite3")).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o600)
+
+    def test_legacy_entries_are_moved(self):
+        legacy = JSONFileCache(self.directory)
+        legacy["key"] = {"a": 1}
+        cache = self.create_cache(legacy=legacy)
+        self.assertIn("key", cache)
+        self.assertEqual(cache["key"], {"a": 1})
+        self.assertNotIn("key", legacy)
+        self.assertEqual(self.create_cache()["key"], {"a": 1})
+
+    def test_legacy_entries_can_be_deleted(self):
+        legacy = JSONFileCache(self.directory)
+        legacy["key"] = 1
+        cache = self.create_cache(legacy=legacy)
+        del cache["key"]
+        self.assertNotIn("key", cache)
+
+
+class TestMemoryCache(CacheTests, unittest.TestCase):
+    def create_cache(self, **kwargs):
+        return MemoryCache(**kwargs)
+
+    def test_backend(self):
+        backend = JSONFileCache(self.directory)
+        backend["key"] = 1
+        cache = MemoryCache(backend=backend)
+        self.assertEqual(cache["key"], 1)
+        cache["other"] = 2
+        self.assertEqual(backend["other"], 2)
+
+        os.remove(os.path.join(self.directory, "key.json"))
+        self.assertEqual(cache["key"], 1)
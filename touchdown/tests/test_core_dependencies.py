@@ -42,3 +42,87 @@ class TestDependencies(unittest.TestCase):
 
         dw = dependencies.DependencyMap(d, tips_first=True)
         self.assertEqual(list(dw.all()), [d, c, b, a])
+
+    def test_get_ready_yields_once(self):
+        a = SecurityGroup(None, name="a", description="test")
+        b = SecurityGroup(None, name="b", description="test")
+        b.add_dependency(a)
+        c = SecurityGroup(None, name="c", description="test")
+        c.add_dependency(a)
+
+        dw = dependencies.DependencyMap(c)
+        self.assertEqual(list(dw.get_ready()), [a])
+        self.assertEqual(list(dw.get_ready()), [])
+        self.assertEqual(len(dw), 2)
+
+        dw.complete(a)
+        self.assertEqual(list(dw.get_ready()), [c])
+        self.assertEqual(len(dw), 1)
+
+        dw.complete(c)
+        self.assertTrue(dw.empty())
+
+    def test_long_chain(self):
+        root = SecurityGroup(None, name="root", description="test")
+        for i in range(2000):
+            sg = SecurityGroup(None, name="sg{}".format(i), description="test")
+            sg.add_dependency(root)
+            root = sg
+
+        dw = dependencies.DependencyMap(root)
+        self.assertEqual(len(list(dw.all())), 2001)
+        self.assertTrue(dw.empty())
+
+    def test_shared_graph(self):
+        a = SecurityGroup(None, name="a", description="test")
+        b = SecurityGroup(None, name="b", description="test")
+        b.add_dependency(a)
+        c = SecurityGroup(None, name="c", description="test")
+        c.add_dependency(b)
+
+        graph = dependencies.DependencyGraph(c)
+        self.assertEqual(graph.forward[b], set([a]))
+        self.assertEqual(graph.backward[b], set([c]))
+
+        forward = dependencies.DependencyMap(c, graph=graph)
+        self.assertEqual(list(forward.all()), [a, b, c])
+
+        backward = dependencies.DependencyMap(c, tips_first=True, graph=graph)
+        self.assertEqual(list(backward.all()), [c, b, a])
+
+    def test_subgraph(self):
+        a = SecurityGroup(None, name="a", description="test")
+        b = SecurityGroup(None, name="b", description="test")
+        b.add_dependency(a)
+        c = SecurityGroup(None, name="c", description="test")
+        c.add_dependency(b)
+
+        graph = dependencies.DependencyGraph(c)
+        self.assertEqual(graph.closure([b]), set([a, b]))
+        self.assertEqual(graph.closure([b], reverse=True), set([b, c]))
+
+        subgraph = graph.subgraph([b, c])
+        self.assertEqual(subgraph.forward[b], set())
+        self.assertEqual(graph.forward[b], set([a]))
+        self.assertEqual(
+            list(dependencies.DependencyMap(c, graph=subgraph).all()), [b, c]
+        )
+
+    def test_weighted_order_prefers_critical_path(self):
+        root = SecurityGroup(None, name="root", description="test")
+        medium = SecurityGroup(None, name="a-medium", description="test")
+        cheap = SecurityGroup(None, name="b-cheap", description="test")
+        slow = SecurityGroup(None, name="z-slow", description="test")
+        slow.add_dependency(cheap)
+        root.add_dependency(medium)
+        root.add_dependency(slow)
+
+        weights = {root: 1, medium: 5, cheap: 1, slow: 10}
+
+        dw = dependencies.DependencyMap(root)
+        self.assertEqual(list(dw.get_ready()), [medium, cheap])
+
+        dw = dependencies.DependencyMap(root, weight=weights.get)
+        self.assertEqual(list(dw.get_ready()), [cheap, medium])
+        self.assertEqual(dw.priority[cheap], 12)
+        self.assertEqual(dw.priority[medium], 6)
@@ -0,0 +1,125 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import datetime
+import unittest
+
+import mock
+from dateutil import tz
+
+from touchdown.core import incremental
+from touchdown.core.incremental import IncrementalState
+from touchdown.goals.apply import Apply
+from touchdown.tests.aws import StubberTestCase
+from touchdown.tests.stubs.aws import VpcStubber
+
+
+class TestEncoding(unittest.TestCase):
+    def test_round_trip(self):
+        value = {
+            "Created": datetime.datetime(2016, 1, 1, 12, 0, tzinfo=tz.tzutc()),
+            "Blob": b"\x00\x01",
+            "Items": [{"Name": "a"}],
+        }
+        self.assertEqual(incremental.decode(incremental.encode(value)), value)
+
+
+class TestIncrementalPlan(StubberTestCase):
+    def setUp(self):
+        super(TestIncrementalPlan, self).setUp()
+        self.cache = {}
+        self.vpc = self.aws.add_vpc(name="test-vpc", cidr_block="192.168.0.0/25")
+
+    def plan(self, ttl=600):
+        goal = self.create_goal("apply")
+        goal.incremental = IncrementalState(self.cache, ttl)
+        stub = self.fixtures.enter_context(
+            VpcStubber(goal.get_service(self.vpc, "apply"))
+        )
+        return goal, stub
+
+    def test_unchanged_resource_is_not_described(self):
+        goal, stub = self.plan()
+        stub.add_describe_vpcs_one_response_by_name()
+        stub.add_describe_vpc_attributes()
+        self.assertEqual(len(list(goal.plan())), 0)
+
+        goal, stub = self.plan()
+        self.assertEqual(len(list(goal.plan())), 0)
+        self.assertEqual(goal.get_plan(self.vpc).resource_id, "vpc-f96b65a5")
+
+    def test_changed_resource_is_described(self):
+        goal, stub = self.plan()
+        stub.add_describe_vpcs_one_response_by_name()
+        stub.add_describe_vpc_attributes()
+        list(goal.plan())
+
+        self.vpc.cidr_block = "192.168.0.0/24"
+        goal, stub = self.plan()
+        stub.add_describe_vpcs_one_response_by_name()
+        stub.add_describe_vpc_attributes()
+        list(goal.plan())
+        stub.assert_no_pending_responses()
+        self.assertEqual(goal.get_plan(self.vpc).resource_id, "vpc-f96b65a5")
+
+    def test_stale_state_is_described(self):
+        goal, stub = self.plan()
+        stub.add_describe_vpcs_one_response_by_name()
+        stub.add_describe_vpc_attributes()
+        list(goal.plan())
+
+        goal, stub = self.plan(ttl=60)
+        stub.add_describe_vpcs_one_response_by_name()
+        stub.add_describe_vpc_attributes()
+        with mock.patch("time.time") as time:
+            time.return_value = 2**40
+            list(goal.plan())
+        stub.assert_no_pending_responses()
+
+    def test_apply_without_incremental_leaves_cache_alone(self):
+        goal = self.create_goal("apply")
+        goal.cache = mock.MagicMock()
+        goal.cache.__contains__.return_value = False
+        goal.changes = {self.vpc: [mock.Mock()]}
+        goal.forget_changed_resources()
+        self.assertEqual(goal.cache.__setitem__.call_count, 0)
+        self.assertEqual(goal.cache.__getitem__.call_count, 0)
+
+    def test_apply_forgets_existing_state(self):
+        goal, stub = self.plan()
+        stub.add_describe_vpcs_one_response_by_name()
+        stub.add_describe_vpc_attributes()
+        list(goal.plan())
+        self.assertEqual(len(self.cache[incremental.get_cache_key()]), 1)
+
+        goal = self.create_goal("apply")
+        goal.cache = self.cache
+        goal.changes = {self.vpc: [mock.Mock()]}
+        goal.forget_changed_resources()
+        self.assertEqual(self.cache[incremental.get_cache_key()], {})
+
+
+class TestArguments(unittest.TestCase):
+    def test_ttl_must_be_positive(self):
+        parser = argparse.ArgumentParser()
+        Apply.setup_argparse(parser)
+        self.assertEqual(
+            parser.parse_args(["--incremental-ttl", "60"]).incremental_ttl, 60
+        )
+        with mock.patch("sys.stderr"):
+            for ttl in ("0", "-1"):
+                self.assertRaises(
+                    SystemExit, parser.parse_args, ["--incremental-ttl", ttl]
+                )
@@ -12,11 +12,114 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
 
-from touchdown.core.main import main
+import mock
+import six
+
+from touchdown.core import Workspace, plugins
+from touchdown.core.cache import MemoryCache
+from touchdown.core.main import concurrency_limit, main
 
 
 class TestStringHelpers(unittest.TestCase):
     def test_main_help(self):
         self.assertRaises(SystemExit, main, ["--help"])
+
+
+class TestCommands(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory)
+        with open("Touchdownfile", "w") as fp:
+            fp.write("")
+
+        self.stdout = mock.patch("sys.stdout", new_callable=six.StringIO).start()
+        mock.patch(
+            "touchdown.core.goals.get_default_cache", side_effect=MemoryCache
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def run_main(self, *argv):
+        with self.assertRaises(SystemExit) as cm:
+            main(["--serial", "--unattended"] + list(argv))
+        self.assertEqual(cm.exception.code, 1)
+        return self.stdout.getvalue()
+
+    def test_destroy(self):
+        output = self.run_main("destroy")
+        self.assertIn("no changes were required", output)
+
+    def test_apply_stream(self):
+        output = self.run_main("apply", "--stream")
+        self.assertIn("no changes were required", output)
+
+
+class TestArgumentTypes(unittest.TestCase):
+    def test_concurrency_limit(self):
+        self.assertEqual(concurrency_limit("route53=2"), ("route53", 2))
+        self.assertRaises(argparse.ArgumentTypeError, concurrency_limit, "route53")
+        self.assertRaises(argparse.ArgumentTypeError, concurrency_limit, "=2")
+
+
+class TestStartup(unittest.TestCase):
+    def test_help_does_not_load_botocore(self):
+        # Run in a fresh interpreter - other tests will already have imported
+        # botocore in this one.
+        script = "\n".join(
+            (
+                "import sys",
+                "from touchdown.core.main import main",
+                "try:",
+                "    main(['--help'])",
+                "except SystemExit:",
+                "    pass",
+                "print(' '.join(sorted(sys.modules)))",
+            )
+        )
+        output = subprocess.check_output(
+            [sys.executable, "-c", script], stderr=subprocess.DEVNULL
+        )
+        modules = output.decode("utf-8").strip().splitlines()[-1].split()
+        self.assertNotIn("botocore", modules)
+        self.assertNotIn("boto3", modules)
+        self.assertEqual([m for m in modules if m.startswith("touchdown.aws")], [])
+
+    def test_workspace_loads_plugins_on_demand(self):
+        script = "\n".join(
+            (
+                "import sys",
+                "from touchdown.core.workspace import Workspace",
+                "workspace = Workspace()",
+                "assert 'botocore' not in sys.modules",
+                "workspace.add_aws(region='eu-west-1')",
+                "assert 'touchdown.aws' in sys.modules",
+            )
+        )
+        subprocess.check_call([sys.executable, "-c", script], stderr=subprocess.DEVNULL)
+
+    def test_plugins_are_package_attributes(self):
+        script = "\n".join(
+            (
+                "import sys",
+                "import touchdown",
+                "assert 'touchdown.aws' not in sys.modules",
+                "touchdown.aws.s3.Bucket",
+            )
+        )
+        subprocess.check_call([sys.executable, "-c", script], stderr=subprocess.DEVNULL)
+
+    def test_plugin_errors_are_raised(self):
+        workspace = Workspace()
+        with mock.patch.object(plugins, "loaded", False), mock.patch.object(
+            plugins, "load", side_effect=AttributeError("broken")
+        ):
+            self.assertRaises(ImportError, getattr, workspace, "add_thing")
@@ -12,9 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+import time
+from concurrent.futures import Future
+
 import mock
 
-from touchdown.core.map import ParallelMap
+from touchdown.aws.vpc import SecurityGroup
+from touchdown.core import errors
+from touchdown.core.dependencies import DependencyMap
+from touchdown.core.map import ParallelMap, SerialMap
 from touchdown.tests.testcases import WorkspaceTestCase
 
 
@@ -56,3 +63,136 @@ class TestParallelMap(WorkspaceTestCase):
         assert call_order[1] in "BC"
         assert call_order[2] in "BC"
         assert call_order[3] == "D"
+
+    def test_parallel_map_does_not_poll(self):
+        # A chain of resources has to be visited one level at a time. Make
+        # sure the scheduler wakes up as soon as each level completes rather
+        # than waiting for a polling interval to expire.
+        previous = self.workspace.add_echo(text="0")
+        for i in range(1, 20):
+            echo = self.workspace.add_echo(text=str(i))
+            echo.add_dependency(previous)
+            previous = echo
+
+        visited = []
+        ui = mock.Mock()
+        dep_map = DependencyMap(self.workspace)
+
+        started = time.time()
+        ParallelMap(ui, dep_map, visited.append)()
+        elapsed = time.time() - started
+
+        self.assertEqual(len(visited), 21)
+        self.assertLess(elapsed, 2)
+
+    def test_parallel_map_raises_worker_errors(self):
+        self.workspace.add_echo(text="A")
+
+        def fail(resource):
+            raise errors.Error("failed")
+
+        ui = mock.Mock()
+        dep_map = DependencyMap(self.workspace)
+        self.assertRaises(errors.Error, ParallelMap(ui, dep_map, fail))
+        ui.failure.assert_called_with("failed")
+
+    def test_parallel_map_limits(self):
+        for i in range(6):
+            self.workspace.add_echo(text=str(i))
+
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def visit(resource):
+            with lock:
+                running.append(resource)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(resource)
+
+        ui = mock.Mock()
+        dep_map = DependencyMap(self.workspace)
+        ParallelMap(
+            ui, dep_map, visit, workers=4, limits={"echo": 2}, key=lambda r: "echo"
+        )()
+
+        self.assertEqual(len(peak), 7)
+        self.assertEqual(max(peak), 2)
+
+    def test_parallel_map_parks_generators(self):
+        # With a single worker, A can only finish if B runs while A is
+        # waiting on its future.
+        a = self.workspace.add_echo(text="A")
+        b = self.workspace.add_echo(text="B")
+
+        future = Future()
+        visited = []
+
+        def visit(resource):
+            if resource == a:
+                result = yield future
+                visited.append(result)
+            elif resource == b:
+                visited.append(resource.text)
+                future.set_result("A")
+
+        ui = mock.Mock()
+        dep_map = DependencyMap(self.workspace)
+        ParallelMap(ui, dep_map, visit, workers=1)()
+
+        self.assertEqual(visited, ["B", "A"])
+
+    def test_parallel_map_raises_parked_errors(self):
+        self.workspace.add_echo(text="A")
+
+        def visit(resource):
+            future = Future()
+            future.set_exception(errors.Error("failed"))
+            yield future
+
+        ui = mock.Mock()
+        dep_map = DependencyMap(self.workspace)
+        self.assertRaises(errors.Error, ParallelMap(ui, dep_map, visit))
+
+    def test_parallel_map_prefers_critical_path(self):
+        gate = SecurityGroup(None, name="gate", description="test")
+        slow = SecurityGroup(None, name="slow", description="test")
+        root = SecurityGroup(None, name="root", description="test")
+        slow.add_dependency(gate)
+        root.add_dependency(slow)
+        cheap = []
+        for i in range(5):
+            leaf = SecurityGroup(None, name="cheap{}".format(i), description="test")
+            root.add_dependency(leaf)
+            cheap.append(leaf)
+
+        weights = {slow: 100}
+        dep_map = DependencyMap(root, weight=lambda node: weights.get(node, 1))
+        parallel_map = ParallelMap(mock.Mock(), dep_map, lambda resource: None)
+
+        # The cheap leaves are ready first, but the slow chain is unblocked
+        # before a worker is free
+        parallel_map.schedule(cheap)
+        parallel_map.schedule([slow])
+        self.assertIs(parallel_map.get_runnable(), slow)
+        self.assertIn(parallel_map.get_runnable(), cheap)
+
+
+class TestSerialMap(WorkspaceTestCase):
+    def test_serial_map_runs_generators(self):
+        self.workspace.add_echo(text="A")
+
+        visited = []
+
+        def visit(resource):
+            future = Future()
+            future.set_result(resource)
+            visited.append((yield future))
+
+        ui = mock.Mock()
+        dep_map = DependencyMap(self.workspace)
+        list(SerialMap(ui, dep_map, visit))
+
+        self.assertEqual(len(visited), 2)
@@ -0,0 +1,94 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import threading
+import unittest
+
+import mock
+
+from touchdown.core import errors
+from touchdown.core.poller import Poller, Wait
+
+
+class TestWait(unittest.TestCase):
+    def test_wait(self):
+        check = mock.Mock(side_effect=[False, False, True])
+        with mock.patch("time.sleep") as sleep:
+            Wait(check, [1, 2, 3]).wait()
+        self.assertEqual([c[0][0] for c in sleep.call_args_list], [1, 2])
+
+    def test_wait_timeout(self):
+        check = mock.Mock(return_value=False)
+        with mock.patch("time.sleep"):
+            self.assertRaises(errors.Error, Wait(check, [1, 2]).wait)
+        self.assertEqual(check.call_count, 3)
+
+
+class TestPoller(unittest.TestCase):
+    def setUp(self):
+        self.poller = Poller()
+        self.addCleanup(self.poller.stop)
+
+    def test_many_waits(self):
+        futures = []
+        for i in range(20):
+            check = mock.Mock(side_effect=[False, False, True])
+            futures.append(self.poller.submit(Wait(check, itertools.repeat(0.01))))
+
+        for future in futures:
+            self.assertIsNone(future.result(timeout=5))
+
+    def test_slow_check_doesnt_block_others(self):
+        release = threading.Event()
+
+        def slow_check():
+            release.wait()
+            return True
+
+        slow = self.poller.submit(Wait(slow_check, []))
+        try:
+            check = mock.Mock(side_effect=[False, False, True])
+            fast = self.poller.submit(Wait(check, itertools.repeat(0.01)))
+            self.assertIsNone(fast.result(timeout=5))
+            self.assertFalse(slow.done())
+        finally:
+            release.set()
+        self.assertIsNone(slow.result(timeout=5))
+
+    def test_timeout(self):
+        check = mock.Mock(return_value=False)
+        future = self.poller.submit(Wait(check, [0.01]))
+        self.assertRaises(errors.Error, future.result, timeout=5)
+
+    def test_stop_fails_outstanding(self):
+        future = self.poller.submit(Wait(lambda: False, itertools.repeat(60)))
+        self.poller.stop()
+        self.assertRaises(errors.Error, future.result, timeout=5)
+
+    def test_drive_raises_inside_steps(self):
+        cleaned_up = []
+
+        def steps():
+            try:
+                yield Wait(lambda: False, [])
+            except errors.Error:
+                cleaned_up.append(True)
+                raise
+
+        driver = self.poller.drive(steps())
+        future = next(driver)
+        self.assertRaises(errors.Error, future.result, timeout=5)
+        self.assertRaises(errors.Error, driver.throw, future.exception())
+        self.assertEqual(cleaned_up, [True])
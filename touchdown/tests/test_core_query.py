@@ -0,0 +1,98 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+
+from touchdown.core import errors, query
+
+FIELDS = ["cs-method", "sc-status", "cs(Host)"]
+
+
+class TestPredicates(unittest.TestCase):
+    def matches(self, expression, record):
+        predicates = query.parse_predicates(expression, FIELDS)
+        return all(p.matches(record) for p in predicates)
+
+    def test_numeric(self):
+        self.assertTrue(self.matches("sc-status>=500", {"sc-status": "502"}))
+        self.assertFalse(self.matches("sc-status>=500", {"sc-status": "404"}))
+        # 1000 > 500 as a number, but not as a string
+        self.assertTrue(self.matches("sc-status>500", {"sc-status": "1000"}))
+
+    def test_string(self):
+        self.assertTrue(self.matches("cs-method=GET", {"cs-method": "GET"}))
+        self.assertFalse(self.matches("cs-method!=GET", {"cs-method": "GET"}))
+
+    def test_regex(self):
+        record = {"cs(Host)": "www.example.com"}
+        self.assertTrue(self.matches(r"cs(Host)~^www\.", record))
+        self.assertFalse(self.matches("cs(Host)~^api", record))
+
+    def test_all(self):
+        record = {"cs-method": "POST", "sc-status": "503"}
+        self.assertTrue(self.matches("cs-method=POST sc-status>=500", record))
+        self.assertFalse(self.matches("cs-method=GET sc-status>=500", record))
+
+    def test_missing_field(self):
+        self.assertFalse(self.matches("sc-status=200", {}))
+
+    def test_invalid(self):
+        self.assertRaises(errors.Error, query.parse_predicates, "sc-status", FIELDS)
+        self.assertRaises(errors.Error, query.parse_predicates, "x-foo=1", FIELDS)
+        self.assertRaises(errors.Error, query.parse_predicates, "cs-method~(", FIELDS)
+
+
+class TestAggregate(unittest.TestCase):
+    def test_top(self):
+        aggregate = query.Aggregate(group_by="sc-status", top=2)
+        for status in ["200", "200", "200", "404", "404", "500"]:
+            aggregate.add({"sc-status": status}, "2016-01-01 10:00")
+        echo = mock.Mock()
+        aggregate.report(echo)
+        self.assertEqual(
+            [c[0][0] for c in echo.call_args_list],
+            [
+                "6 matching records",
+                "",
+                "Top 2 by sc-status:",
+                "       3  200",
+                "       2  404",
+            ],
+        )
+
+    def test_per_minute(self):
+        aggregate = query.Aggregate(per_minute=True)
+        for minute in ["10:01", "10:00", "10:01"]:
+            aggregate.add({}, "2016-01-01 " + minute)
+        echo = mock.Mock()
+        aggregate.report(echo)
+        self.assertEqual(
+            [c[0][0] for c in echo.call_args_list][2:],
+            ["2016-01-01 10:00         1", "2016-01-01 10:01         2"],
+        )
+
+    def test_bounded(self):
+        aggregate = query.Aggregate(group_by="c-ip")
+        aggregate.capacity = 10
+        for i in range(100):
+            aggregate.add({"c-ip": "common"}, "")
+            aggregate.add({"c-ip": str(i)}, "")
+        self.assertLessEqual(len(aggregate.counts), 20)
+        self.assertEqual(aggregate.counts.most_common(1), [("common", 100)])
+
+    def test_group_by_unknown(self):
+        q = query.Query(group_by="x-foo")
+        self.assertRaises(errors.Error, q.check_group_by, FIELDS)
@@ -32,6 +32,14 @@ class TestSelectors(StubberTestCase):
             self.database,
         )
 
+    def test_named(self):
+        self.assertEqual(self.workspace.resources.named("my-database"), [self.database])
+        self.assertEqual(
+            self.workspace.resources.named("my-database", "snapshot"), [self.database]
+        )
+        self.assertEqual(self.workspace.resources.named("my-database", "ssh"), [])
+        self.assertIn("my-database", self.workspace.resources.names("snapshot"))
+
     def test_adjacent_incoming(self):
         self.assertEqual(
             self.workspace.resources.starting_at(self.echo).adjacent_incoming().get(),
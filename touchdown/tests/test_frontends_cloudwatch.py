@@ -0,0 +1,166 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import unittest
+
+import mock
+from botocore.exceptions import ClientError
+
+from touchdown.frontends import cloudwatch
+
+
+def client_error(code, **extra):
+    response = {"Error": {"Code": code, "Message": code}}
+    response.update(extra)
+    return ClientError(response, "PutLogEvents")
+
+
+class TestCloudWatchFrontend(unittest.TestCase):
+    def setUp(self):
+        self.group = mock.Mock()
+        self.group.name = "my-group"
+        self.frontend = cloudwatch.CloudWatchFrontend(self.group, "my-stream")
+        self.frontend.client = self.client = mock.Mock()
+        self.client.put_log_events.return_value = {"nextSequenceToken": "next"}
+        self.sleep = mock.patch("time.sleep").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_batches_by_size(self):
+        # Each event is a bit over 100KB, so 10 fit in a batch
+        message = "x" * (100 * 1024)
+        for i in range(25):
+            self.frontend.echo(message)
+        self.frontend.queue.put(cloudwatch.STOP)
+
+        batches = []
+        while True:
+            batch = self.frontend._get_batch()
+            if not batch:
+                break
+            batches.append(batch)
+            size = sum(cloudwatch.get_event_size(e) for e in batch)
+            self.assertLessEqual(size, cloudwatch.MAX_BATCH_BYTES)
+
+        self.assertEqual([len(b) for b in batches], [10, 10, 5])
+
+    def test_batches_by_count(self):
+        for i in range(cloudwatch.MAX_BATCH_EVENTS + 1):
+            self.frontend.queue.put({"message": "x", "timestamp": 0})
+        self.frontend.queue.put(cloudwatch.STOP)
+        self.assertEqual(len(self.frontend._get_batch()), cloudwatch.MAX_BATCH_EVENTS)
+        self.assertEqual(len(self.frontend._get_batch()), 1)
+
+    def test_flushes_after_interval(self):
+        self.frontend.flush_interval = 0.05
+        self.frontend.echo("hello")
+        started = time.time()
+        self.assertEqual(len(self.frontend._get_batch()), 1)
+        self.assertLess(time.time() - started, 1)
+
+    def test_truncates_big_events(self):
+        self.frontend.echo("é" * cloudwatch.MAX_EVENT_BYTES)
+        event = self.frontend.queue.get_nowait()
+        self.assertLessEqual(
+            len(event["message"].encode("utf-8")), cloudwatch.MAX_EVENT_BYTES
+        )
+
+    def test_sequence_token(self):
+        self.frontend._send([{"message": "hello", "timestamp": 0}])
+        self.frontend._send([{"message": "hello", "timestamp": 0}])
+        self.assertEqual(
+            self.client.put_log_events.call_args[1]["sequenceToken"], "next"
+        )
+
+    def test_invalid_sequence_token(self):
+        self.client.put_log_events.side_effect = [
+            client_error("InvalidSequenceTokenException", expectedSequenceToken="1"),
+            {"nextSequenceToken": "2"},
+        ]
+        self.frontend._send([{"message": "hello", "timestamp": 0}])
+        self.assertEqual(self.client.put_log_events.call_args[1]["sequenceToken"], "1")
+        self.assertEqual(self.frontend.sequence_token, "2")
+        self.assertFalse(self.sleep.called)
+
+    def test_invalid_sequence_token_describe(self):
+        self.client.put_log_events.side_effect = [
+            client_error("InvalidSequenceTokenException"),
+            {"nextSequenceToken": "2"},
+        ]
+        self.client.describe_log_streams.return_value = {
+            "logStreams": [{"logStreamName": "my-stream", "uploadSequenceToken": "1"}]
+        }
+        self.frontend._send([{"message": "hello", "timestamp": 0}])
+        self.assertEqual(self.client.put_log_events.call_args[1]["sequenceToken"], "1")
+
+    def test_already_accepted(self):
+        self.client.put_log_events.side_effect = [
+            client_error("DataAlreadyAcceptedException", expectedSequenceToken="1")
+        ]
+        self.frontend._send([{"message": "hello", "timestamp": 0}])
+        self.assertEqual(self.frontend.sequence_token, "1")
+
+    def test_throttled(self):
+        self.client.put_log_events.side_effect = [
+            client_error("ThrottlingException"),
+            client_error("ServiceUnavailableException"),
+            {"nextSequenceToken": "2"},
+        ]
+        self.frontend._send([{"message": "hello", "timestamp": 0}])
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertEqual(self.frontend.sequence_token, "2")
+
+    def test_other_error(self):
+        self.client.put_log_events.side_effect = client_error("AccessDenied")
+        self.assertRaises(
+            ClientError, self.frontend._send, [{"message": "hello", "timestamp": 0}]
+        )
+
+    def test_no_retry_past_deadline(self):
+        self.client.put_log_events.side_effect = client_error("ThrottlingException")
+        self.frontend.deadline = time.time()
+        self.assertRaises(
+            ClientError, self.frontend._send, [{"message": "hello", "timestamp": 0}]
+        )
+        self.assertFalse(self.sleep.called)
+
+    def test_finish_flushes(self):
+        goal = mock.Mock()
+        goal.get_plan.return_value.client = self.client
+        self.frontend.start("apply", goal)
+        for i in range(3):
+            self.frontend.echo("line {}".format(i))
+        self.frontend.finish()
+
+        self.assertFalse(self.frontend.thread.is_alive())
+        messages = []
+        for c in self.client.put_log_events.call_args_list:
+            messages.extend(e["message"] for e in c[1]["logEvents"])
+        self.assertEqual(messages, ["line 0", "line 1", "line 2"])
+
+    def test_finish_bounded(self):
+        goal = mock.Mock()
+        goal.get_plan.return_value.client = self.client
+        # CloudWatch never answers
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.client.put_log_events.side_effect = lambda **kwargs: release.wait()
+
+        self.frontend.finish_timeout = 0.1
+        self.frontend.start("apply", goal)
+        self.frontend.echo("hello")
+        started = time.time()
+        self.frontend.finish()
+        self.assertLess(time.time() - started, 5)
@@ -0,0 +1,209 @@
+# Copyright 2016 Isotoma Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+import mock
+
+from touchdown.core import errors
+from touchdown.core.action import Action
+from touchdown.core.map import ParallelMap, resume
+from touchdown.tests.aws import StubberTestCase
+from touchdown.tests.stubs.aws import SubnetStubber, VpcStubber
+
+
+class TestTargets(StubberTestCase):
+    def test_apply_target(self):
+        goal = self.create_goal("apply")
+        other = self.aws.add_vpc(name="other-vpc", cidr_block="192.168.1.0/25")
+        vpc = self.fixtures.enter_context(
+            VpcStubber(
+                goal.get_service(
+                    self.aws.add_vpc(name="test-vpc", cidr_block="192.168.0.0/25"),
+                    "apply",
+                )
+            )
+        )
+        vpc.add_describe_vpcs_one_response_by_name()
+        vpc.add_describe_vpc_attributes()
+
+        goal.set_targets(["vpc:test-vpc"])
+        self.assertEqual(len(list(goal.plan())), 0)
+        self.assertNotIn(other, set(resource for resource, _ in goal.resources))
+
+    def test_destroy_target(self):
+        goal = self.create_goal("destroy")
+        vpc = self.aws.add_vpc(name="test-vpc", cidr_block="192.168.0.0/25")
+        resource = vpc.add_subnet(name="test-subnet", cidr_block="192.168.0.0/25")
+        goal.set_targets(["subnet:test-subnet"])
+
+        # The VPC is needed to find the subnet, but mustn't be destroyed
+        vpc_stubber = self.fixtures.enter_context(
+            VpcStubber(goal.get_service(vpc, "describe"))
+        )
+        vpc_stubber.add_describe_vpcs_one_response_by_name()
+        vpc_stubber.add_describe_vpc_attributes()
+
+        subnet = self.fixtures.enter_context(
+            SubnetStubber(goal.get_service(resource, "destroy"))
+        )
+        subnet.add_describe_subnets_one_response()
+        subnet.add_describe_network_acls()
+        subnet.add_describe_route_tables()
+        subnet.add_delete_subnet()
+
+        goal.execute()
+        self.assertNotIn((vpc, "destroy"), goal.resources)
+
+    def test_unknown_target(self):
+        goal = self.create_goal("apply")
+        self.assertRaises(errors.Error, goal.set_targets, ["vpc:missing"])
+
+
+class TestStream(StubberTestCase):
+    def test_stream(self):
+        goal = self.create_goal("apply")
+        vpc = self.aws.add_vpc(name="test-vpc", cidr_block="192.168.0.0/25")
+        subnet = vpc.add_subnet(name="test-subnet", cidr_block="192.168.0.0/25")
+        events = []
+
+        def get_plan(resource):
+            plan = mock.Mock(resource=resource)
+            action = mock.Mock(description=["Change {}".format(resource)])
+            action.run.side_effect = lambda: events.append(("apply", resource))
+
+            def get_actions():
+                events.append(("plan", resource))
+                return [action]
+
+            plan.get_actions.side_effect = get_actions
+            return plan
+
+        with mock.patch.object(goal, "get_plan", side_effect=get_plan):
+            with mock.patch.object(goal.ui, "render_plan") as render_plan:
+                goal.execute(stream=True)
+
+        # The subnet isn't planned until the VPC has been changed
+        self.assertEqual(
+            [event for event in events if event[1] in (vpc, subnet)],
+            [("plan", vpc), ("apply", vpc), ("plan", subnet), ("apply", subnet)],
+        )
+        plan = render_plan.call_args[0][0]
+        self.assertEqual(
+            [resource for resource, _ in plan if resource in (vpc, subnet)],
+            [vpc, subnet],
+        )
+
+    def test_stream_nothing_changed(self):
+        goal = self.create_goal("apply")
+        vpc = self.fixtures.enter_context(
+            VpcStubber(
+                goal.get_service(
+                    self.aws.add_vpc(name="test-vpc", cidr_block="192.168.0.0/25"),
+                    "apply",
+                )
+            )
+        )
+        vpc.add_describe_vpcs_one_response_by_name()
+        vpc.add_describe_vpc_attributes()
+
+        self.assertRaises(errors.NothingChanged, goal.execute, stream=True)
+
+    def test_stream_destroy(self):
+        goal = self.create_goal("destroy")
+        self.assertRaises(errors.Error, goal.stream)
+
+
+class Recorder(Action):
+
+    description = ["Record"]
+
+    def __init__(self, plan, events, name, independent=False, barrier=None):
+        super(Recorder, self).__init__(plan)
+        self.events = events
+        self.name = name
+        self.independent = independent
+        self.barrier = barrier
+
+    def run(self):
+        if self.barrier:
+            # Only passes if every independent action is running at once
+            self.barrier.wait(timeout=5)
+        self.events.append(self.name)
+
+
+class TestIndependentActions(StubberTestCase):
+    def run_actions(self, goal, actions, visit=None):
+        resource = self.aws.add_vpc(name="test-vpc")
+        goal.changes[resource] = actions
+
+        def run(message, dep_map, callable):
+            generator = callable(resource)
+            future = resume(generator)
+            while future is not None:
+                future = resume(generator, future)
+
+        with mock.patch.object(goal, "visit", side_effect=visit or run):
+            goal.visit_actions("Applying changes...", None, goal.apply_resource)
+
+    def test_parallel(self):
+        goal = self.create_goal("apply", ParallelMap)
+        plan = mock.Mock()
+        events = []
+        barrier = threading.Barrier(3)
+        actions = [Recorder(plan, events, "first")]
+        for i in range(3):
+            actions.append(Recorder(plan, events, "independent", True, barrier))
+        actions.append(Recorder(plan, events, "last"))
+
+        self.run_actions(goal, actions)
+
+        self.assertFalse(barrier.broken)
+        self.assertEqual(events, ["first"] + ["independent"] * 3 + ["last"])
+
+    def test_description_after_batch(self):
+        goal = self.create_goal("apply", ParallelMap)
+        plan = mock.Mock()
+        events = []
+        actions = [Recorder(plan, events, "independent", True)]
+        actions.append(Recorder(plan, events, "last"))
+        with mock.patch.object(goal.ui, "echo", side_effect=events.append):
+            self.run_actions(goal, actions)
+        self.assertEqual(
+            events,
+            [
+                "[vpc 'test-vpc'] Record",
+                "independent",
+                "[vpc 'test-vpc'] Record",
+                "last",
+            ],
+        )
+
+    def test_failure(self):
+        goal = self.create_goal("apply", ParallelMap)
+        plan = mock.Mock()
+        events = []
+        failing = Recorder(plan, events, "failing", True)
+        failing.run = mock.Mock(side_effect=errors.Error("Failed"))
+        actions = [failing, Recorder(plan, events, "last")]
+
+        self.assertRaises(errors.Error, self.run_actions, goal, actions)
+        self.assertEqual(events, [])
+
+    def test_serial(self):
+        goal = self.create_goal("apply")
+        events = []
+        actions = [Recorder(mock.Mock(), events, str(i), True) for i in range(3)]
+        self.run_actions(goal, actions)
+        self.assertEqual(events, ["0", "1", "2"])
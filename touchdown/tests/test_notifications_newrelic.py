@@ -17,6 +17,7 @@ import unittest
 import mock
 
 from touchdown.core import errors, goals, workspace
+from touchdown.core.cache import MemoryCache
 from touchdown.core.map import SerialMap
 from touchdown.frontends import ConsoleFrontend
 
@@ -27,7 +28,11 @@ class TestNewRelicNotifications(unittest.TestCase):
 
     def apply(self):
         self.apply_runner = goals.create(
-            "apply", self.workspace, ConsoleFrontend(interactive=False), map=SerialMap
+            "apply",
+            self.workspace,
+            ConsoleFrontend(interactive=False),
+            map=SerialMap,
+            cache=MemoryCache(),
         )
         self.apply_runner.execute()
 
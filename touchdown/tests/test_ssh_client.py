@@ -12,10 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import unittest
 
 import mock
 
+from touchdown.core import errors
+from touchdown.ssh.client import Client, OutputStream
 from touchdown.tests.fixtures.ssh_connection import SshConnectionFixture
 from touchdown.tests.testcases import WorkspaceTestCase
 
@@ -39,3 +42,194 @@ class TestSshClient(WorkspaceTestCase):
         connection_plan.get_client()
 
         # FIXME: How to make the dummy server run stuff? Or fake run stuff.
+
+
+class FakeChannel(object):
+
+    """ Replays a script of reads. Its fileno is a pipe that is always
+    readable, so select never blocks. """
+
+    def __init__(self, reads, exit_status=0):
+        self.reads = list(reads)
+        self.exit_status = exit_status
+        self.stdout = []
+        self.stderr = []
+        self.eof_received = False
+        self.closed = False
+        self.read_fd, self.write_fd = os.pipe()
+        os.write(self.write_fd, b"x")
+
+    def fileno(self):
+        return self.read_fd
+
+    def exec_command(self, command):
+        self.command = command
+
+    def shutdown_write(self):
+        pass
+
+    def _next(self):
+        # Each select wakeup delivers the next step of the script
+        if not self.stdout and not self.stderr:
+            if not self.reads:
+                self.eof_received = True
+                return
+            stream, data = self.reads.pop(0)
+            getattr(self, stream).append(data)
+
+    def recv_ready(self):
+        self._next()
+        return bool(self.stdout)
+
+    def recv(self, size):
+        return self.stdout.pop(0)
+
+    def recv_stderr_ready(self):
+        return bool(self.stderr)
+
+    def recv_stderr(self, size):
+        return self.stderr.pop(0)
+
+    def exit_status_ready(self):
+        return self.eof_received
+
+    def recv_exit_status(self):
+        return self.exit_status
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+class RacingChannel(FakeChannel):
+
+    """ Output and EOF arrive together, just after stdout has been read """
+
+    def __init__(self):
+        super(RacingChannel, self).__init__([])
+        self.raced = False
+
+    def recv_ready(self):
+        return bool(self.stdout)
+
+    def recv_stderr_ready(self):
+        if not self.raced:
+            self.raced = True
+            self.stdout.append(b"last line\n")
+            self.eof_received = True
+        return bool(self.stderr)
+
+
+class BackgroundChannel(FakeChannel):
+
+    """ The command exits but a background process keeps stdout open, so the
+    exit status arrives without an EOF """
+
+    def __init__(self, reads):
+        super(BackgroundChannel, self).__init__(reads)
+        self.exited = False
+        self.polls = 0
+
+    def _next(self):
+        if not self.stdout and not self.stderr and not self.reads:
+            self.exited = True
+            self.polls += 1
+            if self.polls > 10:
+                raise AssertionError("Still reading after the command exited")
+            return
+        super(BackgroundChannel, self)._next()
+
+    def exit_status_ready(self):
+        return self.exited
+
+
+class TestOutputStream(unittest.TestCase):
+    def setUp(self):
+        self.output = []
+
+    def echo(self, text, nl=True):
+        self.output.append(text)
+
+    def test_split_lines(self):
+        stream = OutputStream(self.echo, "utf-8")
+        stream.feed(b"one\ntw")
+        self.assertEqual(self.output, ["one\n"])
+        stream.feed(b"o\nthr")
+        stream.feed(b"ee")
+        self.assertEqual(self.output, ["one\n", "two\n"])
+        stream.flush()
+        self.assertEqual(self.output, ["one\n", "two\n", "three"])
+
+    def test_split_multibyte(self):
+        stream = OutputStream(self.echo, "utf-8")
+        data = "\u20ac\n".encode("utf-8")
+        for i in range(len(data)):
+            stream.feed(data[i : i + 1])
+        stream.flush()
+        self.assertEqual(self.output, ["\u20ac\n"])
+
+    def test_truncated_multibyte(self):
+        stream = OutputStream(self.echo, "utf-8")
+        stream.feed("\u20ac".encode("utf-8")[:2])
+        stream.flush()
+        self.assertEqual(self.output, ["\ufffd"])
+
+
+class TestRun(unittest.TestCase):
+    def setUp(self):
+        self.client = Client(mock.Mock())
+        self.client.setup_forwarded_keys = mock.Mock()
+        self.output = []
+        self.sleep = mock.patch("time.sleep").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def echo(self, text, nl=True):
+        self.output.append(text)
+
+    def run_command(self, channel):
+        transport = mock.Mock()
+        transport.open_session.return_value = channel
+        self.client._run(transport, "true", echo=self.echo)
+
+    def test_echoes_lines_as_they_complete(self):
+        channel = FakeChannel(
+            [("stdout", b"hel"), ("stdout", b"lo\nwor"), ("stdout", b"ld\n")]
+        )
+        self.run_command(channel)
+        self.assertEqual(self.output, ["hello\n", "world\n"])
+        self.assertEqual(self.sleep.call_count, 0)
+
+    def test_stdout_and_stderr(self):
+        channel = FakeChannel([("stderr", b"oops\n"), ("stdout", b"done")])
+        self.run_command(channel)
+        self.assertEqual(self.output, ["oops\n", "done"])
+
+    def test_multibyte_split_across_reads(self):
+        data = "café\n".encode("utf-8")
+        channel = FakeChannel([("stdout", data[:4]), ("stdout", data[4:])])
+        self.run_command(channel)
+        self.assertEqual(self.output, ["café\n"])
+
+    def test_unknown_encoding(self):
+        self.client.input_encoding = "C"
+        self.run_command(FakeChannel([("stdout", b"ok\n")]))
+        self.assertEqual(self.output, ["ok\n"])
+
+    def test_output_with_eof(self):
+        self.run_command(RacingChannel())
+        self.assertEqual(self.output, ["last line\n"])
+
+    def test_exit_without_eof(self):
+        self.run_command(BackgroundChannel([("stdout", b"started\n")]))
+        self.assertEqual(self.output, ["started\n"])
+
+    def test_failure(self):
+        channel = FakeChannel([("stderr", b"no\n")], exit_status=2)
+        self.assertRaises(errors.RemoteCommandFailed, self.run_command, channel)
+        self.assertEqual(self.output, ["no\n"])
+
+    def test_check_output(self):
+        channel = FakeChannel([("stdout", b"ubuntu"), ("stdout", b"\n")])
+        self.client.get_transport = mock.Mock()
+        self.client.get_transport.return_value.open_session.return_value = channel
+        self.assertEqual(self.client.check_output("whoami"), (0, "ubuntu\n", ""))
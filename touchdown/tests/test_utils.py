@@ -12,9 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
 import unittest
 
-from touchdown.core.utils import force_bytes, force_str, force_unicode
+from touchdown.core.utils import force_bytes, force_str, force_unicode, positive_integer
 
 
 class TestStringHelpers(unittest.TestCase):
@@ -53,3 +54,10 @@ class TestStringHelpers(unittest.TestCase):
 
     def test_bytes_exception(self):
         self.assertRaises(ValueError, force_bytes, [])
+
+
+class TestPositiveInteger(unittest.TestCase):
+    def test_positive_integer(self):
+        self.assertEqual(positive_integer("20"), 20)
+        self.assertRaises(argparse.ArgumentTypeError, positive_integer, "0")
+        self.assertRaises(argparse.ArgumentTypeError, positive_integer, "many")
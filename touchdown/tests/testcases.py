@@ -15,6 +15,7 @@
 import unittest
 
 from touchdown.core import goals, workspace
+from touchdown.core.cache import MemoryCache
 from touchdown.core.map import SerialMap
 from touchdown.frontends import ConsoleFrontend, MultiFrontend
 
@@ -36,4 +37,5 @@ class WorkspaceTestCase(unittest.TestCase):
             self.workspace,
             MultiFrontend([ConsoleFrontend(interactive=False)]),
             map=map_class,
+            cache=MemoryCache(),
         )